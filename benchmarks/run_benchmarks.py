@@ -0,0 +1,217 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+Time processing stages on synthetic SDR iterations of several sizes
+"""
+import sys
+import os
+import argparse
+import glob
+import json
+import platform
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+
+PACKAGE_PARENT = '..'
+SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+
+from benchmarks.synthetic_iteration import write_iteration, MASER_LINES
+from utils.scan_catalog import ScanCatalog
+from utils.scan_reader import CACHE_FILE_EXTENSION
+from utils.raw_cube import RawCube, pack_iteration
+from utils.sdr_log import read_sdr_log
+from utils.snr import get_masks, signal_to_noise_ratio
+from utils.pair_accumulator import PairAccumulator
+from utils.help import compute_gauss
+from utils.vlsr import get_lsr_engine, KERNEL_FILE_NAME
+from sdr_fs import frequency_shifting_batch, dopler, get_scan_date
+from total_spectrum_analyzer_qt5 import filter_outliers
+
+STAGES = ("read_pairs_text", "read_pairs_cache", "read_pairs_raw_cube", "frequency_shifting", "lsr",
+          "accumulate", "signal_to_noise_ratio", "compute_gauss", "filter_outliers")
+SOURCE_COORDINATES = ("22h56m17.90s", "+62d01m49.7s")
+STATION_COORDINATES = (3183661.00, 1276902.00, 5359291.00)
+LINE_FREQUENCY = 6.6685192 * (10 ** 9)
+CUTS = [[-5.524, -0.967]]
+BAD_POINT_RANGE = 10
+
+
+def parse_arguments():
+    """
+
+    :return: dict with passed args to script
+    """
+    parser = argparse.ArgumentParser(description='''Time processing stages on synthetic SDR iterations
+    for each channel count and scan pair count, results are written as JSON. ''')
+    parser.add_argument("-n", "--channels", help="Channel counts of spectrum",
+                        type=int, nargs="+", default=[2048, 4096, 8192])
+    parser.add_argument("-p", "--pairs", help="Scan pair counts of iteration",
+                        type=int, nargs="+", default=[10, 40, 160])
+    parser.add_argument("-s", "--stages", help="Stages to time, default is all stages",
+                        type=str, nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("-r", "--repeat", help="Repeats of each stage", type=int, default=5)
+    parser.add_argument("-o", "--output", help="Output JSON file", type=str, default=None)
+    parser.add_argument("--compare", help="JSON file of earlier run to compare with", type=str, default=None)
+    parser.add_argument("-v", "--version", action="version", version='%(prog)s - Version 1.0')
+    args = parser.parse_args()
+    return args
+
+
+def time_stage(stage, repeat, setup=None):
+    """
+
+    :param stage: function to time
+    :param repeat: count of timed calls
+    :param setup: function called before each call of stage, it is not timed
+    :return: times of each call in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        stage()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def remove_scan_caches(data_dir):
+    """
+
+    :param data_dir: iteration data directory
+    :return: None
+    """
+    for cache_file_name in glob.glob(os.path.join(data_dir, "*" + CACHE_FILE_EXTENSION)):
+        os.remove(cache_file_name)
+
+
+def benchmark_iteration(work_dir, channels, pairs, stages, repeat):
+    """
+
+    :param work_dir: directory for synthetic iteration
+    :param channels: channels of spectrum
+    :param pairs: count of scan pairs
+    :param stages: stages to time
+    :param repeat: repeats of each stage
+    :return: dict of stage and times of each call
+    """
+    data_dir, log_file_name = write_iteration(os.path.join(work_dir, "data"), os.path.join(work_dir, "logs"),
+                                              scans=(pairs + 1) // 2, channels=channels)
+    data_dir = os.path.join(data_dir, "")
+    logs = read_sdr_log(log_file_name, os.path.join(work_dir, "cepa_1"))
+    scan_catalog = ScanCatalog(data_dir)
+    scan_pairs = scan_catalog.create_scan_pairs()[:pairs]
+    frequency, spectra = scan_catalog.read_pairs(scan_pairs)
+    spectra = np.fft.fftshift(spectra, axes=-1)
+    sf, frequency, _, _ = frequency_shifting_batch(spectra, frequency, logs, scan_pairs)
+    velocity = dopler((frequency + logs.local_oscillator) * (10 ** 6), 0, LINE_FREQUENCY)
+    shifts = {pair: 0.0 for pair in scan_pairs}
+    signal_mask, noise_mask = get_masks(velocity, CUTS)
+    average = np.mean(sf[:, 0], axis=0)
+    amplitude = np.column_stack([velocity, average, np.mean(sf[:, 1], axis=0)])
+    gauss_lines = [str(line_velocity) for line_velocity, _ in MASER_LINES]
+    scan_dates = [get_scan_date(logs, pair) for pair in scan_pairs]
+
+    def read_raw_cube():
+        RawCube(data_dir).read_pairs(scan_pairs)
+
+    def accumulate():
+        accumulator = PairAccumulator(velocity, shifts, CUTS)
+        accumulator.add_many(scan_pairs, sf)
+        accumulator.get_average()
+
+    def filter_amplitude():
+        data = np.array(amplitude)
+        filter_outliers(data[:, 0], data[:, 1], data[:, 2], 1.0, 3, BAD_POINT_RANGE)
+
+    results = dict()
+    for stage in stages:
+        if stage == "read_pairs_text":
+            results[stage] = time_stage(lambda: scan_catalog.read_pairs(scan_pairs), repeat,
+                                        lambda: remove_scan_caches(data_dir))
+        elif stage == "read_pairs_cache":
+            scan_catalog.read_pairs(scan_pairs)
+            results[stage] = time_stage(lambda: scan_catalog.read_pairs(scan_pairs), repeat)
+        elif stage == "read_pairs_raw_cube":
+            pack_iteration(data_dir)
+            results[stage] = time_stage(read_raw_cube, repeat)
+        elif stage == "frequency_shifting":
+            results[stage] = time_stage(lambda: frequency_shifting_batch(spectra, frequency, logs, scan_pairs),
+                                        repeat)
+        elif stage == "lsr":
+            if not os.path.isfile(KERNEL_FILE_NAME):
+                print("Stage lsr is skipped, ephemeris kernel " + KERNEL_FILE_NAME + " is not found")
+                continue
+            results[stage] = time_stage(lambda: get_lsr_engine(*SOURCE_COORDINATES,
+                                                               *STATION_COORDINATES).lsr(scan_dates), repeat)
+        elif stage == "accumulate":
+            results[stage] = time_stage(accumulate, repeat)
+        elif stage == "signal_to_noise_ratio":
+            results[stage] = time_stage(lambda: signal_to_noise_ratio(sf[:, 0], signal_mask, noise_mask), repeat)
+        elif stage == "compute_gauss":
+            results[stage] = time_stage(lambda: compute_gauss(velocity, average, gauss_lines), repeat)
+        elif stage == "filter_outliers":
+            results[stage] = time_stage(filter_amplitude, repeat)
+    return results
+
+
+def compare_results(results, compare_file_name):
+    """
+
+    :param results: benchmark results
+    :param compare_file_name: JSON file of earlier run
+    :return: None
+    """
+    with open(compare_file_name, "r") as compare_file:
+        earlier_results = {(result["stage"], result["channels"], result["pairs"]): result
+                           for result in json.load(compare_file)["results"]}
+
+    print("\n%-22s %8s %6s %12s %12s %8s" % ("stage", "channels", "pairs", "before (ms)", "now (ms)", "ratio"))
+    for result in results:
+        earlier_result = earlier_results.get((result["stage"], result["channels"], result["pairs"]))
+        if earlier_result is None:
+            continue
+        print("%-22s %8d %6d %12.3f %12.3f %8.2f" % (result["stage"], result["channels"], result["pairs"],
+                                                    earlier_result["min"] * 1000, result["min"] * 1000,
+                                                    result["min"] / earlier_result["min"]))
+
+
+def main():
+    """
+    :return: None
+    """
+    args = parse_arguments()
+    results = []
+    print("%-22s %8s %6s %12s %12s" % ("stage", "channels", "pairs", "min (ms)", "median (ms)"))
+    for channels in args.channels:
+        for pairs in args.pairs:
+            with tempfile.TemporaryDirectory(prefix="mdps_benchmark_") as work_dir:
+                stage_times = benchmark_iteration(work_dir, channels, pairs, args.stages, args.repeat)
+            for stage in args.stages:
+                if stage not in stage_times:
+                    continue
+                times = stage_times[stage]
+                results.append({"stage": stage, "channels": channels, "pairs": pairs, "repeat": len(times),
+                                "min": min(times), "median": float(np.median(times)),
+                                "mean": float(np.mean(times)), "times": times})
+                print("%-22s %8d %6d %12.3f %12.3f" % (stage, channels, pairs, min(times) * 1000,
+                                                       np.median(times) * 1000))
+
+    if args.output is not None:
+        with open(args.output, "w") as output_file:
+            json.dump({"date": datetime.now().isoformat(), "python": platform.python_version(),
+                       "numpy": np.__version__, "machine": platform.machine(), "platform": platform.platform(),
+                       "results": results}, output_file, indent=2)
+        print("Results are written to " + args.output)
+
+    if args.compare is not None:
+        compare_results(results, args.compare)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+Write synthetic SDR iteration, data files with maser lines and noise and matching SDR log
+"""
+import sys
+import os
+import argparse
+import configparser
+import numpy as np
+import scipy.constants
+
+PACKAGE_PARENT = '..'
+SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+
+from parsers.configparser_ import read_config
+
+PHASES = ("r0", "s0", "r1", "s1")
+BASE_FREQUENCY = 6668.5192
+LOCAL_OSCILLATOR = 6667.5
+BANDWIDTH = 2.0
+DF_DIV = 4
+TCAL = (3.0, 3.2)
+DPFU = (0.044, 0.044)
+ELEV_POLY = (0.8, 0.007, -0.00007)
+POWER_LEVEL = 100.0
+CAL_LEVEL = 5.0
+NOISE_LEVEL = 0.5
+MASER_LINES = ((-1.77, 40.0), (-2.41, 25.0), (-3.66, 60.0), (-4.01, 15.0), (-4.67, 10.0))
+LINE_WIDTH = 0.1
+PATHS = ("logPath", "prettyLogsPath", "dataFilePath", "resultFilePath", "outputFilePath", "monitoringFilePath")
+
+
+def parse_arguments():
+    """
+
+    :return: dict with passed args to script
+    """
+    parser = argparse.ArgumentParser(description='''Write synthetic SDR iteration with maser lines and noise,
+    matching SDR log and configuration file with paths inside output directory. ''')
+    parser.add_argument("output", help="Output directory", type=str)
+    parser.add_argument("-s", "--source", help="source name", type=str, default="cepa")
+    parser.add_argument("-l", "--line", help="Observed frequency", type=int, default=6668)
+    parser.add_argument("-i", "--iteration", help="Iteration number", type=int, default=1)
+    parser.add_argument("--scans", help="Count of scans, each scan gives two scan pairs", type=int, default=20)
+    parser.add_argument("--channels", help="Channels of spectrum", type=int, default=2048)
+    parser.add_argument("--seed", help="Random seed", type=int, default=0)
+    parser.add_argument("-c", "--config", help="Configuration cfg file to copy",
+                        type=str, default="config/config.cfg")
+    parser.add_argument("-v", "--version", action="version", version='%(prog)s - Version 1.0')
+    args = parser.parse_args()
+    return args
+
+
+def get_frequency(channels):
+    """
+
+    :param channels: channels of spectrum
+    :return: frequency of SDR spectrum in MHz relative to local oscillator
+    """
+    return np.linspace(0, BANDWIDTH, channels, endpoint=False)
+
+
+def get_shift_channels(channels):
+    """
+
+    :param channels: channels of spectrum
+    :return: frequency shift in channels
+    """
+    return int(np.rint((BANDWIDTH / DF_DIV) / (BANDWIDTH / channels)))
+
+
+def maser_spectrum(frequency, maser_lines=MASER_LINES, line_width=LINE_WIDTH):
+    """
+
+    :param frequency: frequency of SDR spectrum in MHz relative to local oscillator
+    :param maser_lines: velocity and amplitude of each maser line
+    :param line_width: gaussian standard deviation of lines in km/s
+    :return: maser spectrum in units of power level
+    """
+    velocity = -((frequency + LOCAL_OSCILLATOR) / BASE_FREQUENCY - 1) * scipy.constants.speed_of_light / 1000
+    spectrum = np.zeros(len(frequency))
+    for line_velocity, amplitude in maser_lines:
+        spectrum += amplitude * np.exp(-0.5 * ((velocity - line_velocity) / line_width) ** 2)
+    return spectrum
+
+
+def synthetic_scan(frequency, maser, rng, noise_level=NOISE_LEVEL):
+    """
+
+    :param frequency: frequency of SDR spectrum
+    :param maser: maser spectrum of signal phase and reference phase, dict of phase letter and spectrum
+    :param rng: numpy random generator
+    :param noise_level: standard deviation of noise in units of power level
+    :return: dict of phase and fft ordered spectra of shape (channels, 2) as written by SDR
+    """
+    scan = dict()
+    for phase in PHASES:
+        spectra = POWER_LEVEL + rng.normal(0, noise_level, (len(frequency), 2))
+        spectra += maser[phase[0]][:, None]
+        if phase[1] == "1":
+            spectra += CAL_LEVEL
+        scan[phase] = np.fft.ifftshift(spectra, axes=0)
+    return scan
+
+
+def get_log_header(source, line, station_id, iteration, channels):
+    """
+
+    :param source: source name
+    :param line: line
+    :param station_id: station id
+    :param iteration: iteration number
+    :param channels: channels of spectrum
+    :return: SDR log header lines
+    """
+    return ["#source: " + source,
+            "#station,id: RT-32 " + station_id,
+            "#exp_name: " + source + "_f" + str(line) + "_" + station_id + "_" + str(iteration),
+            "#df_div,df: " + str(DF_DIV) + " " + str(BANDWIDTH / DF_DIV),
+            "#Fs,Ns,RBW: " + str(BANDWIDTH) + " " + str(channels) + " " + str(BANDWIDTH / channels),
+            "#Tcal: " + " ".join(str(tcal) for tcal in TCAL),
+            "#DPFU: " + " ".join(str(dpfu) for dpfu in DPFU),
+            "#Elev_poly: " + " ".join(str(g_el) for g_el in ELEV_POLY),
+            "#f_obs,LO,IF: " + str(LOCAL_OSCILLATOR + 1) + " " + str(LOCAL_OSCILLATOR) + " 1.0"]
+
+
+def write_iteration(data_file_path, log_path, source="cepa", line=6668, iteration=1, scans=20,
+                    channels=2048, station_id="ir", seed=0, maser_lines=MASER_LINES):
+    """
+    Maser lines are placed at their velocity in signal phase and frequency shift
+    further in reference phase, so sdr_fs.py calibration gives them back at their velocity
+
+    :param data_file_path: directory of iteration data directories
+    :param log_path: directory of SDR logs
+    :param source: source name
+    :param line: line
+    :param iteration: iteration number
+    :param scans: count of scans, each scan gives two scan pairs
+    :param channels: channels of spectrum
+    :param station_id: station id
+    :param seed: random seed
+    :param maser_lines: velocity and amplitude of each maser line
+    :return: iteration data directory and SDR log file
+    """
+    rng = np.random.default_rng(seed)
+    name = source + "_f" + str(line) + "_" + station_id + "_" + str(iteration)
+    data_dir = os.path.join(data_file_path, name)
+    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(log_path, exist_ok=True)
+
+    frequency = get_frequency(channels)
+    n_shift = get_shift_channels(channels)
+    maser_signal = maser_spectrum(frequency, maser_lines)
+    maser = {"s": np.roll(maser_signal, -n_shift), "r": np.roll(maser_signal, n_shift)}
+
+    log_lines = get_log_header(source, line, station_id, iteration, channels)
+    for scan_number in range(1, scans + 1):
+        scan = synthetic_scan(frequency, maser, rng)
+        for phase_index, phase in enumerate(PHASES):
+            data_file_name = os.path.join(data_dir, name + "_no" + str(scan_number).zfill(4) + phase + ".dat")
+            np.savetxt(data_file_name, np.column_stack([frequency, scan[phase]]), fmt="%.6f")
+            minutes, seconds = divmod(scan_number * 60 + phase_index * 10, 60)
+            hours, minutes = divmod(minutes, 60)
+            log_lines.append("2020-01-01T" + str(10 + hours).zfill(2) + ":" + str(minutes).zfill(2) + ":" +
+                             str(seconds).zfill(2) + " " + str(scan_number) + " " + phase + " 180.0 45.0")
+
+    log_file_name = os.path.join(log_path, "SDR", name + ".log")
+    os.makedirs(os.path.dirname(log_file_name), exist_ok=True)
+    with open(log_file_name, "w") as log_file:
+        log_file.write("\n".join(log_lines) + "\n")
+    return data_dir, log_file_name
+
+
+def write_config(output, config_file_path):
+    """
+
+    :param output: output directory
+    :param config_file_path: configuration file to copy
+    :return: configuration file with paths inside output directory
+    """
+    config = configparser.RawConfigParser()
+    config.read_dict(read_config(config_file_path))
+    for path in PATHS:
+        config.set("paths", path, os.path.join(os.path.abspath(output), path, ""))
+        os.makedirs(config.get("paths", path), exist_ok=True)
+    output_config_file_path = os.path.join(output, "config.cfg")
+    with open(output_config_file_path, "w") as config_file:
+        config.write(config_file)
+    return output_config_file_path
+
+
+def main():
+    """
+    :return: None
+    """
+    args = parse_arguments()
+    config_file_path = write_config(args.output, args.config)
+    config = read_config(config_file_path)
+    data_dir, log_file_name = write_iteration(config.get("paths", "dataFilePath"), config.get("paths", "logPath"),
+                                              args.source, args.line, args.iteration, args.scans,
+                                              args.channels, seed=args.seed)
+    print("Configuration " + config_file_path)
+    print("Data " + data_dir)
+    print("Log " + log_file_name)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+DBBC frequency switching calibration of whole iteration without GUI
+"""
+import sys
+import os
+import re
+import argparse
+from datetime import datetime
+import numpy as np
+from ExperimentsLogReader.experimentsLogReader import LogReaderFactory, LogTypes
+from parsers.runtime_context import RuntimeContext, get_runtime_context
+from utils.vlsr import get_lsr_engine
+from utils.pair_accumulator import PairAccumulator
+from utils.scan_reader import read_scan_file
+from utils.trace import start_trace, trace_span, traced
+from sdr_fs import dopler, shifted_channels, get_output_file_name, get_mjd, \
+    write_output_file, delete_data_files, report_bad_system_temperature
+
+PAIRS_PER_BLOCK = 16
+DBBC_FILE_PATTERN = re.compile("no([0-9]+)\\.dat$")
+
+
+def parse_arguments():
+    """
+
+    :return: dict with passed args to script
+    """
+    parser = argparse.ArgumentParser(description='''Calibrate DBBC iteration and create input file
+    for plotting tool. ''', epilog="""PRE PLOTTER.""")
+    parser.add_argument("source", help="Experiment source", type=str, default="")
+    parser.add_argument("line", help="frequency", type=str)
+    parser.add_argument("iteration_number", help="iteration number ", type=int)
+    parser.add_argument("log_file", help="Experiment log file name", type=str)
+    parser.add_argument("-c", "--config", help="Configuration cfg file", type=str,
+                        default="config/config.cfg")
+    parser.add_argument("-bs", "--badScans", help="What to do with bad scans",
+                        type=str, default="skip", choices=["skip", "delete"])
+    parser.add_argument("--trace", help="Write stage timing to Chrome trace file", type=str, default=None)
+    parser.add_argument("-v", "--version", action="version", version='%(prog)s - Version 1.0')
+    args = parser.parse_args()
+    return args
+
+
+def get_args(key):
+    """
+
+    :param key: argument key
+    :return: to script passed argument value
+    """
+    return get_runtime_context(parse_arguments).get_arg(key)
+
+
+class DbbcLog:
+    """
+    DBBC field system log with per scan values converted to numbers once
+    """
+
+    def __init__(self, location, scans, dates, tsys, elevation, fs_frequency, frequency_start):
+        """
+
+        :param location: station location from log header
+        :param scans: scan names
+        :param dates: isot date of each scan
+        :param tsys: system temperature of each scan for left and right polarization
+        :param elevation: elevation of each scan
+        :param fs_frequency: frequency switching offset of each scan in MHz
+        :param frequency_start: sky frequency of band start of each scan in MHz
+        """
+        self.location = location
+        self.scans = list(scans)
+        self.scan_index = {scan: index for index, scan in enumerate(self.scans)}
+        self.dates = list(dates)
+        self.tsys = np.asarray(tsys, dtype=np.float64).reshape(-1, 2)
+        self.elevation = np.asarray(elevation, dtype=np.float64)
+        self.fs_frequency = np.asarray(fs_frequency, dtype=np.float64)
+        self.frequency_start = np.asarray(frequency_start, dtype=np.float64)
+
+    @classmethod
+    def from_logs(cls, logs):
+        """
+
+        :param logs: logs dict from ExperimentsLogReader
+        :return: DBBC log
+        """
+        scans = sorted([scan for scan in logs if scan != "header"], key=int)
+        return cls(logs["header"]["location"], scans,
+                   [parse_dbbc_date(logs[scan]["dates"], logs[scan]["startTime"]) for scan in scans],
+                   [[float(tsys) for tsys in logs[scan]["Systemtemperature"][:2]] for scan in scans],
+                   [float(logs[scan]["elevation"]) for scan in scans],
+                   [float(logs[scan]["fs_frequencyfs"]) for scan in scans],
+                   [float(logs[scan]["FreqStart"]) for scan in scans])
+
+    def get_station_name(self):
+        """
+
+        :return: station name used in configuration and output file names
+        """
+        if "16" in self.location:
+            return "IRBENE16"
+        return "IRBENE"
+
+    def get_indexes(self, scans):
+        """
+
+        :param scans: scan names
+        :return: index of each scan in log
+        """
+        return [self.scan_index[scan] for scan in scans]
+
+
+def parse_dbbc_date(date, start_time):
+    """
+
+    :param date: date like 07 Mar 2020
+    :param start_time: time like 12:00:05
+    :return: isot date
+    """
+    return datetime.strptime(date + " " + start_time, "%d %b %Y %H:%M:%S").isoformat()
+
+
+@traced()
+def read_dbbc_log(log_file_name, pretty_log_path):
+    """
+
+    :param log_file_name: DBBC field system log
+    :param pretty_log_path: pretty log path prefix for ExperimentsLogReader output
+    :return: DBBC log
+    """
+    return DbbcLog.from_logs(LogReaderFactory.getLogReader(LogTypes.DBBC, log_file_name,
+                                                           pretty_log_path, []).getLogs())
+
+
+def find_dbbc_files(data_dir):
+    """
+
+    :param data_dir: iteration data directory
+    :return: dict of scan name and data file name
+    """
+    data_files = dict()
+    for data_file in os.listdir(data_dir):
+        match = DBBC_FILE_PATTERN.search(data_file)
+        if match is not None:
+            data_files[str(int(match.group(1)))] = data_file
+    return data_files
+
+
+def create_dbbc_pairs(logs, data_files):
+    """
+    Consecutive scans of log which have data files are signal and reference scan of pair
+
+    :param logs: DBBC log
+    :param data_files: dict of scan name and data file name
+    :return: list of signal and reference scan names
+    """
+    scans = [scan for scan in logs.scans if scan in data_files]
+    return list(zip(scans[0::2], scans[1::2]))
+
+
+def read_dbbc_pairs(data_dir, data_files, pairs):
+    """
+
+    :param data_dir: iteration data directory
+    :param data_files: dict of scan name and data file name
+    :param pairs: signal and reference scan names
+    :return: frequency and spectra of shape (pairs, 2, 2, channels) ordered signal, reference and
+    left, right polarization
+    """
+    frequency = None
+    spectra = None
+    for index, pair in enumerate(pairs):
+        for scan_index, scan in enumerate(pair):
+            data = read_scan_file(data_dir + data_files[scan])
+            if spectra is None:
+                frequency = np.array(data[:, 0])
+                spectra = np.empty((len(pairs), 2, 2, data.shape[0]))
+            spectra[index, scan_index] = data[:, 1:3].T
+    return frequency, spectra
+
+
+def get_shift_channels(frequency, fs_frequency):
+    """
+
+    :param frequency: frequency of spectrum
+    :param fs_frequency: frequency switching offsets of signal and reference scan of each pair
+    :return: frequency shift in channels of each pair, spectra of pair are shifted by it in opposite directions
+    """
+    f_step = (frequency[-1] - frequency[0]) / (len(frequency) - 1)
+    return np.rint((fs_frequency[:, 0] - fs_frequency[:, 1]) / (2 * f_step)).astype(int)
+
+
+def dbbc_calibration_batch(spectra, frequency, tsys, n_shift, elevation, dpfu, g_el, k):
+    """
+    Frequency switching calibration of many DBBC scan pairs at once, system temperature of each scan
+    is taken from field system log
+
+    :param spectra: array of shape (pairs, 2, 2, channels), scans are ordered signal, reference and
+    polarizations left, right
+    :param frequency: frequency
+    :param tsys: system temperatures of shape (pairs, 2, 2) ordered as spectra
+    :param n_shift: frequency shift in channels of each pair
+    :param elevation: average elevation of each pair
+    :param dpfu: DPFU of left and right polarization
+    :param g_el: gain elevation polynomial
+    :param k: flux correction factor
+    :return: calibrated spectra of shape (pairs, 2, channels), frequency and mask of pairs with bad
+    system temperature
+    """
+    l_spec = len(frequency)
+    avg_interval = 0.5  # inner 50%
+    s_i = int(l_spec / 2 - l_spec * avg_interval / 2)
+    e_i = int(l_spec / 2 + l_spec * avg_interval / 2)
+
+    ta = np.empty((spectra.shape[0], 2, e_i - s_i))
+    tsys_sig = tsys[:, 0, :, np.newaxis]
+    tsys_ref = tsys[:, 1, :, np.newaxis]
+    for shift in np.unique(n_shift):
+        pairs = n_shift == shift
+        sig_spectra = shifted_channels(spectra[pairs], s_i, e_i, shift)
+        ta_sig = (sig_spectra[:, 0] - sig_spectra[:, 1]) / sig_spectra[:, 1] * tsys_ref[pairs]
+        ref_spectra = shifted_channels(spectra[pairs], s_i, e_i, -shift)
+        ta_ref = (ref_spectra[:, 1] - ref_spectra[:, 0]) / ref_spectra[:, 0] * tsys_sig[pairs]
+        ta[pairs] = (ta_sig + ta_ref) / 2
+
+    bad_pairs = np.any((tsys < 0) | (tsys > 300), axis=(1, 2))
+
+    gain = np.polyval(g_el, elevation)
+    ta *= k / (np.asarray(dpfu)[np.newaxis, :, np.newaxis] * gain[:, np.newaxis, np.newaxis])
+    return ta, frequency[s_i:e_i], bad_pairs
+
+
+def get_base_frequency(config, line):
+    """
+
+    :param config: runtime context
+    :param line: line
+    :return: specie and laboratory frequency of line in Hz from base_frequencies_SDR
+    """
+    base_frequency = config.get_list('base_frequencies_SDR', "f" + line)
+    return base_frequency[1], float(base_frequency[0]) * 10 ** 9
+
+
+@traced()
+def reduce_dbbc_iteration(source, line, iteration_number, log_file,
+                          config_file_path="config/config.cfg", bad_scan_policy="skip"):
+    """
+    Process DBBC iteration without GUI, iteration data directory has name of log file
+    without extension and one data file per scan
+
+    :param source: source
+    :param line: frequency
+    :param iteration_number: iteration number
+    :param log_file: log file name
+    :param config_file_path: configuration file path
+    :param bad_scan_policy: skip - leave out scan pairs with bad system temperature,
+    delete - also delete data files of these scan pairs
+    :return: output file name
+    """
+    source = str(source)
+    line = str(line)
+    iteration_number = str(iteration_number)
+    config = RuntimeContext(None, config_file_path)
+    cuts = config.get_cuts(source + "_" + line)
+    ra_str, dec_str = config.get_source_catalog().get_coordinates(source)
+    specie, line_f = get_base_frequency(config, line)
+
+    logs = read_dbbc_log(config.get_config("paths", "logPath") + "DBBC/" + log_file,
+                         config.get_config("paths", "prettyLogsPath") + source + "_" + iteration_number)
+    station = logs.get_station_name()
+    dpfu, g_el, _, k = config.get_calibration_parameters("_16" if station == "IRBENE16" else "")
+    x, y, z = config.get_station_coordinates(station)
+    data_dir = config.get_config("paths", "dataFilePath") + os.path.splitext(log_file)[0] + "/"
+    data_files = find_dbbc_files(data_dir)
+    all_scan_pairs = create_dbbc_pairs(logs, data_files)
+    if len(all_scan_pairs) == 0:
+        raise ValueError("Iteration " + iteration_number + " has no scan pairs")
+
+    pair_indexes = np.array([logs.get_indexes(pair) for pair in all_scan_pairs])
+    with trace_span("lsr", pairs=len(all_scan_pairs)):
+        vel_totals = get_lsr_engine(ra_str, dec_str, x, y, z).lsr([logs.dates[index[0]] for index in pair_indexes])
+
+    scan_pairs = []
+    tsys_list = []
+    pair_accumulator = None
+    for start in range(0, len(all_scan_pairs), PAIRS_PER_BLOCK):
+        pairs = all_scan_pairs[start:start + PAIRS_PER_BLOCK]
+        indexes = pair_indexes[start:start + PAIRS_PER_BLOCK]
+        with trace_span("read_scan_pairs", pairs=len(pairs)):
+            frequency_a, spectra = read_dbbc_pairs(data_dir, data_files, pairs)
+        tsys = logs.tsys[indexes]
+        with trace_span("dbbc_calibration", pairs=len(pairs)):
+            sf, frequency, bad_pairs = dbbc_calibration_batch(
+                spectra, frequency_a, tsys, get_shift_channels(frequency_a, logs.fs_frequency[indexes]),
+                np.mean(logs.elevation[indexes], axis=1), dpfu, g_el, k)
+
+        for index, pair in enumerate(pairs):
+            # reference scan first as in SDR system temperature output
+            pair_tsys = tsys[index][::-1].ravel()
+            if bad_pairs[index]:
+                report_bad_system_temperature(pair_tsys)
+                delete_data_files([data_dir + data_files[scan] for scan in pair], bad_scan_policy)
+            else:
+                scan_pairs.append(pair)
+                tsys_list.append(pair_tsys)
+
+        if pair_accumulator is None:
+            velocity = dopler((frequency + logs.frequency_start[pair_indexes[0, 0]]) * (10 ** 6), 0, line_f)
+            pair_accumulator = PairAccumulator(velocity, dict(zip(all_scan_pairs, vel_totals)), cuts)
+        with trace_span("accumulate", pairs=len(pairs)):
+            pair_accumulator.add_many([pair for index, pair in enumerate(pairs) if not bad_pairs[index]],
+                                      sf[~bad_pairs])
+
+    if len(scan_pairs) == 0:
+        raise ValueError("Iteration " + iteration_number + " has no valid scan pairs")
+
+    velocities_avg, y__left_avg, y__right_avg = pair_accumulator.get_average()
+    left_variance, right_variance = pair_accumulator.get_variance()
+    print("Average signal to noise for left polarization", np.mean(pair_accumulator.ston_list_left))
+    print("Average signal to noise for right polarization", np.mean(pair_accumulator.ston_list_right))
+    print("Average signal to noise for average polarization", np.mean(pair_accumulator.ston_list_avg))
+
+    scan_date = logs.dates[logs.scan_index[scan_pairs[-1][0]]]
+    sys_temp_out = np.column_stack([[int(pair[0]) for pair in scan_pairs], tsys_list])
+    total_results = np.transpose(np.array([velocities_avg, y__left_avg, y__right_avg]))
+    result_file_name = get_output_file_name(config.get_config("paths", "outputFilePath"), source, line,
+                                            get_mjd(scan_date), station, iteration_number)
+    write_output_file(result_file_name, sys_temp_out, total_results, specie,
+                      np.transpose(np.array([velocities_avg, left_variance, right_variance])))
+    return result_file_name
+
+
+def main():
+    """
+
+    :return: None
+    """
+    if get_args("trace") != "None":
+        start_trace(get_args("trace"), "dbbc_fs.py")
+
+    reduce_dbbc_iteration(get_args("source"), get_args("line"), get_args("iteration_number"),
+                          get_args("log_file"), get_args("config"), get_args("badScans"))
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
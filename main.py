@@ -2,16 +2,22 @@
 # -*- coding: utf-8 -*-
 
 """
-run scripts sdr_fs.py and total_spectrum_analyzer_qt5.py for all unprocessed experiments
+run scripts sdr_fs.py or dbbc_fs.py and total_spectrum_analyzer_qt5.py for all unprocessed experiments
 """
 import os
 import sys
 import argparse
-import json
 import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import coloredlogs
-import h5py
-from parsers.configparser_ import ConfigParser
+from parsers.runtime_context import get_runtime_context
+from utils.result_store import ResultStore
+from utils.processing_manifest import ProcessingManifest
+from utils.trace import start_trace, stop_trace, trace_span, get_part_file_name, \
+    remove_trace_parts, merge_trace_parts
+import sdr_fs
+import dbbc_fs
+import total_spectrum_analyzer_qt5
 
 coloredlogs.install(level='PRODUCTION')
 LOGGER = logging.getLogger('Main')
@@ -27,6 +33,16 @@ def parse_arguments():
     parser.add_argument("line", help="frequency", type=int)
     parser.add_argument("-c", "--config", help="Configuration "
                                                 "cfg file", type=str, default="config/config.cfg")
+    parser.add_argument("-w", "--workers", help="Number of iterations processed in parallel",
+                        type=int, default=os.cpu_count())
+    parser.add_argument("-bs", "--badScans", help="What to do with bad scans",
+                        type=str, default="skip", choices=["skip", "delete"])
+    parser.add_argument("-t", "--calibType", help="Type of calibration",
+                        type=str, default="SDR", choices=["SDR", "DBBC"])
+    parser.add_argument("-a", "--auto", help="Analyse output files without GUI", action="store_true")
+    parser.add_argument("--trace", help="Write stage timing of main.py, sdr_fs.py and "
+                                        "total_spectrum_analyzer_qt5.py to Chrome trace file",
+                        type=str, default=None)
     parser.add_argument("-v", "--version", action="version", version='%(prog)s - Version 3.0')
     args = parser.parse_args()
     return args
@@ -38,7 +54,7 @@ def get_args(key):
     :param key: argument key
     :return: to script passed argument value
     """
-    return str(parse_arguments().__dict__[key])
+    return get_runtime_context(parse_arguments).get_arg(key)
 
 
 def get_configs(section, key):
@@ -48,79 +64,79 @@ def get_configs(section, key):
     :param key: configuration file sections key
     :return: configuration file section key value
     """
-    config_file_path = get_args("config")
-    config = ConfigParser(config_file_path)
-    return config.get_config(section, key)
+    return get_runtime_context(parse_arguments).get_config(section, key)
 
 
-def get_iteration(dir_name):
-    """
-
-    :param dir_name:
-    :return: iteration number
-    """
-    return dir_name.split("_")[-1]
-
-
-def get_station(dir_name):
-    """
-
-    :param dir_name:
-    :return: station
-    """
-    return dir_name.split("_")[-2]
-
-
-def create_iteration_list(path, source, line):
-    """
-
-    :param line: frequency
-    :param source: source
-    :param path: input file path
-    :return: iterations list
-    """
-    stations = list(set(create_station_list(path, source, line)))
-    iterations_for_source_and_line = [file for file in os.listdir(path)
-                                      if source in file and line in file and os.path.isdir(path + file)]
-    iterations_for_station = {station: [] for station in stations} #{get_station(iteration):get_iteration(iteration) for iteration in os.listdir(path) if  source in iteration and line in iteration and os.path.isdir(path + iteration)}
-    for iteration in iterations_for_source_and_line:
-        iterations_for_station[get_station(iteration)].append(get_iteration(iteration))
-
-    for station in stations:
-        iterations_for_station[station].sort(key=int, reverse=False)
-
-    return iterations_for_station
-
-
-def create_station_list(path, source, line):
+def reduce_iteration(source_name, line, station, iteration, config_file_path, bad_scan_policy,
+                     trace_file_name=None, calib_type="SDR"):
     """
 
+    :param source_name: source
     :param line: frequency
-    :param source: source
-    :param path: input file path
-    :return: stations list
-    """
-    iterations = [file for file in os.listdir(path) if source in file and line in file and os.path.isdir(path + file)]
-    iterations.sort(key=get_iteration, reverse=False)
-    stations = [get_station(iteration) for iteration in iterations]
-    return stations
+    :param station: station label
+    :param iteration: iteration number
+    :param config_file_path: configuration file path
+    :param bad_scan_policy: what to do with bad scans
+    :param trace_file_name: trace file of main process, iteration spans are written to its trace part
+    :param calib_type: SDR or DBBC
+    :return: station, iteration, True if iteration was processed, output file name or error
+    """
+    reduction_module = dbbc_fs if calib_type == "DBBC" else sdr_fs
+    if trace_file_name is not None:
+        start_trace(get_part_file_name(trace_file_name, station + "_" + iteration),
+                    reduction_module.__name__ + ".py " + station + " " + iteration)
+    log_file = source_name + "_" + "f" + line + "_" + station + "_" + iteration + ".log"
+    try:
+        if calib_type == "DBBC":
+            output_file = dbbc_fs.reduce_dbbc_iteration(source_name, line, iteration, log_file,
+                                                        config_file_path, bad_scan_policy)
+        else:
+            output_file = sdr_fs.reduce_iteration(source_name, line, iteration, log_file,
+                                                  config_file_path, bad_scan_policy)
+    except Exception as error:
+        return station, iteration, False, type(error).__name__ + ": " + str(error)
+    finally:
+        stop_trace()
+    return station, iteration, True, output_file
 
 
-def create_log_file_list(path, source, line):
+def reduce_iterations(pending_iterations, source_name, line, workers):
     """
 
+    :param pending_iterations: list of station and iteration pairs
+    :param source_name: source
     :param line: frequency
-    :param path: log file path
-    :param source: source
-    :return: all log files for source
-    """
-    return [log for log in os.listdir(path) if log.startswith(source + "_") and line in log]
+    :param workers: number of worker processes
+    :return: results of reduce_iteration for each iteration
+    """
+    results = []
+    if len(pending_iterations) == 0:
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(reduce_iteration, source_name, line, station, iteration,
+                                   get_args("config"), get_args("badScans"),
+                                   get_runtime_context(parse_arguments).args.trace, get_args("calibType"))
+                   for station, iteration in pending_iterations]
+        for future in as_completed(futures):
+            station, iteration, success, message = future.result()
+            if success:
+                LOGGER.info("Iteration " + station + " " + iteration + " processed " + message)
+            else:
+                LOGGER.error("Iteration " + station + " " + iteration + " failed " + message)
+            results.append((station, iteration, success, message))
+    return results
 
 
 def main():
     """
-    :return: None
+    :return: True if all iterations were processed and analysed
     """
+    trace_file_name = get_runtime_context(parse_arguments).args.trace
+    if trace_file_name is not None:
+        remove_trace_parts(trace_file_name)
+        start_trace(trace_file_name, "main.py")
+
     source_name = get_args("source")
     line = get_args("line")
     data_files_path = get_configs('paths', "dataFilePath")
@@ -128,85 +144,72 @@ def main():
     log_path = get_configs('paths', "logPath")
     output_path = get_configs('paths', "outputFilePath")
 
-    if os.path.exists(data_files_path):
-        sdr_iterations = create_iteration_list(data_files_path, source_name, line)
-    else:
-        sdr_iterations = []
-
-    log_path = log_path + "SDR/"
-    logfile_list = create_log_file_list(log_path, source_name, line)
-    result_file_name = result_path + source_name + "_" + get_args("line") + ".json"
-
-    if os.path.isfile(result_file_name):
-        pass
-    else:
-        os.system("touch " + result_file_name)
-        result_file = open(result_file_name, "w")
-        result_file.write("{ \n" + "\n}")
-        result_file.close()
-
-    with open(result_file_name, "r") as result_data:
-        result = json.load(result_data)
-
-    stations = list(set(create_station_list(data_files_path, source_name, line)))
-    processed_iteration = {station: [] for station in stations}
-    processed_iteration2 = {station: [] for station in stations}
-    for experiment in result:
-        if get_station(experiment) == "IRBENE16":
-            station = "ib"
-        else:
-            station = "ir"
-
-        iteration_in_result = experiment.split("_")[-1]
-        if iteration_in_result in sdr_iterations[station] and \
-                iteration_in_result not in \
-                processed_iteration[station] and result[experiment]["type"] == "SDR":
-            processed_iteration[station].append(get_iteration(experiment))
-
-        if iteration_in_result in processed_iteration[station] and \
-                result[experiment]["type"] == "SDR" and result[experiment]["flag"]:
-            processed_iteration[station].remove(iteration_in_result)
-
-        if iteration_in_result not in processed_iteration2[station] and result[experiment]["type"] == "SDR":
-            processed_iteration2[station].append(iteration_in_result)
-
-    for station in stations:
-        processed_iteration[station].sort(key=int, reverse=False)
-        processed_iteration2[station].sort(key=int, reverse=False)
-
-    for station in stations:
-        for iteration in sdr_iterations[station]:
-            if iteration not in processed_iteration[station]:
-                log_file = source_name + "_" + "f" + line + "_" + station + "_" + iteration + ".log"
-                sdr_fs_parameter = source_name + " " + line + " " + iteration + " " + log_file
-                LOGGER.info("Executing python3 " + "sdr_fs.py " + sdr_fs_parameter)
-                os.system("python3 " + "sdr_fs.py " + sdr_fs_parameter)
-
-                if not os.path.exists(log_path + "/" + log_file):
-                    LOGGER.warning("Warning log file " + log_file + " do not exist")
-
-    output_files = os.listdir(output_path + "/" + line + "/" + source_name)
-    for output_file in output_files:
-        output_file_station = output_file.split("_")[-2].split(".")[0]
-        output_file_iteration = output_file.split("_")[-1].split(".")[0]
-        if output_file_station == "IRBENE16":
-            station = "ib"
-        else:
-            station = "ir"
-
-        if output_file_iteration not in processed_iteration2[station]:
-            if output_file.startswith(source_name):
-                with h5py.File(get_configs("paths", "outputFilePath") + get_args("line") +
-                               "/" + get_args("source") + "/" + output_file, "r") as input_data_file:
-                    input_file_keys = list(input_data_file.keys())
-                    input_data_file.close()
-                    if "amplitude" in input_file_keys:
-                        LOGGER.info("Executing python3 " +
-                                   "total_spectrum_analyzer_qt5.py " + output_file + " " + line)
-                        os.system("python3 " +
-                                  "total_spectrum_analyzer_qt5.py " + output_file + " " + line)
+    calib_type = get_args("calibType")
+    log_path = log_path + calib_type + "/"
+    output_dir = output_path + "/" + line + "/" + source_name
+    with ResultStore(result_path, source_name, line) as result_store:
+        result_states = result_store.get_states(type_of_observation=calib_type)
+
+    with trace_span("update_manifest"):
+        manifest = ProcessingManifest(result_path, source_name, line)
+        manifest.update_results(result_states)
+        manifest.update_raw_data(data_files_path)
+        manifest.update_output_files(output_dir)
+
+    pending_iterations = manifest.get_pending_reductions()
+    for station, iteration in pending_iterations:
+        log_file = source_name + "_" + "f" + line + "_" + station + "_" + iteration + ".log"
+        if not os.path.exists(log_path + "/" + log_file):
+            LOGGER.warning("Warning log file " + log_file + " do not exist")
+
+    workers = max(1, int(get_args("workers")))
+    LOGGER.info("Processing " + str(len(pending_iterations)) + " iterations with " +
+                str(workers) + " workers")
+    with trace_span("reduce_iterations", iterations=len(pending_iterations)):
+        results = reduce_iterations(pending_iterations, source_name, line, workers)
+    failed_iterations = [result for result in results if not result[2]]
+    LOGGER.info("Processed " + str(len(results) - len(failed_iterations)) + " of " +
+                str(len(results)) + " iterations")
+    for station, iteration, _, message in sorted(failed_iterations, key=lambda r: (r[0], int(r[1]))):
+        LOGGER.error("Failed iteration " + station + " " + iteration + ": " + message)
+    for station, iteration, success, output_file in results:
+        if success:
+            manifest.set_calibrated(station, iteration, output_file)
+
+    manifest.update_output_files(output_dir)
+    failed_analysis = []
+    for output_file in manifest.get_pending_analysis():
+        if get_args("auto") == "True":
+            LOGGER.info("Analysing " + output_file)
+            try:
+                total_spectrum_analyzer_qt5.analyze_output_file(output_file, line, get_args("config"), calib_type)
+            except Exception as error:
+                LOGGER.error("Analysis of " + output_file + " failed " + type(error).__name__ + ": " + str(error))
+                failed_analysis.append(output_file)
+            continue
+
+        trace_option = ""
+        if trace_file_name is not None:
+            trace_option = " --trace " + get_part_file_name(trace_file_name,
+                                                                "analysis_" + os.path.basename(output_file))
+        LOGGER.info("Executing python3 " +
+                    "total_spectrum_analyzer_qt5.py " + output_file + " " + line + " -t " + calib_type)
+        with trace_span("total_spectrum_analyzer_qt5.py", output_file=output_file):
+            os.system("python3 " +
+                      "total_spectrum_analyzer_qt5.py " + output_file + " " + line +
+                      " -t " + calib_type + trace_option)
+    manifest.close()
+
+    if trace_file_name is not None:
+        stop_trace()
+        merge_trace_parts(trace_file_name)
+        LOGGER.info("Trace is written to " + trace_file_name)
+
+    return len(failed_iterations) == 0 and len(failed_analysis) == 0
 
 
 if __name__ == "__main__":
-    main()
-    sys.exit(0)
+    if main():
+        sys.exit(0)
+    else:
+        sys.exit(1)
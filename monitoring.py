@@ -7,11 +7,9 @@ Monitoring tool
 import sys
 import os
 import argparse
-import json
 import numpy as np
 from matplotlib import ticker
 from astropy.timeseries import LombScargle
-from astropy.io import ascii
 from astropy.time import Time
 import matplotlib.tri as mtri
 import h5py
@@ -21,7 +19,9 @@ from PyQt5.QtGui import QIcon
 from PyQt5.QtCore import Qt
 from utils.ploting_qt5 import Plot
 from utils.help import find_nearest_index
-from parsers.configparser_ import ConfigParser
+from utils.result_store import ResultStore
+from utils.monitoring_cube import MonitoringCube, get_cube_file_name
+from parsers.runtime_context import get_runtime_context
 
 
 def parse_arguments():
@@ -44,7 +44,7 @@ def get_args(key):
     :param key: argument key
     :return: to script passed argument value
     """
-    return str(parse_arguments().__dict__[key])
+    return get_runtime_context(parse_arguments).get_arg(key)
 
 
 def get_configs(section, key):
@@ -54,9 +54,7 @@ def get_configs(section, key):
     :param key: configuration file sections key
     :return: configuration file section key value
     """
-    config_file_path = get_args("config")
-    config = ConfigParser(config_file_path)
-    return config.get_config(section, key)
+    return get_runtime_context(parse_arguments).get_config(section, key)
 
 
 def create_label(experiment):
@@ -184,11 +182,8 @@ class MonitoringView(PlottingView):
         self.flags = []
         self.un_flags = []
 
-        result_path = get_configs("paths", "resultFilePath")
-        result_file_name = self.source + "_" + self.line + ".json"
-
-        with open(result_path + "/" + result_file_name) as result_file:
-            result_data = json.load(result_file)
+        with ResultStore(get_configs("paths", "resultFilePath"), self.source, self.line) as result_store:
+            result_data = result_store.load()
 
         self.experiments = [MonitoringView.Experiment(**result_data[experiment])
                             for experiment in result_data]
@@ -199,13 +194,13 @@ class MonitoringView(PlottingView):
 
         self.monitoring_plot = Plot()
         self.monitoring_plot.creatPlot(self.grid, "Time", "Flux density (Jy)",
-                                       get_configs("Full_source_name", source), (1, 0), "log")
+                                       get_runtime_context(parse_arguments).get_full_source_name(source),
+                                       (1, 0), "log")
 
         symbols = ["*", "o", "v", "^", "<", ">", "1", "2", "3", "4"]
         colors = ['b', 'g', 'r', 'c', 'm', 'y', 'k', 'w']
         self.dates = [np.float(e.modifiedJulianDays) for e in self.experiments]
-        self.source_velocities = get_configs('velocities', self.source + "_" + self.line).split(",")
-        self.source_velocities = [x.strip() for x in self.source_velocities]
+        self.source_velocities = get_runtime_context(parse_arguments).get_velocities(self.source + "_" + self.line)
         monitoring_results = [np.array([self.dates])]
         self.iterations = [e.Iteration_number for e in self.experiments]
 
@@ -273,17 +268,12 @@ class MonitoringView(PlottingView):
             this_line = event.artist
             xdata = this_line.get_xdata()
             ydata = this_line.get_ydata()
-            result_path = get_configs("paths", "resultFilePath")
-            result_file_name = self.source + "_" + self.line + ".json"
             iteration = self.iterations[ind]
             time = [e.time for e in self.experiments][ind]
             date = [e.Date for e in self.experiments][ind]
             mjd = [e.modifiedJulianDays for e in self.experiments][ind]
             station = [e.location for e in self.experiments][ind]
 
-            with open(result_path + result_file_name) as result_data:
-                results = json.load(result_data)
-
             if event.mouseevent.button == 1:
                 output_file = get_configs("paths", "outputFilePath") + self.line + "/" + self.source + "/" + \
                               self.source + "_" + str(mjd) + "_" + \
@@ -322,16 +312,7 @@ class MonitoringView(PlottingView):
                         self.flags.pop(unflag_index)
                         self.monitoring_plot.canvasShow()
 
-                        for experiment in results:
-                            if experiment.endswith("_" + str(iteration)) and \
-                                    results[experiment]["time"].replace(":", "_") + "_" + \
-                                    results[experiment]["Date"] == time.replace(":", "_") + "_" + date:
-                                results[experiment]["flag"] = False
-                                print(experiment, "is un flag")
-
-                        with open(get_configs("paths", "resultFilePath") +
-                                  result_file_name, "w") as result_data:
-                            result_data.write(json.dumps(results, indent=2))
+                        self.set_flag(iteration, time, date, False)
 
                         self.un_flags.append((xdata[ind], ydata[ind]))
 
@@ -348,18 +329,30 @@ class MonitoringView(PlottingView):
                             index_tmp -= 1
                         self.un_flags.pop(index_tmp)
 
-                    for experiment in results:
-                        if experiment.endswith("_" + str(iteration)) and \
-                                results[experiment]["time"].replace(":", "_") + "_" + \
-                                results[experiment]["Date"] == time.replace(":", "_") + "_" + date:
-                            results[experiment]["flag"] = True
-                            print(experiment, "is flag")
-
-                    with open(get_configs("paths", "resultFilePath") +
-                              result_file_name, "w") as result_data:
-                        result_data.write(json.dumps(results, indent=2))
+                    self.set_flag(iteration, time, date, True)
                     self.flags.append((xdata[ind], ydata[ind]))
 
+    def set_flag(self, iteration, time, date, flag):
+        """
+
+        :param iteration: iteration number
+        :param time: observation time
+        :param date: observation date
+        :param flag: flag or un flag experiment
+        :return: None
+        """
+        with ResultStore(get_configs("paths", "resultFilePath"), self.source, self.line) as result_store:
+            results = result_store.find(iteration=iteration)
+            for experiment in results:
+                if experiment.endswith("_" + str(iteration)) and \
+                        results[experiment]["time"].replace(":", "_") + "_" + \
+                        results[experiment]["Date"] == time.replace(":", "_") + "_" + date:
+                    result_store.update(experiment, flag=flag)
+                    if flag:
+                        print(experiment, "is flag")
+                    else:
+                        print(experiment, "is un flag")
+
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_Shift:
             self.new_spectre = True
@@ -480,7 +473,7 @@ class SpecterView(PlottingView):
         self.source = source
         self.polarization = polarization
         self.plot_set = set()
-        source_name = get_configs("Full_source_name", self.source)
+        source_name = get_runtime_context(parse_arguments).get_full_source_name(self.source)
 
         self.specter_plot = Plot()
         self.specter_plot.creatPlot(self.grid, "Velocity (km sec$^{-1}$)",
@@ -616,22 +609,15 @@ class MapsView(PlottingView):
         self.mjd = mjd
         self.source = source
         self.line = line
-        self.output_files = os.listdir(get_configs("paths", "outputFilePath") + self.line + "/" + self.source)
-        self.output_files = [of for of in self.output_files if of.startswith(self.source)]
-
         days = self.mjd[-1] - self.mjd[0]
-        sources_vrange = ascii.read('DB_vrange.csv')
-        source_vrange_index = sources_vrange['name'].tolist().index(self.source)
-        vmin = dict(sources_vrange)["vmin"][source_vrange_index]
-        vmax = dict(sources_vrange)["vmax"][source_vrange_index]
+        vmin, vmax = get_runtime_context(parse_arguments).get_source_catalog().get_velocity_range(self.source)
 
-        if vmin is None or vmax is None:
-            vmin, vmax, velocity, observed_flux, observed_time = self.get_max_min_velocity(vmin, vmax)
-
-        else:
-            _, _, velocity, observed_flux, observed_time = self.get_max_min_velocity(vmin, vmax)
+        monitoring_cube = MonitoringCube(get_cube_file_name(get_configs("paths", "monitoringFilePath"),
+                                                            self.source, self.line), vmin=vmin, vmax=vmax)
+        monitoring_cube.update(get_configs("paths", "outputFilePath") + self.line + "/" + self.source, self.source)
+        velocity, observed_time, observed_flux = self.get_map_points(monitoring_cube)
 
-        observed_flux = list(np.array(observed_flux).clip(min=1.5))
+        observed_flux = observed_flux.clip(min=1.5)
         triang = mtri.Triangulation(velocity, observed_time)
 
         self.map_plot = Plot()
@@ -647,38 +633,17 @@ class MapsView(PlottingView):
         cbar.locator = ticker.LogLocator()
         self.add_widget(self.map_plot, 0, 0)
 
-    def get_max_min_velocity(self, vmin, vmax):
-        max_velocitys = []
-        min_velocitys = []
-        velocity_ = []
-        observed_flux = []
-        observed_time = []
-
-        for file in self.output_files:
-            data_file = h5py.File(get_configs("paths", "outputFilePath") +
-                                  self.line + "/" +
-                                  self.source + "/" + file, "r")
-            if "amplitude_corrected_not_smooht" in data_file:
-                data = data_file["amplitude_corrected_not_smooht"][()]
-                velocity = data[:, 0]
-                amplitude = data[:, 3]
-                mjd = file.split("_")[1]
-
-                max_velocitys.append(max(velocity))
-                min_velocitys.append(min(velocity))
-
-                for i in range(0, len(velocity)):
-                    if vmin or vmax:
-                        if vmin <= velocity[i] <= vmax:
-                            velocity_.append(velocity[i])
-                            observed_flux.append(amplitude[i])
-                            observed_time.append(np.float(mjd))
-                    else:
-                        velocity_.append(velocity[i])
-                        observed_flux.append(amplitude[i])
-                        observed_time.append(np.float(mjd))
+    @staticmethod
+    def get_map_points(monitoring_cube):
+        """
 
-        return max(max_velocitys), min(min_velocitys), velocity_, observed_flux, observed_time
+        :param monitoring_cube: monitoring cube of source
+        :return: velocity, time and average polarization flux of all observed points
+        """
+        velocity, mjd, amplitude = monitoring_cube.read("avg")
+        velocity, mjd = np.meshgrid(velocity, mjd)
+        observed = ~np.isnan(amplitude)
+        return velocity[observed], mjd[observed], amplitude[observed]
 
 
 def main():
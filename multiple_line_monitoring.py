@@ -7,7 +7,6 @@ Display monitoring for multiple sources
 import sys
 import argparse
 import re
-import json
 from sympy import lambdify
 from tabulate import tabulate
 import numpy as np
@@ -17,8 +16,9 @@ from matplotlib.widgets import Slider, TextBox, Button
 from pandas import DataFrame
 from scipy import stats
 
-from parsers.configparser_ import ConfigParser
+from parsers.runtime_context import get_runtime_context
 from utils.help import find_nearest_index
+from utils.result_store import ResultStore
 
 
 def parse_arguments():
@@ -43,7 +43,7 @@ def get_args(key):
     :param key: argument key
     :return: to script passed argument value
     """
-    return str(parse_arguments().__dict__[key])
+    return get_runtime_context(parse_arguments).get_arg(key)
 
 
 def get_configs(section, key):
@@ -53,9 +53,7 @@ def get_configs(section, key):
     :param key: configuration file sections key
     :return: configuration file section key value
     """
-    config_file_path = get_args("config")
-    config = ConfigParser(config_file_path)
-    return config.get_config(section, key)
+    return get_runtime_context(parse_arguments).get_config(section, key)
 
 
 def get_velocities_tmp(source):
@@ -138,10 +136,8 @@ def get_iterations_from_mjd(star_time, stop_time):
     result_file_path = get_configs("paths", "resultFilePath")
 
     for source in source_list:
-        result_file = result_file_path + source + "_" + get_args("line") + ".json"
-
-        with open(result_file) as result_data:
-            result = json.load(result_data)
+        with ResultStore(result_file_path, source, get_args("line")) as result_store:
+            result = result_store.load()
             modified_julian_days = []
             iteration_numbers = []
             for observation in result:
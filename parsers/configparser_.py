@@ -1,8 +1,25 @@
 """
 parse configure files
 """
+import os
 import configparser
 
+PARSED_CONFIGS = dict()
+
+
+def read_config(config_file_path):
+    """
+
+    :param config_file_path: configuration file path
+    :return: parsed configuration file, file is parsed again only if it was modified
+    """
+    modification_time = os.stat(config_file_path).st_mtime_ns if os.path.isfile(config_file_path) else None
+    if config_file_path not in PARSED_CONFIGS or PARSED_CONFIGS[config_file_path][0] != modification_time:
+        config = configparser.RawConfigParser()
+        config.read(config_file_path)
+        PARSED_CONFIGS[config_file_path] = (modification_time, config)
+    return PARSED_CONFIGS[config_file_path][1]
+
 
 class Singleton(type):
     """
@@ -26,8 +43,7 @@ class ConfigParser(metaclass=Singleton):
     def __init__(self, config_file_path):
         if config_file_path is not None:
             self._config_file_path = config_file_path
-            self._config = configparser.RawConfigParser()
-            self._config.read(self._config_file_path)
+            self._config = read_config(self._config_file_path)
 
     def get_config(self, section, key):
         """
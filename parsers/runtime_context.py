@@ -0,0 +1,181 @@
+"""
+script arguments and configuration parsed once per process
+"""
+from parsers.configparser_ import read_config
+from parsers.source_catalog import load_source_catalog
+
+RUNTIME_CONTEXTS = dict()
+
+
+class RuntimeContext:
+    """
+    parsed script arguments and configuration file with typed config values
+    """
+
+    def __init__(self, args, config_file_path=None):
+        self.args = args
+        if config_file_path is None:
+            config_file_path = getattr(args, "config", None)
+        self.config_file_path = config_file_path
+        self._config = None
+        self._values = dict()
+
+    @property
+    def config(self):
+        """
+
+        :return: parsed configuration file, file is read once per context
+        """
+        if self._config is None:
+            self._config = read_config(self.config_file_path)
+        return self._config
+
+    def get_arg(self, key):
+        """
+
+        :param key: argument key
+        :return: to script passed argument value
+        """
+        return str(self.args.__dict__[key])
+
+    def get_config(self, section, key):
+        """
+
+        :param section: configuration file section
+        :param key: configuration file sections key
+        :return: configuration file section key value
+        """
+        return self.config.get(section, key)
+
+    def get_items(self, section):
+        """
+
+        :param section: configuration file section
+        :return: all items from configuration file section
+        """
+        return dict(self.config.items(section))
+
+    def _get_value(self, section, key, convert):
+        """
+
+        :param section: configuration file section
+        :param key: configuration file sections key
+        :param convert: function to convert configuration value
+        :return: converted configuration value, value is converted once per context
+        """
+        if (section, key) not in self._values:
+            self._values[(section, key)] = convert(self.get_config(section, key))
+        return self._values[(section, key)]
+
+    def get_float(self, section, key):
+        """
+
+        :param section: configuration file section
+        :param key: configuration file sections key
+        :return: configuration value as float
+        """
+        return self._get_value(section, key, float)
+
+    def get_int(self, section, key):
+        """
+
+        :param section: configuration file section
+        :param key: configuration file sections key
+        :return: configuration value as int
+        """
+        return self._get_value(section, key, int)
+
+    def get_list(self, section, key):
+        """
+
+        :param section: configuration file section
+        :param key: configuration file sections key
+        :return: comma separated configuration value as list of stripped strings
+        """
+        return self._get_value(section, key, lambda value: [v.strip() for v in value.split(",")])
+
+    def get_floats(self, section, key):
+        """
+
+        :param section: configuration file section
+        :param key: configuration file sections key
+        :return: comma separated configuration value as list of floats
+        """
+        return self._get_value(section, key, lambda value: [float(v) for v in value.split(",")])
+
+    def get_source_catalog(self):
+        """
+
+        :return: source catalog of configuration file
+        """
+        return load_source_catalog(self.config_file_path)
+
+    def get_cuts(self, source_line):
+        """
+
+        :param source_line: source name and line joined with underscore
+        :return: signal regions as list of [start, stop] velocities
+        """
+        return self.get_source_catalog().get_cuts(source_line)
+
+    def get_velocities(self, source_line):
+        """
+
+        :param source_line: source name and line joined with underscore
+        :return: maser component velocities as strings
+        """
+        return self.get_source_catalog().get_velocities(source_line)
+
+    def get_gauss_lines(self, source_line):
+        """
+
+        :param source_line: source name and line joined with underscore
+        :return: gauss line velocities as strings
+        """
+        return self.get_source_catalog().get_gauss_lines(source_line)
+
+    def get_full_source_name(self, source):
+        """
+
+        :param source: source name
+        :return: full source name
+        """
+        return self.get_source_catalog().get_full_name(source)
+
+    def get_station_coordinates(self, station):
+        """
+
+        :param station: station name
+        :return: station x, y, z coordinates
+        """
+        return tuple(self.get_floats("stations", station))
+
+    def get_source_coordinates(self, source):
+        """
+
+        :param source: source name
+        :return: source right ascension, declination and epoch strings
+        """
+        return self.get_source_catalog().get_source_coordinates(source)
+
+    def get_calibration_parameters(self, station_suffix=""):
+        """
+
+        :param station_suffix: empty for 32 m antenna, "_16" for 16 m antenna
+        :return: DPFU, gain elevation polynomial, Tcal and k
+        """
+        return self.get_floats("parameters", "DPFU_max" + station_suffix), \
+               self.get_floats("parameters", "G_El" + station_suffix), \
+               self.get_float("parameters", "Tcal" + station_suffix), \
+               self.get_float("parameters", "k" + station_suffix)
+
+
+def get_runtime_context(parse_arguments):
+    """
+
+    :param parse_arguments: script function that parses arguments
+    :return: runtime context, arguments are parsed once per script
+    """
+    if parse_arguments not in RUNTIME_CONTEXTS:
+        RUNTIME_CONTEXTS[parse_arguments] = RuntimeContext(parse_arguments())
+    return RUNTIME_CONTEXTS[parse_arguments]
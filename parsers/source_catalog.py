@@ -0,0 +1,321 @@
+"""
+source catalog compiled from configuration file and velocity ranges
+"""
+import os
+import csv
+import pickle
+import numpy as np
+from parsers.configparser_ import read_config
+
+CATALOG_FILE_SUFFIX = "_catalog.pickle"
+VRANGE_FILE_NAME = "DB_vrange.csv"
+CATALOG_VERSION = 1
+SOURCE_CATALOGS = dict()
+
+
+def get_catalog_file_name(config_file_path):
+    """
+
+    :param config_file_path: configuration file path
+    :return: source catalog cache file next to configuration file
+    """
+    return os.path.splitext(config_file_path)[0] + CATALOG_FILE_SUFFIX
+
+
+def get_file_stamp(file_name):
+    """
+
+    :param file_name: file name
+    :return: absolute path, modification time and size of file or None if file does not exist
+    """
+    if not os.path.isfile(file_name):
+        return os.path.abspath(file_name), None, None
+    file_stat = os.stat(file_name)
+    return os.path.abspath(file_name), file_stat.st_mtime_ns, file_stat.st_size
+
+
+def convert_coordinates(ra, dec):
+    """
+
+    :param ra: right ascension like 060840.65
+    :param dec: declination like 213107.0 or -052337.1
+    :return: right ascension and declination strings like 06h08m40.65s, +21d31m07.0s and degrees
+    """
+    ra_str = ra[0:2] + "h" + ra[2:4] + "m" + ra[4:] + "s"
+    if dec[0] == "-":
+        dec_parts = [dec[0:3], dec[3:5], dec[5:]]
+    else:
+        dec_parts = [dec[0:2], dec[2:4], dec[4:]]
+
+    if int(dec_parts[0]) > 0:
+        dec_str = "+" + dec_parts[0] + "d" + dec_parts[1] + "m" + dec_parts[2] + "s"
+    else:
+        dec_str = dec_parts[0] + "d" + dec_parts[1] + "m" + dec_parts[2] + "s"
+
+    ra_deg = (float(ra[0:2]) + float(ra[2:4]) / 60 + float(ra[4:]) / 3600) * 15
+    dec_sign = -1 if dec[0] == "-" else 1
+    dec_deg = dec_sign * (abs(float(dec_parts[0])) + float(dec_parts[1]) / 60 + float(dec_parts[2]) / 3600)
+    return ra_str, dec_str, ra_deg, dec_deg
+
+
+def read_vrange(vrange_file_name):
+    """
+
+    :param vrange_file_name: velocity range file
+    :return: dict of source and velocity range strings
+    """
+    if not os.path.isfile(vrange_file_name):
+        return dict()
+    with open(vrange_file_name, "r", newline="") as vrange_file:
+        return {row["name"]: (row["vmin"], row["vmax"]) for row in csv.DictReader(vrange_file)}
+
+
+def compile_catalog(config, vrange):
+    """
+    Parse and validate source sections of configuration file, entries which can not be
+    parsed are left out of catalog and reported in catalog errors
+
+    :param config: parsed configuration file
+    :param vrange: dict of source and velocity range strings
+    :return: catalog dict
+    """
+    sources = dict()
+    lines = dict()
+    errors = list()
+
+    def section_items(section):
+        return config.items(section) if config.has_section(section) else []
+
+    for source, value in section_items("sources"):
+        sources[source] = {"coordinates": None, "ra": None, "dec": None, "ra_deg": None, "dec_deg": None,
+                           "full_name": None, "vmin": None, "vmax": None}
+        if value.strip() == "":
+            continue
+        fields = [field.strip() for field in value.split(",")]
+        try:
+            ra_str, dec_str, ra_deg, dec_deg = convert_coordinates(fields[0], fields[1])
+        except (ValueError, IndexError):
+            errors.append("sources " + source + ": coordinates " + value + " can not be parsed")
+            continue
+        sources[source].update({"coordinates": fields, "ra": ra_str, "dec": dec_str,
+                                "ra_deg": ra_deg, "dec_deg": dec_deg})
+
+    for source, full_name in section_items("Full_source_name"):
+        if source in sources:
+            sources[source]["full_name"] = full_name
+        elif full_name.strip() != "":
+            errors.append("Full_source_name " + source + ": source is not in sources")
+
+    for source, (vmin, vmax) in vrange.items():
+        if source not in sources:
+            errors.append(VRANGE_FILE_NAME + " " + source + ": source is not in sources")
+            continue
+        if vmin.strip() == "" or vmax.strip() == "":
+            continue
+        try:
+            sources[source]["vmin"] = float(vmin)
+            sources[source]["vmax"] = float(vmax)
+        except ValueError:
+            errors.append(VRANGE_FILE_NAME + " " + source + ": velocity range can not be parsed")
+
+    def get_line(source_line):
+        if source_line.rsplit("_", 1)[0] not in sources:
+            errors.append(source_line + ": source is not in sources")
+        return lines.setdefault(source_line, {"velocities": None, "velocity_values": None,
+                                              "cuts": None, "gauss_lines": None})
+
+    for source_line, value in section_items("velocities"):
+        velocities = [velocity.strip() for velocity in value.split(",")]
+        try:
+            velocity_values = np.array([float(velocity) for velocity in velocities])
+        except ValueError:
+            errors.append("velocities " + source_line + ": " + value + " can not be parsed")
+            continue
+        line = get_line(source_line)
+        line["velocities"] = velocities
+        line["velocity_values"] = velocity_values
+
+    for source_line, value in section_items("cuts"):
+        try:
+            cuts = [[float(v) for v in cut.split(",")] for cut in value.split(";")]
+        except ValueError:
+            errors.append("cuts " + source_line + ": " + value + " can not be parsed")
+            continue
+        if any(len(cut) != 2 for cut in cuts):
+            errors.append("cuts " + source_line + ": each cut must have start and stop velocity")
+            continue
+        get_line(source_line)["cuts"] = cuts
+
+    for source_line, value in section_items("gauss_lines"):
+        gauss_lines = value.replace(" ", "").split(",")
+        try:
+            [float(gauss_line) for gauss_line in gauss_lines]
+        except ValueError:
+            errors.append("gauss_lines " + source_line + ": " + value + " can not be parsed")
+            continue
+        get_line(source_line)["gauss_lines"] = gauss_lines
+
+    return {"sources": sources, "lines": lines, "errors": errors}
+
+
+class SourceCatalog:
+    """
+    Sources with parsed coordinates, full names and velocity ranges and source lines with
+    parsed velocities, cuts and gauss lines
+    """
+
+    def __init__(self, catalog):
+        self.sources = catalog["sources"]
+        self.lines = catalog["lines"]
+        self.errors = catalog["errors"]
+
+    def _get_line_value(self, source_line, key):
+        """
+
+        :param source_line: source name and line joined with underscore
+        :param key: line value key
+        :return: line value
+        """
+        value = self.lines.get(source_line, dict()).get(key)
+        if value is None:
+            raise KeyError(source_line + " has no " + key + " in source catalog")
+        return value
+
+    def _get_source_value(self, source, key):
+        """
+
+        :param source: source name
+        :param key: source value key
+        :return: source value
+        """
+        value = self.sources.get(source, dict()).get(key)
+        if value is None:
+            raise KeyError(source + " has no " + key + " in source catalog")
+        return value
+
+    def get_source_coordinates(self, source):
+        """
+
+        :param source: source name
+        :return: source right ascension, declination and epoch strings from configuration file
+        """
+        return list(self._get_source_value(source, "coordinates"))
+
+    def get_coordinates(self, source):
+        """
+
+        :param source: source name
+        :return: right ascension and declination strings
+        """
+        return self._get_source_value(source, "ra"), self._get_source_value(source, "dec")
+
+    def get_coordinates_degrees(self, source):
+        """
+
+        :param source: source name
+        :return: right ascension and declination in degrees
+        """
+        return self._get_source_value(source, "ra_deg"), self._get_source_value(source, "dec_deg")
+
+    def get_full_name(self, source):
+        """
+
+        :param source: source name
+        :return: full source name
+        """
+        return self._get_source_value(source, "full_name")
+
+    def get_velocity_range(self, source):
+        """
+
+        :param source: source name
+        :return: vmin and vmax, None if source has no velocity range
+        """
+        if source not in self.sources:
+            return None, None
+        return self.sources[source]["vmin"], self.sources[source]["vmax"]
+
+    def get_velocities(self, source_line):
+        """
+
+        :param source_line: source name and line joined with underscore
+        :return: maser component velocities as strings
+        """
+        return list(self._get_line_value(source_line, "velocities"))
+
+    def get_velocity_values(self, source_line):
+        """
+
+        :param source_line: source name and line joined with underscore
+        :return: maser component velocities
+        """
+        return self._get_line_value(source_line, "velocity_values")
+
+    def get_cuts(self, source_line):
+        """
+
+        :param source_line: source name and line joined with underscore
+        :return: signal regions as list of [start, stop] velocities
+        """
+        return [list(cut) for cut in self._get_line_value(source_line, "cuts")]
+
+    def get_cut_mask(self, source_line, velocity):
+        """
+
+        :param source_line: source name and line joined with underscore
+        :param velocity: velocity grid
+        :return: True for channels inside any signal region
+        """
+        cuts = np.sort(np.array(self._get_line_value(source_line, "cuts")), axis=1)
+        velocity = np.asarray(velocity)[:, None]
+        return np.any((velocity >= cuts[:, 0]) & (velocity <= cuts[:, 1]), axis=1)
+
+    def get_gauss_lines(self, source_line):
+        """
+
+        :param source_line: source name and line joined with underscore
+        :return: gauss line velocities as strings
+        """
+        return list(self._get_line_value(source_line, "gauss_lines"))
+
+
+def load_source_catalog(config_file_path, vrange_file_name=VRANGE_FILE_NAME, rebuild=False):
+    """
+    Source catalog is compiled again only if configuration file or velocity range file changed
+
+    :param config_file_path: configuration file path
+    :param vrange_file_name: velocity range file
+    :param rebuild: compile source catalog even if its cache is valid
+    :return: source catalog
+    """
+    stamps = (CATALOG_VERSION, get_file_stamp(config_file_path), get_file_stamp(vrange_file_name))
+    key = os.path.abspath(config_file_path)
+    if not rebuild and key in SOURCE_CATALOGS and SOURCE_CATALOGS[key][0] == stamps:
+        return SOURCE_CATALOGS[key][1]
+
+    catalog_file_name = get_catalog_file_name(config_file_path)
+    catalog = None
+    if not rebuild and os.path.isfile(catalog_file_name):
+        try:
+            with open(catalog_file_name, "rb") as catalog_file:
+                cached_stamps, cached_catalog = pickle.load(catalog_file)
+            if cached_stamps == stamps:
+                catalog = cached_catalog
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            catalog = None
+
+    if catalog is None:
+        catalog = compile_catalog(read_config(config_file_path), read_vrange(vrange_file_name))
+        for error in catalog["errors"]:
+            print("Source catalog:", error)
+        tmp_catalog_file_name = catalog_file_name + ".tmp"
+        try:
+            with open(tmp_catalog_file_name, "wb") as catalog_file:
+                pickle.dump((stamps, catalog), catalog_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_catalog_file_name, catalog_file_name)
+        except OSError as error:
+            print("Error: %s : %s" % (catalog_file_name, error.strerror))
+
+    source_catalog = SourceCatalog(catalog)
+    SOURCE_CATALOGS[key] = (stamps, source_catalog)
+    return source_catalog
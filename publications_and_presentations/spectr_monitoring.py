@@ -5,7 +5,6 @@
 create a plot for publications where spectra and monitoring plot are viewed side by side
 """
 import datetime
-import json
 
 import sys
 import os
@@ -23,6 +22,7 @@ SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.
 sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
 
 from parsers.configparser_ import ConfigParser
+from utils.result_store import ResultStore
 from utils.help import convert_datetime_object_to_mjd, file_len, correct_numpy_read_data
 
 
@@ -192,8 +192,8 @@ def main():
 
     ax2.plot([], [], ' ', label="km sec$^{-1}$")
 
-    with open(get_configs("paths", "resultFilePath") + "/" + get_args("source") + "_" + get_args("line") + ".json", "r") as result_data:
-        result_data = json.load(result_data)
+    with ResultStore(get_configs("paths", "resultFilePath"), get_args("source"), get_args("line")) as result_store:
+        result_data = result_store.load()
 
     rt32_observation_dates = old_dates
 
@@ -9,7 +9,6 @@ import sys
 import os
 import argparse
 import subprocess
-import json
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import QApplication, QWidget, QGridLayout, QDesktopWidget, QLabel, QToolButton, QPushButton
@@ -24,6 +23,7 @@ sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
 
 from utils.ploting_qt5 import Plot
 from parsers.configparser_ import ConfigParser
+from utils.result_store import ResultStore
 
 
 def parse_arguments():
@@ -98,9 +98,8 @@ class SpectreTime(QWidget):
         self.y_lim = None
         self.previous_line = None
         self.first_plot = False
-        result_file = get_configs("paths", "resultFilePath") + "/" + self.source_name + "_" + get_args("line") + ".json"
-        with open(result_file) as result_data:
-            self.results = json.load(result_data)
+        with ResultStore(get_configs("paths", "resultFilePath"), self.source_name, get_args("line")) as result_store:
+            self.results = result_store.load()
 
         self.spectre_plot = Plot()
         self.spectre_plot.creatPlot(self.grid, "Velocity (km sec$^{-1}$)", "Flux density (Jy)",
@@ -6,10 +6,9 @@ SDR output data processing tool
 """
 import sys
 import os
-import re
 import argparse
 from datetime import datetime
-from functools import reduce
+from concurrent.futures import ThreadPoolExecutor
 import warnings
 import scipy.constants
 import numpy as np
@@ -17,13 +16,20 @@ from astropy.time import Time
 import h5py
 from PyQt5.QtWidgets import QWidget, QApplication, QDesktopWidget, QGridLayout, QPushButton
 from PyQt5.QtGui import QIcon
-from ExperimentsLogReader.experimentsLogReader import LogReaderFactory, LogTypes
-from parsers.configparser_ import ConfigParser
-from utils.vlsr import lsr
-from utils.help import find_nearest_index
+from parsers.runtime_context import RuntimeContext, get_runtime_context
+from utils.vlsr import get_lsr_engine
+from utils.pair_accumulator import PairAccumulator
+from utils.sdr_log import read_sdr_log
+from utils.scan_reader import get_cache_file_name
+from utils.scan_catalog import parse_scan_name
+from utils.raw_cube import get_scan_catalog
+from utils.trace import start_trace, trace_span, traced
 from utils.ploting_qt5 import Plot
 warnings.filterwarnings("ignore")
 
+PAIRS_PER_BLOCK = 4
+PREFETCH_PAIRS = 2
+
 
 def parse_arguments():
     """
@@ -38,6 +44,10 @@ def parse_arguments():
     parser.add_argument("log_file", help="Experiment log file name", type=str)
     parser.add_argument("-c", "--config", help="Configuration cfg file", type=str,
                         default="config/config.cfg")
+    parser.add_argument("-b", "--batch", help="Process iteration without GUI", action="store_true")
+    parser.add_argument("-bs", "--badScans", help="What to do with bad scans in batch mode",
+                        type=str, default="skip", choices=["skip", "delete"])
+    parser.add_argument("--trace", help="Write stage timing to Chrome trace file", type=str, default=None)
     parser.add_argument("-v", "--version", action="version", version='%(prog)s - Version 1.0')
     args = parser.parse_args()
     return args
@@ -49,7 +59,7 @@ def get_args(key):
     :param key: argument key
     :return: to script passed argument value
     """
-    return str(parse_arguments().__dict__[key])
+    return get_runtime_context(parse_arguments).get_arg(key)
 
 
 def get_configs(section, key):
@@ -59,9 +69,7 @@ def get_configs(section, key):
     :param key: configuration file sections key
     :return: configuration file section key value
     """
-    config_file_path = get_args("config")
-    config = ConfigParser(config_file_path)
-    return config.get_config(section, key)
+    return get_runtime_context(parse_arguments).get_config(section, key)
 
 
 def dopler(observed_frequency, velocity_receiver, base_frequency):
@@ -78,51 +86,133 @@ def dopler(observed_frequency, velocity_receiver, base_frequency):
     return velocity_source
 
 
-def signal_to_noise_ratio(frequency, amplitude, cuts):
+def get_calibration_parameters(logs):
     """
 
-    :param frequency: velocity
-    :param amplitude: amplitude
-    :param cuts: signal region
-    :return: signal to noise ratio
+    :param logs: SDR logs
+    :return: frequency shift, Tcal, DPFU and gain elevation polynomial
     """
+    return logs.f_shift, logs.tcal, logs.dpfu, logs.g_el
 
-    cuts_index = list()
-    cuts_index.append(0)
-    cuts_index2 = list()
 
-    for cut in cuts:
-        cuts_index.append((np.abs(frequency - float(cut[0]))).argmin())
-        cuts_index.append((np.abs(frequency - float(cut[1]))).argmin())
-        cuts_index2.append((np.abs(frequency - float(cut[0]))).argmin())
-        cuts_index2.append((np.abs(frequency - float(cut[1]))).argmin())
+def get_pairs_elevation(logs, pairs):
+    """
+
+    :param logs: SDR logs
+    :param pairs: scan pairs
+    :return: average elevation of each scan pair
+    """
+    elevations = logs.get_elevations([scan for pair in pairs
+                                      for scan in (pair[0][0], pair[0][1], pair[1][0], pair[1][1])]).reshape(-1, 4)
+    return (elevations[:, 0] + elevations[:, 1] + elevations[:, 2] + elevations[:, 3]) / 4
 
-    cuts_index = sorted(cuts_index)
-    cuts_index.append(-1)
-    cuts_index2 = sorted(cuts_index2)
 
-    non_signal_amplitude = list()
-    signal_amplitude = list()
+def shifted_channels(spectra, start, stop, shift):
+    """
 
-    i = 0
-    j = 1
-    while i != len(cuts_index):
-        non_signal_amplitude.extend(amplitude[cuts_index[i]: cuts_index[j]])
-        i = i + 2
-        j = j + 2
+    :param spectra: spectra
+    :param start: first channel
+    :param stop: last channel
+    :param shift: frequency shift in channels
+    :return: channels start:stop of spectra rolled by shift
+    """
+    l_spec = spectra.shape[-1]
+    if start - shift >= 0 and stop - shift <= l_spec:
+        return spectra[..., start - shift:stop - shift]
+    return np.take(spectra, np.arange(start - shift, stop - shift) % l_spec, axis=-1)
 
-    m = 0
-    n = 1
-    while m != len(cuts_index2):
-        signal_amplitude.extend(amplitude[cuts_index2[m]: cuts_index2[n]])
-        m = m + 2
-        n = n + 2
 
-    std = np.std(non_signal_amplitude)
-    max_value = np.max(signal_amplitude)
+def system_temperature(p_off, p_on, cal, tcal):
+    """
 
-    ston = max_value / (std * 3)
-    return ston
+    :param p_off: spectra without noise diode
+    :param p_on: spectra with noise diode
+    :param cal: mean noise diode signal in inner part of spectra
+    :param tcal: noise diode temperature
+    :return: system temperature spectra
+    """
+    tsys_off = np.add(p_on, p_off)
+    tsys_off -= cal
+    tsys_off *= tcal
+    tsys_off /= 2 * cal
+    return tsys_off
+
+
+def antenna_temperature(p_sig, p_ref, p_sig_on, p_ref_on, tsys_off, tcal):
+    """
+
+    :param p_sig: signal spectra
+    :param p_ref: reference spectra
+    :param p_sig_on: signal spectra with noise diode
+    :param p_ref_on: reference spectra with noise diode
+    :param tsys_off: system temperature of reference, it is changed in place
+    :param tcal: noise diode temperature for left and right polarization
+    :return: antenna temperature
+    """
+    ta_caloff = np.subtract(p_sig, p_ref)  # non-cal phase
+    ta_caloff *= tsys_off
+    ta_caloff /= p_ref
+
+    tsys_off += tcal
+    ta_calon = np.subtract(p_sig_on, p_ref_on)  # cal phase
+    ta_calon *= tsys_off
+    ta_calon /= p_ref_on
+
+    ta_caloff += ta_calon
+    ta_caloff /= 2
+    return ta_caloff
+
+
+def frequency_shifting_batch(spectra, frequency_a, logs, pairs):
+    """
+    Frequency shifting calibration of many scan pairs at once
+
+    :param spectra: array of shape (pairs, 4, 2, channels), phases are ordered s0, r0, s1, r1
+    and polarizations left, right, spectra must be fft shifted
+    :param frequency_a: frequency
+    :param logs: logs
+    :param pairs: scan pairs
+    :return: calibrated spectra of shape (pairs, 2, channels), frequency, system temperatures of
+    shape (pairs, 4) ordered r left, r right, s left, s right and mask of pairs with bad system temperature
+    """
+    f_shift, tcal, dpfu, g_el = get_calibration_parameters(logs)
+
+    l_spec = len(frequency_a)
+    f_step = (frequency_a[l_spec - 1] - frequency_a[0]) / (l_spec - 1)
+    n_shift = int(np.rint(f_shift / f_step))
+    avg_interval = 0.5  # inner 50%
+    s_i = int(l_spec / 2 - l_spec * avg_interval / 2)
+    e_i = int(l_spec / 2 + l_spec * avg_interval / 2)
+
+    inner_spectra = spectra[..., s_i:e_i]
+    cal = np.mean(inner_spectra[:, 2:] - inner_spectra[:, :2], axis=-1, keepdims=True)
+    cal_sig = cal[:, 0]
+    cal_ref = cal[:, 1]
+    tcal_polarization = tcal[np.newaxis, :, np.newaxis]
+
+    tsys_r = np.mean(system_temperature(inner_spectra[:, 1], inner_spectra[:, 3], cal_ref, tcal[0]), axis=-1)
+    tsys_s = np.mean(system_temperature(inner_spectra[:, 0], inner_spectra[:, 2], cal_sig, tcal[1]), axis=-1)
+
+    # only inner part of spectrum is returned, so antenna temperature is computed only for
+    # channels that are moved there by frequency shift
+    sig_spectra = shifted_channels(spectra, s_i, e_i, n_shift)
+    ta_sig = antenna_temperature(sig_spectra[:, 0], sig_spectra[:, 1], sig_spectra[:, 2], sig_spectra[:, 3],
+                                 system_temperature(sig_spectra[:, 1], sig_spectra[:, 3], cal_ref, tcal[0]),
+                                 tcal_polarization)
+    ref_spectra = shifted_channels(spectra, s_i, e_i, -n_shift)
+    ta_ref = antenna_temperature(ref_spectra[:, 1], ref_spectra[:, 0], ref_spectra[:, 3], ref_spectra[:, 2],
+                                 system_temperature(ref_spectra[:, 0], ref_spectra[:, 2], cal_sig, tcal[1]),
+                                 tcal_polarization)
+    ta_sig += ta_ref
+    ta_sig /= 2
+
+    tsys = np.concatenate((tsys_r, tsys_s), axis=1)
+    bad_pairs = np.any((tsys < 0) | (tsys > 300), axis=1)
+
+    gain = np.polyval(g_el, get_pairs_elevation(logs, pairs))
+    ta_sig /= dpfu[np.newaxis, :, np.newaxis] * gain[:, np.newaxis, np.newaxis]
+
+    return ta_sig, frequency_a[s_i:e_i], tsys, bad_pairs
 
 
 def frequency_shifting(p_sig_left, p_sig_right, p_ref_left, p_ref_right, p_sig_on_left,
@@ -142,153 +232,346 @@ def frequency_shifting(p_sig_left, p_sig_right, p_ref_left, p_ref_right, p_sig_o
     :param pair: pair
     :return: frequency_shifting
     """
-    df_div = float(logs["header"]["df_div,df"][0])
-    band_with = float(logs["header"]["Fs,Ns,RBW"][0])
-    f_shift = band_with / df_div
+    spectra = np.array([[[p_sig_left, p_sig_right], [p_ref_left, p_ref_right],
+                         [p_sig_on_left, p_sig_on_right], [p_ref_on_left, p_ref_on_right]]])
+    sf, frequency, tsys, bad_pairs = frequency_shifting_batch(spectra, frequency_a, logs, [pair])
+    tsys_r_left, tsys_r_right, tsys_s_left, tsys_s_right = tsys[0]
+    report_bad_system_temperature(tsys[0])
 
-    l_spec = len(frequency_a)
-    f_step = (frequency_a[l_spec - 1] - frequency_a[0]) / (l_spec - 1)
-    n_shift = int(np.rint(f_shift / f_step))
-    avg_interval = 0.5  # inner 50%
-    s_i = int(l_spec / 2 - l_spec * avg_interval / 2)
-    e_i = int(l_spec / 2 + l_spec * avg_interval / 2)
+    return sf[0, 0], sf[0, 1], frequency, \
+           tsys_r_left, tsys_r_right, tsys_s_left, tsys_s_right, bool(bad_pairs[0])
 
-    tsys_off_1_left = float(logs["header"]["Tcal"][0]) * ((p_ref_on_left + p_ref_left) -
-                                                          np.mean(p_ref_on_left[s_i:e_i] -
-                                                                  p_ref_left[s_i:e_i])) / \
-                      (2 * np.mean(p_ref_on_left[s_i:e_i] - p_ref_left[s_i:e_i]))
-    tsys_off_2_left = float(logs["header"]["Tcal"][1]) * ((p_sig_on_left + p_sig_left)
-                                                          - np.mean(p_sig_on_left[s_i:e_i]
-                                                                    - p_sig_left[s_i:e_i])) / \
-                      (2 * np.mean(p_sig_on_left[s_i:e_i] - p_sig_left[s_i:e_i]))
 
-    tsys_off_1_right = float(logs["header"]["Tcal"][0]) * ((p_ref_on_right + p_ref_right) -
-                                                           np.mean(p_ref_on_right[s_i:e_i]
-                                                                   - p_ref_right[s_i:e_i])) / \
-                       (2 * np.mean(p_ref_on_right[s_i:e_i] - p_ref_right[s_i:e_i]))
+def report_bad_system_temperature(tsyss):
+    """
 
-    tsys_off_2_right = float(logs["header"]["Tcal"][1]) * ((p_sig_on_right + p_sig_right) -
-                                                           np.mean(p_sig_on_right[s_i:e_i]
-                                                                   - p_sig_right[s_i:e_i])) / \
-                       (2 * np.mean(p_sig_on_right[s_i:e_i] - p_sig_right[s_i:e_i]))
+    :param tsyss: system temperatures of scan pair
+    :return: None
+    """
+    if any(tsys < 0 for tsys in tsyss):
+        print("System temperature is negative")
 
-    ta_1_caloff_left = tsys_off_1_left * (p_sig_left - p_ref_left) / p_ref_left  # non-cal phase
-    ta_1_caloff_right = tsys_off_1_right * \
-                        (p_sig_right - p_ref_right) / p_ref_right  # non-cal phase
+    if any(tsys > 300 for tsys in tsyss):
+        print("System temperature is bigger than 300")
 
-    ta_1_calon_left = (tsys_off_1_left + float(logs["header"]["Tcal"][0])) * \
-                      (p_sig_on_left - p_ref_on_left) / p_ref_on_left  # cal phase
-    ta_1_calon_right = (tsys_off_1_right + float(logs["header"]["Tcal"][1])) * \
-                       (p_sig_on_right - p_ref_on_right) / p_ref_on_right  # cal phase
 
-    ta_sig_left = (ta_1_caloff_left + ta_1_calon_left) / 2
-    ta_sig_right = (ta_1_caloff_right + ta_1_calon_right) / 2
+def delete_data_files(data_files, bad_scan_policy):
+    """
+    Binary cache of scan file is deleted together with it
 
-    ta_2_caloff_left = tsys_off_2_left * (p_ref_left - p_sig_left) / p_sig_left  # non-cal phase
-    ta_2_caloff_right = tsys_off_2_right * \
-                        (p_ref_right - p_sig_right) / p_sig_right  # non-cal phase
+    :param data_files: full paths of data files
+    :param bad_scan_policy: ask - ask user before deleting each file, delete - delete files,
+    skip - keep files
+    :return: deleted data files
+    """
+    deleted_files = []
+    for data_file in data_files:
+        if bad_scan_policy == "ask":
+            choice = input("Should this data file " + data_file + " be deleted Y/n ")
+            if choice != "Y" and choice != "y":
+                continue
+        elif bad_scan_policy != "delete":
+            continue
+
+        try:
+            os.remove(data_file)
+            print("Data file " + data_file + " are deleted")
+            deleted_files.append(data_file)
+        except OSError as error:
+            print("Error: %s : %s" % (data_file, error.strerror))
+            continue
+
+        cache_file = get_cache_file_name(data_file)
+        if os.path.isfile(cache_file):
+            try:
+                os.remove(cache_file)
+            except OSError as error:
+                print("Error: %s : %s" % (cache_file, error.strerror))
+    return deleted_files
+
+
+def read_scan_pair(scan_catalog, pair):
+    """
 
-    ta_2_calon_left = (tsys_off_2_left + float(logs["header"]["Tcal"][0])) * \
-                      (p_ref_on_left - p_sig_on_left) / p_sig_on_left  # cal phase
-    ta_2_calon_right = (tsys_off_2_right + float(logs["header"]["Tcal"][1])) * \
-                       (p_ref_on_right - p_sig_on_right) / p_sig_on_right  # cal phase
+    :param scan_catalog: scan catalog of iteration
+    :param pair: scan pair
+    :return: data files of pair, frequency and fft shifted amplitudes of s0, r0, s1, r1
+    """
+    scan_files = scan_catalog.get_pair_files(pair)
+    with trace_span("read_scan_pairs", pairs=1):
+        frequency_a, spectra = scan_catalog.read_pairs([pair])
+    spectra = np.fft.fftshift(spectra[0], axes=-1)
+    (p_sig_left, p_sig_right), (p_ref_left, p_ref_right), \
+    (p_sig_on_left, p_sig_on_right), (p_ref_on_left, p_ref_on_right) = spectra  # s0, r0, s1, r1
 
-    ta_ref_left = (ta_2_caloff_left + ta_2_calon_left) / 2
-    ta_ref_right = (ta_2_caloff_right + ta_2_calon_right) / 2
+    return scan_files, frequency_a, p_sig_left, p_sig_right, p_ref_left, p_ref_right, \
+           p_sig_on_left, p_sig_on_right, p_ref_on_left, p_ref_on_right
 
-    ta_sig_left = np.roll(ta_sig_left, +n_shift)
-    ta_sig_right = np.roll(ta_sig_right, +n_shift)
 
-    ta_ref_left = np.roll(ta_ref_left, -n_shift)
-    ta_ref_right = np.roll(ta_ref_right, -n_shift)
+def read_scan_pairs(scan_catalog, pairs):
+    """
 
-    ta_left = (ta_sig_left + ta_ref_left) / 2
-    ta_right = (ta_sig_right + ta_ref_right) / 2
+    :param scan_catalog: scan catalog of iteration
+    :param pairs: scan pairs
+    :return: data files of pairs, frequency and fft shifted spectra of shape (pairs, 4, 2, channels)
+    """
+    scan_files = [scan_catalog.get_pair_files(pair) for pair in pairs]
+    with trace_span("read_scan_pairs", pairs=len(pairs)):
+        frequency, spectra = scan_catalog.read_pairs(pairs)
+    return scan_files, frequency, np.fft.fftshift(spectra, axes=-1)
 
-    tsys_r_left = np.mean(tsys_off_1_left[s_i:e_i])
-    tsys_r_right = np.mean(tsys_off_1_right[s_i:e_i])
 
-    tsys_s_left = np.mean(tsys_off_2_left[s_i:e_i])
-    tsys_s_right = np.mean(tsys_off_2_right[s_i:e_i])
+@traced()
+def load_scan_pair(scan_catalog, logs, pair):
+    """
 
-    tsyss = [tsys_r_left, tsys_r_right, tsys_s_left, tsys_s_right]
+    :param scan_catalog: scan catalog of iteration
+    :param logs: SDR logs
+    :param pair: scan pair
+    :return: read_scan_pair output and frequency_shifting output of pair
+    """
+    pair_data = read_scan_pair(scan_catalog, pair)
+    with trace_span("frequency_shifting", pairs=1):
+        return pair_data, frequency_shifting(*pair_data[2:], pair_data[1], logs, pair)
 
-    def get_iter_name(index):
-        if len(index) == 3:
-            return "00" + index
-        elif len(index) == 4:
-            return "0" + index
-        else:
-            return index
 
-    tmp = logs["header"]["source"] + "_f" + get_args("line") + "_" + \
-          logs["header"]["station,id"][1] + "_" + \
-          logs["header"]["exp_name"].split("_")[-1] + "_" + "no"
+def calibrate_scan_pairs(scan_catalog, scan_pairs, logs, pairs_per_block=PAIRS_PER_BLOCK):
+    """
 
-    tmp2 = logs["header"]["source"] + "_f" + get_args("line") + "_" + \
-           logs["header"]["station,id"][1] + "_" + \
-           logs["header"]["exp_name"].split( "_" )[-1]
+    :param scan_catalog: scan catalog of iteration
+    :param scan_pairs: scan pairs
+    :param logs: SDR logs
+    :param pairs_per_block: count of scan pairs calibrated at once
+    :return: generator of scan pairs, their data files, calibrated spectra, frequency,
+    system temperatures and bad pair mask for each block of scan pairs
+    """
+    for start in range(0, len(scan_pairs), pairs_per_block):
+        pairs = scan_pairs[start:start + pairs_per_block]
+        scan_files, frequency_a, spectra = read_scan_pairs(scan_catalog, pairs)
+        with trace_span("frequency_shifting", pairs=len(pairs)):
+            sf, frequency, tsys, bad_pairs = frequency_shifting_batch(spectra, frequency_a, logs, pairs)
+        yield pairs, scan_files, sf, frequency, tsys, bad_pairs
 
-    scan_files_to_delete = [get_configs("paths", "dataFilePath") + tmp2 + "/" + tmp + get_iter_name(indextmp) + ".dat"
-                            for indextmp in (np.array(pair).flatten())]
 
-    delete_scan_files = False
-    if any(tsys < 0 for tsys in tsyss):
-        delete_scan_files = True
-        print("System temperature is negative")
+def get_station_name(logs):
+    """
 
-    if any(tsys > 300 for tsys in tsyss):
-        delete_scan_files = True
-        print("System temperature is bigger than 300")
+    :param logs: SDR logs
+    :return: station name used in configuration and output file names
+    """
+    if logs.station == "RT-32":
+        return "IRBENE"
+    return "IRBENE16"
 
-    if delete_scan_files:
-        for scan_file in scan_files_to_delete:
-            choice = input("Should this data file " + scan_file + " be deleted Y/n ")
-            if choice == "Y" or choice == "y":
-                try:
-                    os.remove(scan_file)
-                    print("Data file " + scan_file + " are deleted")
-                except OSError as error:
-                    print("Error: %s : %s" % (scan_file, error.strerror))
 
-    elvation = (float(logs[pair[0][0]]["AzEl"][1]) + float(logs[pair[0][1]]["AzEl"][1]) + float(
-        logs[pair[1][0]]["AzEl"][1]) + float(logs[pair[1][1]]["AzEl"][1])) / 4
+def get_scan_date(logs, pair):
+    """
 
-    g_el = logs["header"]["Elev_poly"]
-    g_el = [float(gel) for gel in g_el]
-    g_e_ltmp = [0, 0, 0]
-    g_e_ltmp[0] = g_el[2]
-    g_e_ltmp[1] = g_el[1]
-    g_e_ltmp[2] = g_el[0]
-    g_el = g_e_ltmp
+    :param logs: SDR logs
+    :param pair: scan pair
+    :return: date of scan pair
+    """
+    return logs.get_date(str(pair[0][0]))
 
-    sf_left = ta_left / ((float(logs["header"]["DPFU"][0])) * np.polyval(g_el, elvation))
-    sf_right = ta_right / ((float(logs["header"]["DPFU"][1])) * np.polyval(g_el, elvation))
 
-    return sf_left[s_i:e_i], sf_right[s_i:e_i], frequency_a[s_i:e_i], \
-           tsys_r_left, tsys_r_right, tsys_s_left, tsys_s_right, delete_scan_files
+def compute_velocities(logs, scan_pairs, frequency, source_coordinates,
+                       station_coordinates, base_frequency):
+    """
+
+    :param logs: SDR logs
+    :param scan_pairs: scan pairs
+    :param frequency: frequency of calibrated spectrum
+    :param source_coordinates: right ascension and declination strings from source catalog
+    :param station_coordinates: station x, y, z coordinates
+    :param base_frequency: line base frequency from configuration file
+    :return: velocity of calibrated spectrum without receiver velocity, receiver velocity
+    for each scan pair, specie, date of last scan
+    """
+    x, y, z = station_coordinates
+    ra_str, dec_str = source_coordinates
+    line = base_frequency.replace(" ", "").split(",")
+    line_f = float(line[0]) * (10 ** 9)
+    specie = line[1]
+    local_oscillator = logs.local_oscillator
 
+    scan_dates = [get_scan_date(logs, pair) for pair in scan_pairs]
+    print("Vel Total params", ra_str, dec_str, scan_dates[0], x, y, z)
+    with trace_span("lsr", pairs=len(scan_dates)):
+        vel_totals = get_lsr_engine(ra_str, dec_str, x, y, z).lsr(scan_dates)
 
-def get_scan_name(data_file_name):
+    velocity = dopler((frequency + local_oscillator) * (10 ** 6), 0, line_f)
+    scan_date = scan_dates[-1]
+
+    return velocity, vel_totals, specie, scan_date
+
+
+def create_pair_accumulator(logs, scan_pairs, frequency, source_coordinates,
+                            station_coordinates, base_frequency, cuts):
     """
 
-    :param data_file_name: data file name
-    :return: scan name for data file
+    :param logs: SDR logs
+    :param scan_pairs: all scan pairs of iteration
+    :param frequency: frequency of calibrated spectrum
+    :param source_coordinates: right ascension and declination strings from source catalog
+    :param station_coordinates: station x, y, z coordinates
+    :param base_frequency: line base frequency from configuration file
+    :param cuts: signal region
+    :return: pair accumulator, specie
     """
-    return data_file_name.split(".")[0].split("_")[4][2:len(data_file_name.split(".")
-                                                            [0].split("_")[4])].lstrip('0')
+    velocity, vel_totals, specie, _ = compute_velocities(logs, scan_pairs, frequency, source_coordinates,
+                                                         station_coordinates, base_frequency)
+    return PairAccumulator(velocity, dict(zip(scan_pairs, vel_totals)), cuts), specie
 
 
-def get_data(data_file_name):
+def get_scans_time(data_files, count):
     """
 
-    :param data_file_name: data file name
-    :return: frequency, polarization left, polarization right
+    :param data_files: data files of iteration
+    :param count: count of calibrated pairs
+    :return: scan numbers used as time axis
     """
-    frequency = np.loadtxt(data_file_name, usecols=(0,), unpack=True)
-    polarization_left = np.loadtxt(data_file_name, usecols=(1,), unpack=True)
-    polarization_right = np.loadtxt(data_file_name, usecols=(2,), unpack=True)
-    return frequency, polarization_left, polarization_right
+    time = list(set([int(t.split("_")[-1].split(".")[0]
+                         [2:len(t.split("_")[-1].split(".")[0]) - 2])
+                     for t in data_files]))
+
+    while len(time) > count:
+        time.pop()
+    return time
+
+
+def get_mjd(scan_date):
+    """
+
+    :param scan_date: scan date from SDR logs
+    :return: MJD
+    """
+    return Time(datetime.strptime(scan_date, '%Y-%m-%dT%H:%M:%S').isoformat(), format='isot').mjd
+
+
+def get_output_file_name(output_file_path, source, line, mjd, station, iteration_number):
+    """
+
+    :param output_file_path: output file path
+    :param source: source
+    :param line: frequency
+    :param mjd: MJD of observation
+    :param station: station name
+    :param iteration_number: iteration number
+    :return: output file name
+    """
+    return output_file_path + "/" + line + "/" + source + "/" + \
+           source + "_" + str(mjd) + "_" + station + "_" + str(iteration_number) + ".h5"
+
+
+@traced()
+def write_output_file(result_file_name, sys_temp_out, total_results, specie, variance=None):
+    """
+
+    :param result_file_name: output file name
+    :param sys_temp_out: system temperatures
+    :param total_results: velocity, left and right polarization
+    :param specie: specie
+    :param variance: velocity, variance of pairs for left and right polarization
+    :return: None
+    """
+    output_dir = os.path.dirname(result_file_name)
+    os.makedirs(output_dir, exist_ok=True)
+
+    result_file = h5py.File(result_file_name, "w")
+    print("output_file_name", result_file_name)
+    result_file.create_dataset("system_temperature", data=sys_temp_out)
+    result_file.create_dataset("amplitude", data=total_results)
+    if variance is not None:
+        result_file.create_dataset("amplitude_variance", data=variance)
+    specie = [specie.encode("ascii", "ignore")]
+    result_file.create_dataset("specie", (len(specie), 1), 'S10', specie)
+    result_file.close()
+
+
+@traced()
+def reduce_iteration(source, line, iteration_number, log_file,
+                     config_file_path="config/config.cfg", bad_scan_policy="skip"):
+    """
+    Process SDR iteration without GUI
+
+    :param source: source
+    :param line: frequency
+    :param iteration_number: iteration number
+    :param log_file: log file name
+    :param config_file_path: configuration file path
+    :param bad_scan_policy: skip - leave out scans with missing data files or bad system temperature,
+    delete - also delete data files of these scans
+    :return: output file name
+    """
+    source = str(source)
+    line = str(line)
+    iteration_number = str(iteration_number)
+    config = RuntimeContext(None, config_file_path)
+    data_file_path = config.get_config("paths", "dataFilePath")
+    output_file_path = config.get_config("paths", "outputFilePath")
+    cuts = config.get_cuts(source + "_" + line)
+    source_coordinates = config.get_source_catalog().get_coordinates(source)
+    base_frequency = config.get_config('base_frequencies_SDR', "f" + line)
+
+    with trace_span("read_sdr_log"):
+        logs = read_sdr_log(config.get_config("paths", "logPath") + "SDR/" + log_file,
+                            config.get_config("paths", "prettyLogsPath") + source + "_" + iteration_number)
+    station = get_station_name(logs)
+    station_coordinates = config.get_station_coordinates(station)
+    data_dir = data_file_path + source + "_f" + line + "_" + \
+               logs.station_id + "_" + iteration_number + "/"
+    with trace_span("scan_catalog"):
+        scan_catalog = get_scan_catalog(data_dir)
+
+    for scan in scan_catalog.find_incomplete_scans():
+        print("Scan " + str(scan) + " do not have all data file")
+        bad_files = scan_catalog.get_scan_files(scan)
+        delete_data_files([data_dir + bad_file for bad_file in bad_files], bad_scan_policy)
+        for bad_file in bad_files:
+            scan_catalog.remove(bad_file)
+
+    scan_pairs = []
+    tsys_list = []
+    pair_accumulator = None
+    specie = None
+    all_scan_pairs = scan_catalog.create_scan_pairs()
+    for pairs, scan_files, sf, frequency, tsys, bad_pairs in \
+            calibrate_scan_pairs(scan_catalog, all_scan_pairs, logs):
+        for index, pair in enumerate(pairs):
+            if bad_pairs[index]:
+                report_bad_system_temperature(tsys[index])
+                delete_data_files(scan_files[index], bad_scan_policy)
+            else:
+                scan_pairs.append(pair)
+                tsys_list.append(tsys[index])
+
+        if pair_accumulator is None:
+            pair_accumulator, specie = create_pair_accumulator(logs, all_scan_pairs, frequency,
+                                                               source_coordinates, station_coordinates,
+                                                               base_frequency, cuts)
+        with trace_span("accumulate", pairs=len(pairs)):
+            pair_accumulator.add_many([pair for index, pair in enumerate(pairs) if not bad_pairs[index]],
+                                      sf[~bad_pairs])
+
+    if len(scan_pairs) == 0:
+        raise ValueError("Iteration " + iteration_number + " has no valid scan pairs")
+
+    scan_date = get_scan_date(logs, scan_pairs[-1])
+    velocities_avg, y__left_avg, y__right_avg = pair_accumulator.get_average()
+    left_variance, right_variance = pair_accumulator.get_variance()
+
+    print("Average signal to noise for left polarization", np.mean(pair_accumulator.ston_list_left))
+    print("Average signal to noise for right polarization", np.mean(pair_accumulator.ston_list_right))
+    print("Average signal to noise for average polarization", np.mean(pair_accumulator.ston_list_avg))
+
+    time = get_scans_time(scan_catalog.data_files, len(tsys_list))
+    sys_temp_out = np.column_stack([time, tsys_list])
+    total_results = np.transpose(np.array([velocities_avg, y__left_avg, y__right_avg]))
+    result_file_name = get_output_file_name(output_file_path, source, line,
+                                            get_mjd(scan_date), station, iteration_number)
+    write_output_file(result_file_name, sys_temp_out, total_results, specie,
+                      np.transpose(np.array([velocities_avg, left_variance, right_variance])))
+    return result_file_name
 
 
 class Analyzer(QWidget):
@@ -302,10 +585,9 @@ class Analyzer(QWidget):
         self.setWindowTitle("SDR")
         self.center()
         self.index = 0
-        self.cuts = get_configs('cuts', get_args("source") + "_" + get_args("line")).split(";")
-        self.cuts = [c.split(",") for c in self.cuts]
-        self.sf_left = list()
-        self.sf_right = list()
+        self.cuts = get_runtime_context(parse_arguments).get_cuts(get_args("source") + "_" + get_args("line"))
+        self.pair_accumulator = None
+        self.specie = None
         self.tsys_r_left_list = list()
         self.tsys_r_right_list = list()
         self.tsys_s_left_list = list()
@@ -313,39 +595,29 @@ class Analyzer(QWidget):
         self.ston_list_left = list()
         self.ston_list_right = list()
         self.ston_list_avg = list()
-        self.logs = LogReaderFactory.getLogReader(LogTypes.SDR,
-                                                  get_configs("paths", "logPath") + "SDR/" +
-                                                  get_args("log_file"),
-                                                  get_configs("paths", "prettyLogsPath") +
-                                                  get_args("source") + "_" +
-                                                  get_args("iteration_number")).getLogs()
-        self.station = self.logs["header"]["station,id"]
+        with trace_span("read_sdr_log"):
+            self.logs = read_sdr_log(get_configs("paths", "logPath") + "SDR/" + get_args("log_file"),
+                                     get_configs("paths", "prettyLogsPath") +
+                                     get_args("source") + "_" + get_args("iteration_number"))
+        self.station = [self.logs.station, self.logs.station_id]
         self.data_dir = get_configs("paths", "dataFilePath") + \
                         get_args("source") + "_f" + get_args("line") + "_" + \
                         self.station[1] + "_" + get_args("iteration_number") + "/"
-        self.data_files = os.listdir(self.data_dir)
-        data_files_scans_for_raw_data = []
-
-        for df in self.data_files:
-            data_files_scans_for_raw_data.append(re.findall("[0-9]+", get_scan_name(df))[0])
-
-        scans = list(set(data_files_scans_for_raw_data))
-
-        for scan in scans:
-            if data_files_scans_for_raw_data.count(scan) != 4:
-                print("Scan " + scan + " do not have all data file")
-                bad_files = self.find_data_files_for_bad_scan(scan)
-                for bad_file in bad_files:
-                    choice = input("Should this data file " + self.data_dir + bad_file + " be deleted Y/n ")
-                    if choice == "Y" or choice == "y":
-                        try:
-                            os.remove(self.data_dir + bad_file)
-                            print("Data file " + self.data_dir + bad_file + " are deleted")
-                            self.data_files.remove(bad_file)
-                        except OSError as error:
-                            print("Error: %s : %s" % (self.data_dir + bad_file, error.strerror))
+        with trace_span("scan_catalog"):
+            self.scan_catalog = get_scan_catalog(self.data_dir)
+
+        for scan in self.scan_catalog.find_incomplete_scans():
+            print("Scan " + str(scan) + " do not have all data file")
+            bad_files = self.scan_catalog.get_scan_files(scan)
+            deleted_files = delete_data_files([self.data_dir + bad_file for bad_file in bad_files], "ask")
+            for bad_file in bad_files:
+                if self.data_dir + bad_file in deleted_files:
+                    self.scan_catalog.remove(bad_file)
 
         self.scan_pairs = self.create_scan_pairs()
+        self.all_scan_pairs = list(self.scan_pairs)
+        self.prefetch_executor = ThreadPoolExecutor(max_workers=1)
+        self.prefetched_pairs = dict()
 
         self.grid = QGridLayout()
         self.setLayout(self.grid)
@@ -363,13 +635,6 @@ class Analyzer(QWidget):
 
         self.__UI__()
 
-    def find_data_files_for_bad_scan(self, bad_scan):
-        bad_files = []
-        for file in self.data_files:
-            if bad_scan == re.findall("[0-9]+", file.split(".")[0].split("_")[-1])[0].lstrip("0"):
-               bad_files.append(file)
-        return bad_files
-
     def center(self):
         """
 
@@ -401,16 +666,7 @@ class Analyzer(QWidget):
 
         :return: None
         """
-        scan_names = [get_scan_name(file) for file in self.data_files]
-        scans_numbers = list(set([int(re.findall("[0-9]+", s)[0]) for s in scan_names]))
-        scans_numbers = sorted(scans_numbers)
-        scan_pairs = []
-
-        for scan in scans_numbers:
-            scan_pairs.append(
-                ((str(scan) + "r" + "0", str(scan) + "s" + "0"),
-                 (str(scan) + "r" + "1", str(scan) + "s" + "1")))
-        return scan_pairs
+        return self.scan_catalog.create_scan_pairs()
 
     def next_pair(self):
         """
@@ -434,62 +690,28 @@ class Analyzer(QWidget):
 
         :return: None
         """
+        self.stop_prefetch()
         self.index += 1
-        while self.index < len(self.scan_pairs):
-            pair = self.scan_pairs[self.index]
-
-            file1 = self.data_dir + self.get_data_file_for_scan(pair[0][1])  # s0
-            file2 = self.data_dir + self.get_data_file_for_scan(pair[0][0])  # r0
-            file3 = self.data_dir + self.get_data_file_for_scan(pair[1][1])  # s1
-            file4 = self.data_dir + self.get_data_file_for_scan(pair[1][0])  # r1
-
-            frequency_a = get_data(file1)[0]  # r0
-            p_sig_left = get_data(file1)[1]  # r0
-            p_sig_right = get_data(file1)[2]  # r0
-
-            p_ref_left = get_data(file2)[1]  # s0
-            p_ref_right = get_data(file2)[2]  # s0
-
-            p_sig_on_left = get_data(file3)[1]  # r1
-            p_sig_on_right = get_data(file3)[2]  # r1
-
-            p_ref_on_left = get_data(file4)[1]  # s1
-            p_ref_on_right = get_data(file4)[2]  # s1
-
-            # fft shift
-            p_sig_left = np.fft.fftshift(p_sig_left)  # r0
-            p_sig_right = np.fft.fftshift(p_sig_right)  # r0
-            p_ref_left = np.fft.fftshift(p_ref_left)  # s0
-            p_ref_right = np.fft.fftshift(p_ref_right)  # s0
-            p_sig_on_left = np.fft.fftshift(p_sig_on_left)  # r1
-            p_sig_on_right = np.fft.fftshift(p_sig_on_right)  # r1
-            p_ref_on_left = np.fft.fftshift(p_ref_on_left)  # s1
-            p_ref_on_right = np.fft.fftshift(p_ref_on_right)  # s1
-
-            sf_left, sf_right, frequency_a1, tsys_r_left, \
-            tsys_r_right, tsys_s_left, tsys_s_right, delete_scan_files = frequency_shifting(
-                p_sig_left, p_sig_right, p_ref_left, p_ref_right,
-                p_sig_on_left, p_sig_on_right, p_ref_on_left,
-                p_ref_on_right, frequency_a, self.logs, pair)
-
-            if not delete_scan_files:
-                self.sf_left.append(sf_left)
-                self.sf_right.append(sf_right)
-                self.x = frequency_a1
-
-                self.tsys_r_left_list.append(tsys_r_left)
-                self.tsys_r_right_list.append(tsys_r_right)
-                self.tsys_s_left_list.append(tsys_s_left)
-                self.tsys_s_right_list.append(tsys_s_right)
-
-                self.index += 1
-
-            else:
-                self.scan_pairs.remove(pair)
-
-            if self.index == len(self.scan_pairs) - 1:
-                self.next_pair_button.setText('Move to total results')
-                self.next_pair_button.clicked.connect(self.plot_total_results)
+        for pairs, scan_files, sf, frequency, tsys, bad_pairs in \
+                calibrate_scan_pairs(self.scan_catalog, self.scan_pairs[self.index:], self.logs):
+            self.x = frequency
+            self.add_pairs([pair for index, pair in enumerate(pairs) if not bad_pairs[index]],
+                           sf[~bad_pairs])
+            for index, pair in enumerate(pairs):
+                if not bad_pairs[index]:
+
+                    tsys_r_left, tsys_r_right, tsys_s_left, tsys_s_right = tsys[index]
+                    self.tsys_r_left_list.append(tsys_r_left)
+                    self.tsys_r_right_list.append(tsys_r_right)
+                    self.tsys_s_left_list.append(tsys_s_left)
+                    self.tsys_s_right_list.append(tsys_s_right)
+
+                    self.index += 1
+
+                else:
+                    report_bad_system_temperature(tsys[index])
+                    delete_data_files(scan_files[index], "ask")
+                    self.scan_pairs.remove(pair)
 
         self.plot_total_results()
 
@@ -498,6 +720,7 @@ class Analyzer(QWidget):
 
         :return: None
         """
+        self.stop_prefetch()
 
         if self.plot_start__left_a or self.plot_start__right_b:
             self.grid.removeWidget(self.plot_start__left_a)
@@ -535,114 +758,14 @@ class Analyzer(QWidget):
         for i in reversed(range(self.grid.count())):
             self.grid.itemAt(i).widget().deleteLater()
 
-        station = self.logs["header"]["station,id"][0]
-        if station == "RT-32":
-            station = "IRBENE"
-        else:
-            station = "IRBENE16"
-
-        station_coordinates = get_configs("stations", station)
-        station_coordinates = station_coordinates.replace(" ", "").split(",")
-        x = np.float64(station_coordinates[0])
-        y = np.float64(station_coordinates[1])
-        z = np.float64(station_coordinates[2])
-
-        velocity_max = []
-        velocity_min = []
-        velocity_list = []
-
-        for p in range(0, len(self.scan_pairs)):
-            scan_number = self.scan_pairs[p][0][0]
-            scan_1 = self.logs[str(scan_number)]
-            string_time = scan_1["date"].replace("T", " ")
-            t = datetime.strptime(scan_1["date"], '%Y-%m-%dT%H:%M:%S')
-            time = t.isoformat()
-            date = Time(time, format='isot', scale='utc')
-
-            source_cordinations = get_configs("sources", get_args("source")).split(",")
-            source_cordinations = [sc.strip() for sc in source_cordinations]
-            RA = source_cordinations[0]
-            DEC = source_cordinations[1]
-
-            ra = list()
-            dec = list()
-            ra.append(RA[0:2])
-            ra.append(RA[2:4])
-            ra.append(RA[4:len(RA)])
-
-            if DEC[0] == "-":
-                dec.append(DEC[0:3])
-                dec.append(DEC[3:5])
-                dec.append(DEC[5:len(DEC)])
-            else:
-                dec.append(DEC[0:2])
-                dec.append(DEC[2:4])
-                dec.append(DEC[4:len(DEC)])
-
-            ra_str = ra[0] + "h" + ra[1] + "m" + ra[2] + "s"
-            if int(dec[0]) > 0:
-                dec_str = "+" + dec[0] + "d" + dec[1] + "m" + dec[2] + "s"
-            else:
-                dec_str = dec[0] + "d" + dec[1] + "m" + dec[2] + "s"
-
-            if p == 0:
-                print("Vel Total params", ra_str, dec_str, date, string_time, x, y, z)
-            vel_total = lsr(ra_str, dec_str, date, string_time, x, y, z)
-
-            line = get_configs('base_frequencies_SDR', "f" +
-                               get_args("line")).replace(" ", "").split(",")
-            line_f = float(line[0]) * (10 ** 9)
-            line_s = line[1]
-            specie = line_s
-
-            local_oscillator = float(self.logs["header"]["f_obs,LO,IF"][1])
-            velocities = dopler((self.x + local_oscillator) * (10 ** 6), vel_total, line_f)
-            velocity_list.append(velocities)
-
-            velocity_max.append(np.max(velocities))
-            velocity_min.append(np.min(velocities))
-
-        velocities_avg = []
-        y__left_avg = []
-        y__right_avg = []
-
-        left_cut = np.max(velocity_min)
-        right_cut = np.min(velocity_max)
-
-        for p in range(0, len(self.sf_left)):
-            index_left = find_nearest_index(velocity_list[p], left_cut)
-            index_right = find_nearest_index(velocity_list[p], right_cut)
-            y__left_avg.append(self.sf_left[p][index_right:index_left])
-            y__right_avg.append(self.sf_right[p][index_right:index_left])
-            velocities_avg.append(velocity_list[p][index_right:index_left])
-
-        max_points_count = np.max([len(m) for m in velocities_avg])
-        for s in range(0, len(y__left_avg)):
-
-            if len(velocities_avg[s]) < max_points_count:
-                velocities_avg[s] = np.append(velocities_avg[s], np.max(velocity_min))
-
-            if len(y__left_avg[s]) < max_points_count:
-                y__left_avg[s] = np.append(y__left_avg[s], 0)
-
-            if len(y__right_avg[s]) < max_points_count:
-                y__right_avg[s] = np.append(y__right_avg[s], 0)
-
-            ston_left = signal_to_noise_ratio(velocities, y__left_avg[s], self.cuts)
-            ston_right = signal_to_noise_ratio(velocities, y__right_avg[s], self.cuts)
-            stone_avg = signal_to_noise_ratio(velocities, ((np.array(y__left_avg[s]) +
-                                                            np.array(y__right_avg[s])) / 2), self.cuts)
-            self.ston_list_left.append(ston_left)
-            self.ston_list_right.append(ston_right)
-            self.ston_list_avg.append(stone_avg)
-
-        velocities_avg = reduce(lambda x, y: x + y, velocities_avg)
-        y__left_avg = reduce(lambda x, y: x + y, y__left_avg)
-        y__right_avg = reduce(lambda x, y: x + y, y__right_avg)
-
-        velocities_avg = velocities_avg / len(self.scan_pairs)
-        y__left_avg = y__left_avg / len(self.scan_pairs)
-        y__right_avg = y__right_avg / len(self.scan_pairs)
+        station = get_station_name(self.logs)
+        specie = self.specie
+        scan_date = get_scan_date(self.logs, self.scan_pairs[-1])
+        velocities_avg, y__left_avg, y__right_avg = self.pair_accumulator.get_average()
+        left_variance, right_variance = self.pair_accumulator.get_variance()
+        self.ston_list_left = self.pair_accumulator.ston_list_left
+        self.ston_list_right = self.pair_accumulator.ston_list_right
+        self.ston_list_avg = self.pair_accumulator.ston_list_avg
 
         self.plot_velocity__left = Plot()
         self.plot_velocity__left.creatPlot(self.grid, 'Velocity (km sec$^{-1}$)',
@@ -660,68 +783,24 @@ class Analyzer(QWidget):
         self.plot_tsys.creatPlot(self.grid, 'Time', 'System temperature',
                                  "System temperature in time", (3, 0), "linear")
 
-        data_files = os.listdir(self.data_dir)
-        time = list(set([int(t.split("_")[-1].split(".")[0]
-                             [2:len(t.split("_")[-1].split(".")[0]) - 2])
-                         for t in data_files]))
-
-        time = list(time)
-        while len(time) != len(self.tsys_r_left_list):
-            time.pop()
+        time = get_scans_time(self.scan_catalog.data_files, len(self.tsys_r_left_list))
 
         self.plot_tsys.plot(time, self.tsys_r_left_list, '*b', label="Tsys_r_left")
         self.plot_tsys.plot(time, self.tsys_r_right_list, '*r', label="Tsys_r_right")
         self.plot_tsys.plot(time, self.tsys_s_left_list, '*g', label="Tsys_s_left")
         self.plot_tsys.plot(time, self.tsys_s_right_list, '*y', label="Tsys_s_right")
 
-        day = scan_1["date"].split("-")[2][0:2]
-        month = scan_1["date"].split("-")[1]
-        months = {"Jan": "1", "Feb": "2", "Mar": "3", "Apr": "4", "May": "5",
-                  "Jun": "6", "Jul": "7", "Aug": "8", "Sep": "9", "Oct": "10",
-                  "Nov": "11", "Dec": "12"}
-
-        month = list(months.keys())[int(month) - 1]
-        year = scan_1["date"].split("-")[0]
-        hour = scan_1["date"].split("T")[1].split(":")[0]
-        minute = scan_1["date"].split("T")[1].split(":")[1]
-        second = scan_1["date"].split("T")[1].split(":")[2]
-
-        if not os.path.exists(get_configs("paths", "outputFilePath") + "/" + get_args("line")):
-            os.makedirs(get_configs("paths", "outputFilePath") + "/" + get_args("line"))
-
-        mjd = Time(datetime.strptime(day + "_" + month + "_" + year + "_" +
-                                     hour + ":" + minute + ":" + second,
-                                     "%d_%b_%Y_%H:%M:%S").isoformat(), format='isot').mjd
-
-        result_file_name = get_configs("paths", "outputFilePath") + "/" + \
-                           get_args("line") + "/" + get_args("source") + "/" +\
-                           get_args("source") + "_" + str(mjd) + "_" + \
-                           station + "_" + \
-                           get_args("iteration_number") + ".h5"
-
-        if not os.path.exists(get_configs("paths", "outputFilePath") + "/" + get_args("line") + "/"):
-            os.makedirs(get_configs("paths", "outputFilePath") + "/" + get_args("line") + "/")
-
-        if not os.path.exists(get_configs("paths", "outputFilePath") + "/" +
-                              get_args("line") + "/" + get_args("source") + "/"):
-            os.makedirs(get_configs("paths", "outputFilePath") + "/" +
-                        get_args("line") + "/" + get_args("source") + "/")
-
-        result_file = h5py.File(result_file_name, "w")
-        print("output_file_name", result_file_name)
+        result_file_name = get_output_file_name(get_configs("paths", "outputFilePath"),
+                                                get_args("source"), get_args("line"),
+                                                get_mjd(scan_date), station,
+                                                get_args("iteration_number"))
 
         sys_temp_out = np.transpose(np.array([time, self.tsys_r_left_list,
                                               self.tsys_r_right_list,
                                               self.tsys_s_left_list, self.tsys_s_right_list]))
 
-        result_file.create_dataset("system_temperature", data=sys_temp_out)
-
-        self.ston_list_left = [value for value in self.ston_list_left if str(value) != 'nan']
-        self.ston_list_right = [value for value in self.ston_list_right if str(value) != 'nan']
-        self.ston_list_avg = [value for value in self.ston_list_avg if str(value) != 'nan']
-
         time = list(time)
-        while len(time) != len(self.ston_list_left):
+        while len(time) > len(self.ston_list_left):
             time.pop()
 
         self.plot_ston = Plot()
@@ -743,10 +822,8 @@ class Analyzer(QWidget):
                                                np.transpose(y__left_avg),
                                                np.transpose(y__right_avg)]))
 
-        result_file.create_dataset("amplitude", data=total_results)
-        specie = [specie.encode("ascii", "ignore")]
-        result_file.create_dataset("specie", (len(specie),1),'S10', specie)
-        result_file.close()
+        write_output_file(result_file_name, sys_temp_out, total_results, specie,
+                          np.transpose(np.array([velocities_avg, left_variance, right_variance])))
 
     def get_data_file_for_scan(self, scan_name):
         """
@@ -754,14 +831,61 @@ class Analyzer(QWidget):
         :param scan_name: scan name
         :return: file name for scan
         """
-        file_name = ""
+        return self.scan_catalog.get_data_file(scan_name)
+
+    def add_pairs(self, pairs, spectra):
+        """
+
+        :param pairs: scan pairs
+        :param spectra: calibrated spectra of pairs of shape (pairs, 2, channels)
+        :return: None
+        """
+        if self.pair_accumulator is None:
+            self.pair_accumulator, self.specie = create_pair_accumulator(
+                self.logs, self.all_scan_pairs, self.x,
+                get_runtime_context(parse_arguments).get_source_catalog().get_coordinates(get_args("source")),
+                get_runtime_context(parse_arguments).get_station_coordinates(get_station_name(self.logs)),
+                get_configs('base_frequencies_SDR', "f" + get_args("line")), self.cuts)
+        with trace_span("accumulate", pairs=len(pairs)):
+            self.pair_accumulator.add_many(pairs, spectra)
+
+    def prefetch_scan_pairs(self, next_pairs):
+        """
+        Read and calibrate next pairs in background while current pair is reviewed
+
+        :param next_pairs: scan pairs after current pair
+        :return: None
+        """
+        next_pairs = next_pairs[:PREFETCH_PAIRS]
+        for pair in list(self.prefetched_pairs):
+            if pair not in next_pairs:
+                self.prefetched_pairs.pop(pair).cancel()
+        for pair in next_pairs:
+            if pair not in self.prefetched_pairs:
+                self.prefetched_pairs[pair] = self.prefetch_executor.submit(load_scan_pair, self.scan_catalog,
+                                                                            self.logs, pair)
+
+    @traced()
+    def get_scan_pair(self, pair):
+        """
 
-        for file in self.data_files:
-            if get_scan_name(file) == scan_name:
-                file_name = file
-                break
+        :param pair: scan pair
+        :return: prefetched pair or pair read and calibrated now if it is not prefetched
+        """
+        future = self.prefetched_pairs.pop(pair, None)
+        if future is None or future.cancelled():
+            return load_scan_pair(self.scan_catalog, self.logs, pair)
+        return future.result()
 
-        return file_name
+    def stop_prefetch(self):
+        """
+
+        :return: None
+        """
+        for future in self.prefetched_pairs.values():
+            future.cancel()
+        self.prefetched_pairs = dict()
+        self.prefetch_executor.shutdown(wait=True)
 
     def plot_pair(self, index):
         """
@@ -770,35 +894,15 @@ class Analyzer(QWidget):
         :return: None
         """
         pair = self.scan_pairs[index]
-        file1 = self.data_dir + self.get_data_file_for_scan(pair[0][1])  # s0
-        file2 = self.data_dir + self.get_data_file_for_scan(pair[0][0])  # r0
-        file3 = self.data_dir + self.get_data_file_for_scan(pair[1][1])  # s1
-        file4 = self.data_dir + self.get_data_file_for_scan(pair[1][0])  # r1
-
-        frequency_a, p_sig_left, p_sig_right = get_data(file1)  # s0
-        frequency_b, p_ref_left, p_ref_right = get_data(file2)  # r0
-        frequency_c, p_sig_on_left, p_sig_on_right = get_data(file3)  # s1
-        frequency_d, p_ref_on_left, p_ref_on_right = get_data(file4)  # r1
-
-        # fft shift
-        p_sig_left = np.fft.fftshift(p_sig_left)  # s0
-        p_sig_right = np.fft.fftshift(p_sig_right)  # s0
-        p_ref_left = np.fft.fftshift(p_ref_left)  # r0
-        p_ref_right = np.fft.fftshift(p_ref_right)  # r0
-        p_sig_on_left = np.fft.fftshift(p_sig_on_left)  # s1
-        p_sig_on_right = np.fft.fftshift(p_sig_on_right)  # s1
-        p_ref_on_left = np.fft.fftshift(p_ref_on_left)  # r1
-        p_ref_on_right = np.fft.fftshift(p_ref_on_right)  # r1
-
-        sf_left, sf_right, frequency_a1, tsys_r_left, tsys_r_right, tsys_s_left, tsys_s_right, delete_scan_files = \
-            frequency_shifting(p_sig_left, p_sig_right, p_ref_left, p_ref_right, p_sig_on_left,
-                               p_sig_on_right, p_ref_on_left,
-                               p_ref_on_right, frequency_a, self.logs, pair)
+        (scan_files, frequency_a, p_sig_left, p_sig_right, p_ref_left, p_ref_right,
+         p_sig_on_left, p_sig_on_right, p_ref_on_left, p_ref_on_right), \
+        (sf_left, sf_right, frequency_a1, tsys_r_left, tsys_r_right, tsys_s_left, tsys_s_right, delete_scan_files) = \
+            self.get_scan_pair(pair)
+        self.prefetch_scan_pairs(self.scan_pairs[index + 1:])
 
         if not delete_scan_files:
-            self.sf_left.append(sf_left)
-            self.sf_right.append(sf_right)
             self.x = frequency_a1
+            self.add_pairs([pair], [[sf_left, sf_right]])
 
             self.tsys_r_left_list.append(tsys_r_left)
             self.tsys_r_right_list.append(tsys_r_right)
@@ -810,9 +914,9 @@ class Analyzer(QWidget):
             self.plot_start__left_a.creatPlot(self.grid, 'Frequency Mhz',
                                               'Amplitude', "Left Polarization", (1, 0), "linear")
             self.plot_start__left_a.plot(frequency_a, p_sig_left, 'b', label=pair[0][1])
-            self.plot_start__left_a.plot(frequency_b, p_ref_left, 'g', label=pair[0][0])
-            self.plot_start__left_a.plot(frequency_c, p_sig_on_left, 'r', label=pair[1][1])
-            self.plot_start__left_a.plot(frequency_d, p_ref_on_left, 'y', label=pair[1][0])
+            self.plot_start__left_a.plot(frequency_a, p_ref_left, 'g', label=pair[0][0])
+            self.plot_start__left_a.plot(frequency_a, p_sig_on_left, 'r', label=pair[1][1])
+            self.plot_start__left_a.plot(frequency_a, p_ref_on_left, 'y', label=pair[1][0])
             self.grid.addWidget(self.plot_start__left_a, 0, 0)
 
             # plot2
@@ -820,12 +924,12 @@ class Analyzer(QWidget):
             self.plot_start__right_b.creatPlot(self.grid, 'Frequency Mhz',
                                                'Amplitude', "Right Polarization", (1, 1), "linear")
             self.plot_start__right_b.plot(frequency_a, p_sig_right, 'b', label=pair[0][1])
-            self.plot_start__right_b.plot(frequency_b, p_ref_right, 'g', label=pair[0][0])
-            self.plot_start__right_b.plot(frequency_c, p_sig_on_right, 'r', label=pair[1][1])
-            self.plot_start__right_b.plot(frequency_d, p_ref_on_right, 'y', label=pair[1][0])
+            self.plot_start__right_b.plot(frequency_a, p_ref_right, 'g', label=pair[0][0])
+            self.plot_start__right_b.plot(frequency_a, p_sig_on_right, 'r', label=pair[1][1])
+            self.plot_start__right_b.plot(frequency_a, p_ref_on_right, 'y', label=pair[1][0])
             self.grid.addWidget(self.plot_start__right_b, 0, 1)
 
-            scan_name = re.findall("[0-9]+", pair[0][0])[0]
+            scan_name = str(parse_scan_name(pair[0][0])[0])
 
             # plot3
             self.total__left = Plot()
@@ -841,7 +945,8 @@ class Analyzer(QWidget):
             self.total__right.plot(self.x, sf_right, 'b', label=scan_name)
             self.grid.addWidget(self.total__right, 3, 1)
         else:
-            self.scan_pairs.remove(pair) 
+            delete_data_files(scan_files, "ask")
+            self.scan_pairs.remove(pair)
 
         if index == len(self.scan_pairs) - 1:
             self.next_pair_button.setText('Move to total results')
@@ -853,6 +958,14 @@ def main():
 
     :return: None
     """
+    if get_args("trace") != "None":
+        start_trace(get_args("trace"), "sdr_fs.py")
+
+    if get_args("batch") == "True":
+        reduce_iteration(get_args("source"), get_args("line"), get_args("iteration_number"),
+                         get_args("log_file"), get_args("config"), get_args("badScans"))
+        sys.exit(0)
+
     q_app = QApplication(sys.argv)
     application = Analyzer()
     application.show()
@@ -5,10 +5,7 @@
 sdr_fs data processing tool
 """
 import sys
-import os
 import argparse
-import json
-from multiprocessing import Pool
 from PyQt5.QtWidgets import QApplication, QWidget, QDesktopWidget, QGridLayout, \
     QPushButton, QLabel, QLineEdit, QSlider, QLCDNumber, QMessageBox
 from PyQt5.QtGui import QIcon
@@ -17,12 +14,15 @@ from PyQt5.QtCore import Qt
 from PyQt5 import QtCore
 import h5py
 import numpy as np
-import pandas as pd
-from astropy.convolution import Gaussian1DKernel, convolve
 import peakutils
-from parsers.configparser_ import ConfigParser
-from utils.help import indexies, compute_gauss
+from parsers.runtime_context import RuntimeContext, get_runtime_context
+from utils.help import compute_gauss
+from utils.baseline import BaselineFit, get_baseline_mask
+from utils.smoothing import KERNEL_STDDEV, gaussian_kernel, smooth_spectra, set_kernel_attributes
+from utils.snr import get_masks, noise_level
+from utils.result_store import ResultStore
 from utils.ploting_qt5 import Plot
+from utils.trace import start_trace, trace_span, traced
 
 
 def parse_arguments():
@@ -42,6 +42,9 @@ def parse_arguments():
                         help="Set the amount of times to filter data to remove noise spikes, "
                              "higher than 5 makes little difference",
                         type=int, default=0, choices=range(0, 11), metavar="[0-10]")
+    parser.add_argument("-a", "--auto", help="Analyse output file without GUI and write result",
+                        action="store_true")
+    parser.add_argument("--trace", help="Write stage timing to Chrome trace file", type=str, default=None)
     parser.add_argument("-v", "--version", action="version", version='%(prog)s - Version 1.0')
     args = parser.parse_args()
     return args
@@ -53,7 +56,7 @@ def get_args(key):
     :param key: argument key
     :return: to script passed argument value
     """
-    return str(parse_arguments().__dict__[key])
+    return get_runtime_context(parse_arguments).get_arg(key)
 
 
 def get_configs(section, key):
@@ -63,9 +66,7 @@ def get_configs(section, key):
     :param key: configuration file sections key
     :return: configuration file section key value
     """
-    config_file_path = get_args("config")
-    config = ConfigParser(config_file_path)
-    return config.get_config(section, key)
+    return get_runtime_context(parse_arguments).get_config(section, key)
 
 
 def get_data(data_file):
@@ -100,63 +101,277 @@ def is_outlier(points, threshold):
     return modified_z_score < threshold
 
 
-def replace_bad_points(xdata, ydata, x_bad_point, y_bad_point, data):
+def rolling_mean(values, window):
     """
+    Centered rolling mean of columns from cumulative sum, window of row i is rows
+    i - window // 2 to i - window // 2 + window - 1 as in pandas rolling(window, center=True)
 
-    :param xdata: frequencies
-    :param ydata: amplitudes
-    :param x_bad_point: frequencies bad points
-    :param y_bad_point: amplitudes bad points
-    :param data: data
-    :return: return data arrays where bad points are replaced with polinom values
+    :param values: array of shape (N, columns)
+    :param window: rolling mean window
+    :return: rolling mean and mask of rows with complete window
     """
-    tempx = []
-    tempy = []
-    xlist = xdata.tolist()
-    polyfit = np.polyfit(xdata, ydata, 10)
-    poly1d = np.poly1d(polyfit)
-
-    for idx, point in enumerate(x_bad_point):
-        index = xlist.index(point)
-        if y_bad_point[idx] / ydata[index] > 1.10 or y_bad_point[idx] / ydata[index] < 0.90:
-            tempx.append(x_bad_point[idx])
-            tempy.append(y_bad_point[idx])
-            ydata[index] = poly1d(x_bad_point[idx])
+    rows = values.shape[0]
+    half = window // 2
+    count = max(rows - window + 1, 0)
+    valid = np.zeros(rows, dtype=bool)
+    valid[half:half + count] = True
+    cumulative_sum = np.zeros((rows + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=cumulative_sum[1:])
+    mean = np.zeros(values.shape)
+    mean[half:half + count] = (cumulative_sum[window:window + count] - cumulative_sum[:count]) / window
+    return mean, valid
+
+
+@traced()
+def filter_outliers(xdata, ydata_left, ydata_right, threshold, filter_count, bad_point_range):
+    """
+    Outliers of both polarizations are found with modified z-score and replaced with rolling mean
+    filter_count times, points without complete rolling mean window are kept
+
+    :param xdata: velocity
+    :param ydata_left: left polarization, it is changed in place
+    :param ydata_right: right polarization, it is changed in place
+    :param threshold: threshold for outlier filter
+    :param filter_count: amount of times to filter data
+    :param bad_point_range: rolling mean window
+    :return: velocity, left and right polarization of replaced points before filtering
+    """
+    amplitude = np.column_stack([ydata_left, ydata_right])
+    replaced = np.zeros(len(amplitude), dtype=bool)
+    original_amplitude = amplitude.copy()
+
+    for _ in range(filter_count):
+        bad_points = ~is_outlier(amplitude, threshold)
+        mean, valid = rolling_mean(amplitude, bad_point_range)
+        bad_points &= valid
+        amplitude[bad_points] = mean[bad_points]
+        replaced |= bad_points
+
+    ydata_left[:] = amplitude[:, 0]
+    ydata_right[:] = amplitude[:, 1]
+    return xdata[replaced], original_amplitude[replaced, 0], original_amplitude[replaced, 1]
+
+
+def get_analysis_parameters(context):
+    """
+
+    :param context: runtime context
+    :return: polynomial order of baseline and channels trimmed at start and end of spectrum,
+    defaults are used for keys which are not in configuration file
+    """
+    parameters = []
+    for key, default in (("polynomial_order", 3), ("trim_start", 0), ("trim_end", 0)):
+        if context.config.has_option("parameters", key):
+            parameters.append(context.get_int("parameters", key))
         else:
-            ydata[index] = data[index, 1]
-    return tempx, tempy
+            parameters.append(default)
+    return parameters
+
+
+def get_experiment_name(data_file):
+    """
+
+    :param data_file: output file
+    :return: experiment name of result store
+    """
+    return ".".join([data_file.split("/")[-1].split(".")[0], data_file.split("/")[-1].split(".")[1]])
+
+
+def find_local_maximums(baseline_left, baseline_right, smooth_left, smooth_right, smooth_avg):
+    """
+    Peak threshold is 2.5 times three sigma noise of baseline channels relative to spectrum maximum
+
+    :param baseline_left: left polarization of baseline channels
+    :param baseline_right: right polarization of baseline channels
+    :param smooth_left: smoothed left polarization
+    :param smooth_right: smoothed right polarization
+    :param smooth_avg: smoothed average polarization
+    :return: indexes of local maximums of left, right and average polarization
+    """
+    three_sigma_u1 = 3 * np.std(baseline_left)
+    three_sigma_u9 = 3 * np.std(baseline_right)
+    three_sigma_uavg = 3 * np.std((baseline_left + baseline_right) / 2)
+
+    smart_tres_u1 = 2.5 * three_sigma_u1 / np.max(smooth_left)
+    smart_tres_u9 = 2.5 * three_sigma_u9 / np.max(smooth_right)
+    smart_tres_uavg = 2.5 * three_sigma_uavg / np.max(smooth_avg)
+
+    return peakutils.indexes(smooth_left, thres=smart_tres_u1, min_dist=3), \
+           peakutils.indexes(smooth_right, thres=smart_tres_u9, min_dist=3), \
+           peakutils.indexes(smooth_avg, thres=smart_tres_uavg, min_dist=3)
+
+
+def create_result_entry(context, source, line, expername, xdata, amplitudes, cuts, calib_type, result):
+    """
+
+    :param context: runtime context
+    :param source: source
+    :param line: line
+    :param expername: experiment name
+    :param xdata: velocity
+    :param amplitudes: left, right and average polarization without baseline, not smoothed
+    :param cuts: signal regions
+    :param calib_type: SDR or DBBC
+    :param result: existing result of experiment or empty dict
+    :return: result of experiment
+    """
+    amplitude_u1, amplitude_u9, amplitude_uavg = amplitudes
+    source_velocities = context.get_velocities(source + "_" + str(line))
+    index_range_for_local_maxima = context.get_int('parameters', "index_range_for_local_maxima")
+    mjd = expername.split("_")[1]
+    location = expername.split("_")[2]
+    iteration_number = expername.split("_")[3]
+    gauss_lines = context.get_gauss_lines(source + "_" + str(line))
+
+    indexies_for_source_velocities = [0] * len(source_velocities)
+    for index in range(0, len(source_velocities)):
+        indexies_for_source_velocities[index] = (
+            np.abs(xdata - float(source_velocities[index]))).argmin()
+
+    max_amplitude_list_u1 = list()
+    max_amplitude_list_u9 = list()
+    max_amplitude_list_uavg = list()
+    for index in indexies_for_source_velocities:
+        max_amplitude_list_tmp_u1 = list()
+        max_amplitude_list_tmp_u9 = list()
+        max_amplitude_list_tmp_uavg = list()
+        for i in range(index - index_range_for_local_maxima,
+                       index + index_range_for_local_maxima):
+            max_amplitude_list_tmp_u1.append(amplitude_u1[i])
+            max_amplitude_list_tmp_u9.append(amplitude_u9[i])
+            max_amplitude_list_tmp_uavg.append(amplitude_uavg[i])
+        max_amplitude_list_u1.append(max_amplitude_list_tmp_u1)
+        max_amplitude_list_u9.append(max_amplitude_list_tmp_u9)
+        max_amplitude_list_uavg.append(max_amplitude_list_tmp_uavg)
+
+    max_apmlitudes_u1 = [np.max(value) for value in max_amplitude_list_u1]
+    max_apmlitudes_u9 = [np.max(value) for value in max_amplitude_list_u9]
+    max_apmlitudes_uavg = [np.max(value) for value in max_amplitude_list_uavg]
+
+    for maximum in range(0, len(max_apmlitudes_u1)):
+        max_apmlitudes_u1[maximum] = [source_velocities[maximum], max_apmlitudes_u1[maximum]]
+        max_apmlitudes_u9[maximum] = [source_velocities[maximum], max_apmlitudes_u9[maximum]]
+        max_apmlitudes_uavg[maximum] = \
+            [source_velocities[maximum], max_apmlitudes_uavg[maximum]]
+
+    result["modifiedJulianDays"] = mjd
+    result["location"] = location
+    result["Iteration_number"] = int(iteration_number)
+
+    result["polarizationU1"] = max_apmlitudes_u1
+    result["polarizationU9"] = max_apmlitudes_u9
+    result["polarizationAVG"] = max_apmlitudes_uavg
+    result["flag"] = False
+    if calib_type == "SDR":
+        result["type"] = "SDR"
+    else:
+        result["type"] = "DBBC"
+    with trace_span("compute_gauss", lines=len(gauss_lines)):
+        gaussian_areas, _, _, _, _, gauss_lines, \
+        gaussiana_amplitudes, gaussiana_mean, gaussiana_std = \
+            compute_gauss(xdata, amplitude_uavg, gauss_lines)
+
+    result["areas"] = gaussian_areas
+    result["gauss_amp"] = gaussiana_amplitudes
+    result["gauss_mean"] = gaussiana_mean
+    result["gauss_STD"] = gaussiana_std
 
+    _, noise_mask = get_masks(xdata, cuts)
+    ston_left, ston_right, ston_avg = noise_level([amplitude_u1, amplitude_u9, amplitude_uavg], noise_mask)
+    result["AVG_STON_LEFT"] = ston_left
+    result["AVG_STON_RIGHT"] = ston_right
+    result["AVG_STON_AVG"] = ston_avg
+    return result
 
-def signal_to_noise_ratio(frequency, amplitude, cuts):
+
+@traced()
+def write_corrected_amplitudes(data_file, xdata, smooth_amplitudes, amplitudes):
     """
 
-    :param frequency: frequency
-    :param amplitude: amplitude
-    :param cuts: signal region
-    :return: signal to noise ratio
+    :param data_file: output file
+    :param xdata: velocity
+    :param smooth_amplitudes: smoothed left, right and average polarization without baseline
+    :param amplitudes: left, right and average polarization without baseline, not smoothed
+    :return: None
+    """
+    total_results = np.transpose([xdata] + list(smooth_amplitudes))
+    total_results2 = np.transpose([xdata] + list(amplitudes))
+    result_file = h5py.File(data_file, "a")
+    if "amplitude_corrected" in result_file:
+        amplitude_corrected = result_file["amplitude_corrected"]
+        amplitude_corrected_not_smooht = result_file["amplitude_corrected_not_smooht"]
+        amplitude_corrected[...] = total_results
+        amplitude_corrected_not_smooht[...] = total_results2
+    else:
+        result_file.create_dataset("amplitude_corrected", data=total_results)
+        result_file.create_dataset("amplitude_corrected_not_smooht", data=total_results2)
+    set_kernel_attributes(result_file["amplitude_corrected"], gaussian_kernel(), KERNEL_STDDEV)
+    result_file.close()
+
+
+@traced()
+def analyze_output_file(data_file_name, line, config_file_path="config/config.cfg", calib_type="SDR",
+                        threshold=1.0, filter_count=0):
+    """
+    Analyse output file without GUI, spectrum is trimmed by trim_start and trim_end channels and
+    baseline of polynomial_order is fitted outside of configured cuts
+
+    :param data_file_name: output file name in outputFilePath/line/source
+    :param line: line
+    :param config_file_path: configuration file path
+    :param calib_type: SDR or DBBC
+    :param threshold: threshold for outlier filter
+    :param filter_count: amount of times to filter data
+    :return: result of experiment
     """
-    cuts_index = list()
-    cuts_index.append(0)
-    for cut in cuts:
-        cuts_index.append((np.abs(frequency - float(cut[0]))).argmin())
-        cuts_index.append((np.abs(frequency - float(cut[1]))).argmin())
-    cuts_index.append(-1)
-    y_array = list()
-    i = 0
-    j = 1
-    while i != len(cuts_index):
-        y_array.append(amplitude[cuts_index[i]: cuts_index[j]])
-        i = i + 2
-        j = j + 2
-    non_signal_amplitude = list()
-    for point in y_array:
-        for point_one in point:
-            non_signal_amplitude.append(point_one)
-
-    non_signal_amplitude = np.array(non_signal_amplitude)
-    std = np.std(non_signal_amplitude)
-    ston = std * 3
-    return ston
+    line = str(line)
+    context = RuntimeContext(None, config_file_path)
+    source = data_file_name.split(".")[0].split("_")[0]
+    data_file = context.get_config("paths", "outputFilePath") + "/" + line + "/" + source + "/" + data_file_name
+    with trace_span("get_data"):
+        data, _ = get_data(data_file)
+    xdata = data[:, 0]
+    ydata_left = data[:, 1]
+    ydata_right = data[:, 2]
+    if filter_count > 0:
+        filter_outliers(xdata, ydata_left, ydata_right, threshold, filter_count,
+                        context.get_int("parameters", "badPointRange"))
+
+    polynomial_order, trim_start, trim_end = get_analysis_parameters(context)
+    stop = len(xdata) - trim_end
+    xdata = np.flip(xdata, 0)[trim_start:stop]
+    ydata_left = np.flip(ydata_left, 0)[trim_start:stop]
+    ydata_right = np.flip(ydata_right, 0)[trim_start:stop]
+
+    cuts = context.get_cuts(source + "_" + line)
+    baseline_mask = get_baseline_mask(xdata, cuts)
+    with trace_span("baseline_polyfit"):
+        baseline = BaselineFit(xdata, polynomial_order, baseline_mask).baseline(
+            np.column_stack([ydata_left, ydata_right]))
+    amplitude_u1 = ydata_left - baseline[:, 0]
+    amplitude_u9 = ydata_right - baseline[:, 1]
+    amplitude_uavg = (amplitude_u1 + amplitude_u9) / 2
+
+    with trace_span("smoothing"):
+        smooth_u1, smooth_u9 = smooth_spectra(np.column_stack([amplitude_u1, amplitude_u9]), gaussian_kernel()).T
+    smooth_uavg = (smooth_u1 + smooth_u9) / 2
+
+    with trace_span("peak_detection"):
+        _, _, indexes_for_avg = find_local_maximums(ydata_left[baseline_mask], ydata_right[baseline_mask],
+                                                    smooth_u1, smooth_u9, smooth_uavg)
+    print("Local maximums of average polarization", xdata[indexes_for_avg])
+
+    expername = get_experiment_name(data_file)
+    with ResultStore(context.get_config("paths", "resultFilePath"), source, line) as result_store:
+        result = create_result_entry(context, source, line, expername, xdata,
+                                     [amplitude_u1, amplitude_u9, amplitude_uavg], cuts, calib_type,
+                                     result_store.get(expername) or dict())
+        with trace_span("write_result"):
+            result_store.put(expername, result)
+
+    write_corrected_amplitudes(data_file, xdata, [smooth_u1, smooth_u9, smooth_uavg],
+                               [amplitude_u1, amplitude_u9, amplitude_uavg])
+    return result
 
 
 class Analyzer(QWidget):
@@ -209,8 +424,9 @@ class Analyzer(QWidget):
         self.plot_10 = None
         self.plot_11 = None
         self.plot_poly_button = None
-        self.p_u1 = None
-        self.p_u9 = None
+        self.baseline_fit = None
+        self.baseline = None
+        self.click_fit = None
         self.plot_5 = None
         self.plot_6 = None
         self.plot_poly = None
@@ -238,64 +454,25 @@ class Analyzer(QWidget):
         self.maxu9_index = list()
         self.maxavg_index = list()
         self.avg_y = None
-        self.polynomial_order = 3
+        self.polynomial_order = get_analysis_parameters(get_runtime_context(parse_arguments))[0]
         self.change_parms = False
         self.source = get_args("datafile").split(".")[0].split("_")[0]
         self.data_file = get_configs("paths", "outputFilePath") + "/" + \
                          get_args("line") + "/" + \
                          self.source + "/" + \
                          get_args("datafile")
-        self.data, self.specie = get_data(self.data_file)
+        with trace_span("get_data"):
+            self.data, self.specie = get_data(self.data_file)
         self.xdata = self.data[:, 0]
         self.ydata_left = self.data[:, 1]
         self.ydata_right = self.data[:, 2]
         self.line = get_args("line")
-        self.cuts = get_configs('cuts', self.source + "_" + str(self.line)).split(";")
-        self.cuts = [c.split(",") for c in self.cuts]
+        self.cuts = get_runtime_context(parse_arguments).get_cuts(self.source + "_" + str(self.line))
 
         if int(get_args("filter")) > 0:
-            x_bad_point = []
-            y_bad_point_left = []
-            y_bad_point_right = []
-
-            for _ in range(int(get_args("filter"))):
-                outliers_mask = is_outlier(self.data, float(get_args("threshold")))
-                bad_point_index = indexies(outliers_mask, False)
-
-                if _ == 0:
-                    for idx, point in enumerate(outliers_mask):
-                        if not point:
-                            x_bad_point.append(self.data[idx, 0])
-                            y_bad_point_left.append(self.data[idx, 1])
-                            y_bad_point_right.append(self.data[idx, 2])
-
-                df_y_left = pd.DataFrame(data=self.ydata_left)
-                df_y_right = pd.DataFrame(data=self.ydata_right)
-                mean_y_left = np.nan_to_num(df_y_left.rolling(window=int(
-                    get_configs("parameters", "badPointRange")), center=True).mean())
-                mean_y_right = np.nan_to_num(df_y_right.rolling(window=int(
-                    get_configs("parameters", "badPointRange")), center=True).mean())
-                for bad_point in bad_point_index:
-                    if mean_y_left[bad_point] != 0:
-                        self.ydata_left[bad_point] = mean_y_left[bad_point]
-                for bad_point in bad_point_index:
-                    if mean_y_right[bad_point] != 0:
-                        self.ydata_right[bad_point] = mean_y_right[bad_point]
-
-                if _ == int(get_args("filter")) - 1:
-                    pool = Pool(processes=4)
-
-                    async_result1 = pool. \
-                        apply_async(replace_bad_points,
-                                    (self.xdata, self.ydata_left,
-                                     x_bad_point, y_bad_point_left, self.data))
-                    async_result2 = pool. \
-                        apply_async(replace_bad_points,
-                                    (self.xdata, self.ydata_right,
-                                     x_bad_point, y_bad_point_right, self.data))
-
-                    x_bad_point, y_bad_point_left = async_result1.get()
-                    x_bad_point, y_bad_point_right = async_result2.get()
+            bad_point_range = get_runtime_context(parse_arguments).get_int("parameters", "badPointRange")
+            filter_outliers(self.xdata, self.ydata_left, self.ydata_right,
+                            float(get_args("threshold")), int(get_args("filter")), bad_point_range)
 
         self.data_points = len(self.xdata)
         self.m = 0
@@ -394,6 +571,7 @@ class Analyzer(QWidget):
         self.xdata = self.xdata[self.m:self.n]
         self.ydata_left = self.ydata_left[self.m:self.n]
         self.ydata_right = self.ydata_right[self.m:self.n]
+        self.click_fit = None
 
         # u1 plot
         self.plot_10 = Plot()
@@ -620,17 +798,15 @@ class Analyzer(QWidget):
             if pointx[ind].size > 1:
                 print("Too many points selected")
             else:
-                y_list = self.ydata_right.tolist()
-                index = y_list.index(pointy[ind])
+                index = int(np.flatnonzero(self.ydata_right == pointy[ind])[0])
                 if self.xdata[index] not in self.x_bad_points_right:
                     self.xdata = self.xdata.reshape(self.xdata.shape[0])
-                    polyfit = np.polyfit(self.xdata, self.ydata_right[:], 10)
-                    poly1d = np.poly1d(polyfit)
                     self.y_bad_point_right.append(self.ydata_right[index])
                     self.x_bad_points_right.append(self.xdata[index])
                     self.badplot_2_right[0]. \
                         set_data(self.x_bad_points_right, self.y_bad_point_right)
-                    self.ydata_right[index] = poly1d(self.xdata[index])
+                    self.ydata_right[index] = self.get_click_baseline(self.ydata_right,
+                                                                      self.x_bad_points_right, index)
                     event.canvas.draw()
                     event.canvas.flush_events()
 
@@ -648,19 +824,32 @@ class Analyzer(QWidget):
             if pointx[ind].size > 1:
                 print("Too many points selected")
             else:
-                y_list = self.ydata_left.tolist()
-                index = y_list.index(pointy[ind])
+                index = int(np.flatnonzero(self.ydata_left == pointy[ind])[0])
                 if self.xdata[index] not in self.x_bad_points_left:
                     self.xdata = self.xdata.reshape(self.xdata.shape[0])
-                    polyfit = np.polyfit(self.xdata, self.ydata_left[:], 10)
-                    poly1d = np.poly1d(polyfit)
                     self.y_bad_point_left.append(self.ydata_left[index])
                     self.x_bad_points_left.append(self.xdata[index])
                     self.badplot_1_left[0].set_data(self.x_bad_points_left, self.y_bad_point_left)
-                    self.ydata_left[index] = poly1d(self.xdata[index])
+                    self.ydata_left[index] = self.get_click_baseline(self.ydata_left,
+                                                                     self.x_bad_points_left, index)
                     event.canvas.draw()
                     event.canvas.flush_events()
 
+    def get_click_baseline(self, ydata, x_bad_points, index):
+        """
+        Polynomial of order 10 over whole spectrum without clicked bad points, factorization is
+        computed once for velocity grid
+
+        :param ydata: polarization
+        :param x_bad_points: velocities of clicked bad points
+        :param index: index of clicked point
+        :return: polynomial value at index
+        """
+        if self.click_fit is None:
+            self.click_fit = BaselineFit(self.xdata, 10)
+        excluded = np.flatnonzero(np.isin(self.xdata, x_bad_points))
+        return self.click_fit.evaluate(self.click_fit.fit(ydata, excluded), index)
+
     def remove_cuts(self):
         """
 
@@ -672,51 +861,15 @@ class Analyzer(QWidget):
             self.grid.removeWidget(self.change_params_buttons)
             del self.change_params_buttons
 
-        cuts_index = list()
-        cuts_index.append(0)
-        for cut in self.cuts:
-            cuts_index.append((np.abs(self.xdata - float(cut[0]))).argmin())
-            cuts_index.append((np.abs(self.xdata - float(cut[1]))).argmin())
-
-        cuts_index.append(self.n)
-        poly_array_x = list()
-        poly_array_u1 = list()
-        poly_array_u9 = list()
-        i = 0
-        j = 1
-
-        while i != len(cuts_index):
-            poly_array_x.append(self.xdata[cuts_index[i]: cuts_index[j]])
-            poly_array_u1.append(self.ydata_left[cuts_index[i]: cuts_index[j]])
-            poly_array_u9.append(self.ydata_right[cuts_index[i]: cuts_index[j]])
-            i = i + 2
-            j = j + 2
-
-        poly_x = list()
-        poly_u1 = list()
-        poly_u9 = list()
-
-        for p in poly_array_x:
-            for p1 in p:
-                poly_x.append(p1)
-
-        for p in poly_array_u1:
-            for p1 in p:
-                poly_u1.append(p1)
-
-        for p in poly_array_u9:
-            for p1 in p:
-                poly_u9.append(p1)
+        baseline_mask = get_baseline_mask(self.xdata, self.cuts, self.n)
+        polyx = self.xdata[baseline_mask]
+        self.polyu1 = self.ydata_left[baseline_mask]
+        self.polyu9 = self.ydata_right[baseline_mask]
 
-        polyx = np.array(poly_x)
-        self.polyu1 = np.array(poly_u1)
-        self.polyu9 = np.array(poly_u9)
-
-        z_u1 = np.polyfit(polyx, self.polyu1, self.polynomial_order)
-        self.p_u1 = np.poly1d(z_u1)
-
-        z_u9 = np.polyfit(polyx, self.polyu9, self.polynomial_order)
-        self.p_u9 = np.poly1d(z_u9)
+        with trace_span("baseline_polyfit"):
+            self.baseline_fit = BaselineFit(self.xdata, self.polynomial_order, baseline_mask)
+            self.baseline = self.baseline_fit.baseline(np.column_stack([self.ydata_left,
+                                                                        self.ydata_right]))
 
         self.plot_10.hide()
         self.plot_11.close()
@@ -741,7 +894,7 @@ class Analyzer(QWidget):
                               "linear")
         self.plot_5.plot(polyx, self.polyu1, 'ko',
                          label='Data Points', markersize=1)
-        self.plot_5.plot(self.xdata, self.p_u1(self.xdata),
+        self.plot_5.plot(self.xdata, self.baseline[:, 0],
                          'b', label='Numpy polyfit', markersize=1)
 
         # u9 plot
@@ -751,7 +904,7 @@ class Analyzer(QWidget):
                               "linear")
         self.plot_6.plot(polyx, self.polyu9,
                          'ko', label='Data Points', markersize=1)
-        self.plot_6.plot(self.xdata, self.p_u9(self.xdata),
+        self.plot_6.plot(self.xdata, self.baseline[:, 1],
                          'b', label='Numpy polyfit', markersize=1)
 
         self.grid.addWidget(self.plot_5, 0, 0)
@@ -789,31 +942,22 @@ class Analyzer(QWidget):
         self.grid.addWidget(self.monitoring_button, 3, 3)
         self.monitoring_button.clicked.connect(self.create_result)
         self.monitoring_button.setStyleSheet("background-color: green")
-        self.local_max_array_u1 = self.ydata_left - self.p_u1(self.xdata)
-        self.local_max_array_u9 = self.ydata_right - self.p_u9(self.xdata)
+        self.local_max_array_u1 = self.ydata_left - self.baseline[:, 0]
+        self.local_max_array_u9 = self.ydata_right - self.baseline[:, 1]
         self.z1_not_smooht_data = self.local_max_array_u1
         self.z2_not_smooht_data = self.local_max_array_u9
         self.avg_y_not_smoohtData = (self.z1_not_smooht_data + self.z2_not_smooht_data) / 2
 
-        g1 = Gaussian1DKernel(stddev=3, x_size=19, mode='center', factor=100)
-        g2 = Gaussian1DKernel(stddev=3, x_size=19, mode='center', factor=100)
-        self.z1_smooht_data = convolve(self.local_max_array_u1, g1, boundary='extend')
-        self.z2_smooht_data = convolve(self.local_max_array_u9, g2, boundary='extend')
+        with trace_span("smoothing"):
+            self.z1_smooht_data, self.z2_smooht_data = smooth_spectra(
+                np.column_stack([self.local_max_array_u1, self.local_max_array_u9]), gaussian_kernel()).T
         self.avg_y_smooht_data = (self.z1_smooht_data + self.z2_smooht_data) / 2
 
-        three_sigma_u1 = 3 * np.std(self.polyu1)
-        three_sigma_u9 = 3 * np.std(self.polyu9)
-        polyu_avg = (self.polyu1 + self.polyu9) / 2
-        three_sigma_uavg = 3 * np.std(polyu_avg)
-
-        smart_tres_u1 = 2.5 * three_sigma_u1 / np.max(self.z1_smooht_data)
-        smart_tres_u9 = 2.5 * three_sigma_u9 / np.max(self.z2_smooht_data)
-        smart_tres_uavg = 2.5 * three_sigma_uavg / np.max(self.avg_y_smooht_data)
-
         # indexsu apreikinasana
-        indexes_for_ceb = peakutils.indexes(self.z1_smooht_data, thres=smart_tres_u1, min_dist=3)
-        indexes_for_ceb2 = peakutils.indexes(self.z2_smooht_data, thres=smart_tres_u9, min_dist=3)
-        indexes_for_avg = peakutils.indexes(self.avg_y_smooht_data, thres=smart_tres_uavg, min_dist=3)
+        with trace_span("peak_detection"):
+            indexes_for_ceb, indexes_for_ceb2, indexes_for_avg = \
+                find_local_maximums(self.polyu1, self.polyu9, self.z1_smooht_data,
+                                    self.z2_smooht_data, self.avg_y_smooht_data)
 
         # u1
         self.plot_7 = Plot()
@@ -857,111 +1001,22 @@ class Analyzer(QWidget):
 
         :return: None
         """
-        result_file_name = self.source + "_" + self.line + ".json"
         result_file_path = get_configs("paths", "resultFilePath")
-        expername = ".".join([self.data_file.split("/")[-1].split(".")[0],
-                             self.data_file.split("/")[-1].split(".")[1]])
-        source_velocities = get_configs('velocities',
-                                        self.source + "_" +
-                                        str(self.line)).replace(" ", "").split(",")
-        index_range_for_local_maxima = int(get_configs('parameters',
-                                                       "index_range_for_local_maxima"))
-        mjd = expername.split("_")[1]
-        location = expername.split("_")[2]
-        iteration_number = expername.split("_")[3]
-        gauss_lines = get_configs("gauss_lines",
-                                  self.source + "_" + get_args("line")).replace(" ", "").split(",")
-
-        if os.path.isfile(result_file_path + result_file_name):
-            pass
-        else:
-            os.system("touch " + result_file_path + result_file_name)
-
-            result_file = open(result_file_path + result_file_name, "w")
-            result_file.write("{ \n" + "\n}")
-            result_file.close()
-
-        with open(result_file_path + result_file_name) as result_data:
-            result = json.load(result_data)
-
-        if expername not in result:
-            result[expername] = dict()
-        indexies_for_source_velocities = [0] * len(source_velocities)
-        for index in range(0, len(source_velocities)):
-            indexies_for_source_velocities[index] = (
-                np.abs(self.xdata - float(source_velocities[index]))).argmin()
-
-        max_amplitude_list_u1 = list()
-        max_amplitude_list_u9 = list()
-        max_amplitude_list_uavg = list()
-        for index in indexies_for_source_velocities:
-            max_amplitude_list_tmp_u1 = list()
-            max_amplitude_list_tmp_u9 = list()
-            max_amplitude_list_tmp_uavg = list()
-            for i in range(index - index_range_for_local_maxima,
-                           index + index_range_for_local_maxima):
-                max_amplitude_list_tmp_u1.append(self.z1_not_smooht_data[i])
-                max_amplitude_list_tmp_u9.append(self.z2_not_smooht_data[i])
-                max_amplitude_list_tmp_uavg.append(self.avg_y_not_smoohtData[i])
-            max_amplitude_list_u1.append(max_amplitude_list_tmp_u1)
-            max_amplitude_list_u9.append(max_amplitude_list_tmp_u9)
-            max_amplitude_list_uavg.append(max_amplitude_list_tmp_uavg)
-
-        max_apmlitudes_u1 = [np.max(value) for value in max_amplitude_list_u1]
-        max_apmlitudes_u9 = [np.max(value) for value in max_amplitude_list_u9]
-        max_apmlitudes_uavg = [np.max(value) for value in max_amplitude_list_uavg]
-
-        for maximum in range(0, len(max_apmlitudes_u1)):
-            max_apmlitudes_u1[maximum] = [source_velocities[maximum], max_apmlitudes_u1[maximum]]
-            max_apmlitudes_u9[maximum] = [source_velocities[maximum], max_apmlitudes_u9[maximum]]
-            max_apmlitudes_uavg[maximum] = \
-                [source_velocities[maximum], max_apmlitudes_uavg[maximum]]
-
-        result[expername]["modifiedJulianDays"] = mjd
-        result[expername]["location"] = location
-        result[expername]["Iteration_number"] = int(iteration_number)
-
-        result[expername]["polarizationU1"] = max_apmlitudes_u1
-        result[expername]["polarizationU9"] = max_apmlitudes_u9
-        result[expername]["polarizationAVG"] = max_apmlitudes_uavg
-        result[expername]["flag"] = False
-        if get_args("calibType") == "SDR":
-            result[expername]["type"] = "SDR"
-        else:
-            result[expername]["type"] = "DBBC"
-        gaussian_areas, _, _, _, _, gauss_lines, \
-        gaussiana_amplitudes, gaussiana_mean, gaussiana_std = \
-            compute_gauss(self.xdata, self.avg_y_not_smoohtData, gauss_lines)
-
-        result[expername]["areas"] = gaussian_areas
-        result[expername]["gauss_amp"] = gaussiana_amplitudes
-        result[expername]["gauss_mean"] = gaussiana_mean
-        result[expername]["gauss_STD"] = gaussiana_std
-
-        result[expername]["AVG_STON_LEFT"] = \
-            signal_to_noise_ratio(self.xdata, self.z1_not_smooht_data, self.cuts)
-        result[expername]["AVG_STON_RIGHT"] = \
-            signal_to_noise_ratio(self.xdata, self.z2_not_smooht_data, self.cuts)
-        result[expername]["AVG_STON_AVG"] = \
-            signal_to_noise_ratio(self.xdata, self.avg_y_not_smoohtData, self.cuts)
-
-        with open(result_file_path + result_file_name, "w") as output:
-            output.write(json.dumps(result, indent=2))
-
-        total_results = np.transpose([self.xdata, self.z1_smooht_data,
-                                      self.z2_smooht_data, self.avg_y_smooht_data])
-        total_results2 = np.transpose([self.xdata, self.z1_not_smooht_data,
-                                       self.z2_not_smooht_data, self.avg_y_not_smoohtData])
-        result_file = h5py.File(self.data_file, "a")
-        if "amplitude_corrected" in result_file:
-            amplitude_corrected = result_file["amplitude_corrected"]
-            amplitude_corrected_not_smooht = result_file["amplitude_corrected_not_smooht"]
-            amplitude_corrected[...] = total_results
-            amplitude_corrected_not_smooht[...] = total_results2
-        else:
-            result_file.create_dataset("amplitude_corrected", data=total_results)
-            result_file.create_dataset("amplitude_corrected_not_smooht", data=total_results2)
-        result_file.close()
+        expername = get_experiment_name(self.data_file)
+        context = get_runtime_context(parse_arguments)
+
+        with ResultStore(result_file_path, self.source, self.line) as result_store:
+            result = create_result_entry(context, self.source, self.line, expername, self.xdata,
+                                         [self.z1_not_smooht_data, self.z2_not_smooht_data,
+                                          self.avg_y_not_smoohtData],
+                                         self.cuts, get_args("calibType"), result_store.get(expername) or dict())
+
+            with trace_span("write_result"):
+                result_store.put(expername, result)
+
+        write_corrected_amplitudes(self.data_file, self.xdata,
+                                   [self.z1_smooht_data, self.z2_smooht_data, self.avg_y_smooht_data],
+                                   [self.z1_not_smooht_data, self.z2_not_smooht_data, self.avg_y_not_smoohtData])
         self._quit()
 
     def center(self):
@@ -993,6 +1048,14 @@ def main():
 
     :return: None
     """
+    if get_args("trace") != "None":
+        start_trace(get_args("trace"), "total_spectrum_analyzer_qt5.py")
+
+    if get_args("auto") == "True":
+        analyze_output_file(get_args("datafile"), get_args("line"), get_args("config"), get_args("calibType"),
+                            float(get_args("threshold")), int(get_args("filter")))
+        sys.exit(0)
+
     q_app = QApplication(sys.argv)
     application = Analyzer()
     application.show()
@@ -0,0 +1,109 @@
+"""
+polynomial baseline of spectra from QR factorization of scaled Vandermonde matrix
+"""
+import numpy as np
+from scipy.linalg import solve_triangular
+
+
+def get_baseline_mask(velocity, cuts, stop=None):
+    """
+    Channels from start of spectrum to first cut, between cuts and from last cut to stop are baseline
+
+    :param velocity: velocity grid
+    :param cuts: signal regions as list of [start, stop] velocities
+    :param stop: last channel of baseline, default is size of velocity grid
+    :return: baseline mask
+    """
+    velocity = np.asarray(velocity)
+    if stop is None:
+        stop = len(velocity)
+    cuts_index = [0]
+    for cut in cuts:
+        cuts_index.append((np.abs(velocity - float(cut[0]))).argmin())
+        cuts_index.append((np.abs(velocity - float(cut[1]))).argmin())
+    cuts_index.append(stop)
+
+    mask = np.zeros(len(velocity), dtype=bool)
+    for start, end in zip(cuts_index[0::2], cuts_index[1::2]):
+        mask[start:end] = True
+    return mask
+
+
+class BaselineFit:
+    """
+    Least squares polynomial fit for one velocity grid and channel mask. Velocity is scaled to [-1, 1]
+    and factorized once, spectra of both polarizations are fitted in one solve and channels can be
+    excluded from fit without factorizing again.
+    """
+
+    def __init__(self, velocity, order, mask=None):
+        """
+
+        :param velocity: velocity grid
+        :param order: polynomial order
+        :param mask: channels used in fit, default is all channels
+        """
+        self.velocity = np.asarray(velocity, dtype=np.float64)
+        self.order = int(order)
+        if mask is None:
+            mask = np.ones(len(self.velocity), dtype=bool)
+        self.mask = np.asarray(mask, dtype=bool)
+        self.rows = np.cumsum(self.mask) - 1
+
+        velocity_min = np.min(self.velocity)
+        velocity_max = np.max(self.velocity)
+        self.center = (velocity_max + velocity_min) / 2
+        self.scale = (velocity_max - velocity_min) / 2
+        if self.scale == 0:
+            self.scale = 1.0
+        self.vandermonde = np.vander(self.scale_velocity(self.velocity), self.order + 1)
+        self.q, self.r = np.linalg.qr(self.vandermonde[self.mask])
+
+    def scale_velocity(self, velocity):
+        """
+
+        :param velocity: velocity
+        :return: velocity scaled to [-1, 1] on velocity grid
+        """
+        return (np.asarray(velocity, dtype=np.float64) - self.center) / self.scale
+
+    def fit(self, values, excluded=None):
+        """
+        Excluded channels are removed from factorized fit as update of its
+        (order + 1) x (order + 1) normal matrix
+
+        :param values: spectrum or spectra of shape (channels, polarizations) on velocity grid
+        :param excluded: indexes of channels left out of fit
+        :return: coefficients of scaled polynomial, highest power first
+        """
+        values = np.asarray(values, dtype=np.float64)[self.mask]
+        projection = self.q.T @ values
+        if excluded is not None:
+            excluded = np.unique(np.asarray(excluded, dtype=int))
+            excluded = excluded[self.mask[excluded]]
+            if len(excluded) > 0:
+                excluded_q = self.q[self.rows[excluded]]
+                normal_matrix = np.eye(self.order + 1) - excluded_q.T @ excluded_q
+                projection = np.linalg.solve(normal_matrix,
+                                             projection - excluded_q.T @ values[self.rows[excluded]])
+        return solve_triangular(self.r, projection)
+
+    def evaluate(self, coefficients, index=None):
+        """
+
+        :param coefficients: coefficients from fit
+        :param index: channel indexes, default is all channels
+        :return: baseline on velocity grid
+        """
+        if index is None:
+            return self.vandermonde @ coefficients
+        return self.vandermonde[index] @ coefficients
+
+    def baseline(self, values, excluded=None):
+        """
+
+        :param values: spectrum or spectra of shape (channels, polarizations) on velocity grid
+        :param excluded: indexes of channels left out of fit
+        :return: fitted baseline on velocity grid
+        """
+        return self.evaluate(self.fit(values, excluded))
@@ -0,0 +1,79 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+Detect peaks of all output spectra of source and write them to peak catalog
+"""
+import sys
+import os
+import argparse
+
+PACKAGE_PARENT = '..'
+SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+
+from parsers.runtime_context import get_runtime_context
+from utils.peak_catalog import THRESHOLD_FACTOR, MIN_DISTANCE, build_peak_catalog
+
+
+def parse_arguments():
+    """
+
+    :return: dict with passed args to script
+    """
+    parser = argparse.ArgumentParser(description='''Detect peaks of left, right and average polarization
+    of all output spectra of source and write them to peak catalog (source_line_peaks.db) in result path. ''')
+    parser.add_argument("source", help="source name", type=str)
+    parser.add_argument("line", help="Observed frequency", type=int)
+    parser.add_argument("--factor", help="Peak threshold in units of three sigma noise",
+                        type=float, default=THRESHOLD_FACTOR)
+    parser.add_argument("--distance", help="Smallest distance between peaks in channels",
+                        type=int, default=MIN_DISTANCE)
+    parser.add_argument("-c", "--config", help="Configuration cfg file",
+                        type=str, default="config/config.cfg")
+    parser.add_argument("-v", "--version", action="version", version='%(prog)s - Version 1.0')
+    args = parser.parse_args()
+    return args
+
+
+def get_args(key):
+    """
+
+    :param key: argument key
+    :return: to script passed argument value
+    """
+    return get_runtime_context(parse_arguments).get_arg(key)
+
+
+def get_configs(section, key):
+    """
+
+    :param section: configuration file section
+    :param key: configuration file sections key
+    :return: configuration file section key value
+    """
+    return get_runtime_context(parse_arguments).get_config(section, key)
+
+
+def main():
+    """
+    :return: None
+    """
+    context = get_runtime_context(parse_arguments)
+    source = get_args("source")
+    line = get_args("line")
+    vmin, vmax = context.get_source_catalog().get_velocity_range(source)
+    try:
+        catalog_file_name, peaks_count = build_peak_catalog(
+            get_configs("paths", "outputFilePath") + line + "/" + source, get_configs("paths", "monitoringFilePath"),
+            get_configs("paths", "resultFilePath"), source, line, context.get_cuts(source + "_" + line),
+            vmin, vmax, context.args.factor, context.args.distance)
+    except ValueError as error:
+        print("Error: " + str(error))
+        sys.exit(1)
+    print(str(peaks_count) + " peaks written to " + catalog_file_name)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
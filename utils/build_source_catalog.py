@@ -0,0 +1,47 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+Validate source sections of configuration file and compile source catalog
+"""
+import sys
+import os
+import argparse
+
+PACKAGE_PARENT = '..'
+SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+
+from parsers.source_catalog import load_source_catalog, get_catalog_file_name, VRANGE_FILE_NAME
+
+
+def parse_arguments():
+    """
+
+    :return: dict with passed args to script
+    """
+    parser = argparse.ArgumentParser(description='''Validate sections sources, velocities, cuts, gauss_lines,
+    Full_source_name of configuration file and velocity range file and compile them into source catalog. ''')
+    parser.add_argument("-r", "--vrange", help="Velocity range file",
+                        type=str, default=VRANGE_FILE_NAME)
+    parser.add_argument("-c", "--config", help="Configuration cfg file",
+                        type=str, default="config/config.cfg")
+    parser.add_argument("-v", "--version", action="version", version='%(prog)s - Version 1.0')
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    """
+    :return: None
+    """
+    args = parse_arguments()
+    source_catalog = load_source_catalog(args.config, args.vrange, rebuild=True)
+    print("Compiled " + get_catalog_file_name(args.config) + " with " + str(len(source_catalog.sources)) +
+          " sources, " + str(len(source_catalog.lines)) + " source lines and " +
+          str(len(source_catalog.errors)) + " errors")
+    sys.exit(1 if source_catalog.errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+Export result store to JSON result file
+"""
+import sys
+import os
+import argparse
+
+PACKAGE_PARENT = '..'
+SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+
+from parsers.runtime_context import get_runtime_context
+from utils.result_store import ResultStore
+
+
+def parse_arguments():
+    """
+
+    :return: dict with passed args to script
+    """
+    parser = argparse.ArgumentParser(description='''Export result store to JSON result file. ''')
+    parser.add_argument("source", help="source name", type=str)
+    parser.add_argument("line", help="Observed frequency", type=int)
+    parser.add_argument("-o", "--output", help="JSON result file, default is result file in result path",
+                        type=str, default=None)
+    parser.add_argument("-c", "--config", help="Configuration cfg file",
+                        type=str, default="config/config.cfg")
+    parser.add_argument("-v", "--version", action="version", version='%(prog)s - Version 1.0')
+    args = parser.parse_args()
+    return args
+
+
+def get_args(key):
+    """
+
+    :param key: argument key
+    :return: to script passed argument value
+    """
+    return get_runtime_context(parse_arguments).get_arg(key)
+
+
+def get_configs(section, key):
+    """
+
+    :param section: configuration file section
+    :param key: configuration file sections key
+    :return: configuration file section key value
+    """
+    return get_runtime_context(parse_arguments).get_config(section, key)
+
+
+def main():
+    """
+    :return: None
+    """
+    output = get_runtime_context(parse_arguments).args.output
+    with ResultStore(get_configs("paths", "resultFilePath"), get_args("source"), get_args("line")) as result_store:
+        json_file_name = result_store.export_json(output)
+        print(str(len(result_store)) + " experiments exported to " + json_file_name)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,6 @@ If output file is changed manually, run this script to change result file
 import sys
 import os
 import argparse
-import json
 import h5py
 import numpy as np
 
@@ -16,8 +15,9 @@ PACKAGE_PARENT = '..'
 SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
 sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
 
-from parsers.configparser_ import ConfigParser
+from parsers.runtime_context import get_runtime_context
 from utils.help import get_iteration_from_output_file
+from utils.result_store import ResultStore
 
 
 def parse_arguments():
@@ -41,7 +41,7 @@ def get_args(key):
     :param key: argument key
     :return: to script passed argument value
     """
-    return str(parse_arguments().__dict__[key])
+    return get_runtime_context(parse_arguments).get_arg(key)
 
 
 def get_configs(section, key):
@@ -51,9 +51,7 @@ def get_configs(section, key):
     :param key: configuration file sections key
     :return: configuration file section key value
     """
-    config_file_path = get_args("config")
-    config = ConfigParser(config_file_path)
-    return config.get_config(section, key)
+    return get_runtime_context(parse_arguments).get_config(section, key)
 
 
 def get_local_max(data_tmp, source_velocities, index_range_for_local_maxima):
@@ -96,39 +94,31 @@ def get_local_max(data_tmp, source_velocities, index_range_for_local_maxima):
     return (max_amplitudes_u1, max_amplitudes_u9, max_amplitudes_uavg)
 
 
-def change_result_amplitudes(output_files, result_file, output_file_path, source_velocities, index_range_for_local_maxima, source, type_of_observation, line):
-    with open(result_file) as result:
-        result_json = json.load(result)
-
+def change_result_amplitudes(output_files, result_store, output_file_path, source_velocities, index_range_for_local_maxima, source, type_of_observation, line):
     for output_file in output_files:
         iteration = get_iteration_from_output_file(output_file)
         data_tmp = h5py.File(output_file_path + line + "/" + source + "/" +output_file, "r")
         if "amplitude_corrected_not_smooht" in data_tmp:
             max_apmlitudes_u1, max_apmlitudes_u9, max_apmlitudes_uavg = get_local_max(data_tmp,
                                                                                 source_velocities, index_range_for_local_maxima)
+            result_json = result_store.find(iteration=iteration, type_of_observation=type_of_observation)
             for key in result_json.keys():
                 if key.endswith( "_" + str( iteration ) ):
-                    if result_json[key]["type"] == type_of_observation:
-                        result_json[key]["polarizationU1"] = max_apmlitudes_u1
-                        result_json[key]["polarizationU9"] = max_apmlitudes_u9
-                        result_json[key]["polarizationAVG"] = max_apmlitudes_uavg
+                    result_store.update(key, polarizationU1=max_apmlitudes_u1, polarizationU9=max_apmlitudes_u9,
+                                        polarizationAVG=max_apmlitudes_uavg)
 
         else:
             print("Output " + output_file + " file has no amplitude_corrected_not_smooht colomm")
 
-    result_file = open(result_file, "w")
-    result_file.write(json.dumps(result_json, indent=2))
-    result_file.close()
-
 
 def main():
     output_file_path = get_configs('paths', "outputFilePath")
     result_file_path = get_configs('paths', "resultFilePath")
     source_velocities = get_configs('velocities', get_args("source") + "_" + get_args("line")).replace(" ", "").split(",")
     index_range_for_local_maxima = int( get_configs('parameters', "index_range_for_local_maxima"))
-    result_file = result_file_path + get_args("source") + "_" + get_args("line") + ".json"
     output_files = os.listdir(output_file_path + get_args("line") + "/" + get_args("source"))
-    change_result_amplitudes(output_files, result_file, output_file_path, source_velocities, index_range_for_local_maxima, get_args("source"), get_args("type"), get_args("line"))
+    with ResultStore(result_file_path, get_args("source"), get_args("line")) as result_store:
+        change_result_amplitudes(output_files, result_store, output_file_path, source_velocities, index_range_for_local_maxima, get_args("source"), get_args("type"), get_args("line"))
 
     sys.exit()
 
@@ -0,0 +1,255 @@
+"""
+monitoring cube of all output spectra of source
+"""
+import os
+import numpy as np
+import h5py
+
+CUBE_FILE_SUFFIX = "_cube.h5"
+POLARIZATIONS = {"left": 1, "right": 2, "avg": 3}
+EPOCHS_PER_CHUNK = 16
+
+
+def get_cube_file_name(monitoring_file_path, source, line):
+    """
+
+    :param monitoring_file_path: monitoring file path
+    :param source: source name
+    :param line: line
+    :return: monitoring cube file name
+    """
+    return os.path.join(monitoring_file_path, source + "_" + str(line) + CUBE_FILE_SUFFIX)
+
+
+def get_output_files(output_dir, source):
+    """
+
+    :param output_dir: output directory of source and line
+    :param source: source name
+    :return: dict of output file name and modification time
+    """
+    return {entry.name: entry.stat().st_mtime_ns for entry in os.scandir(output_dir)
+            if entry.name.startswith(source) and entry.name.endswith(".h5")}
+
+
+def read_spectrum(output_file_name, dataset):
+    """
+
+    :param output_file_name: output file
+    :param dataset: dataset name
+    :return: spectrum with velocity in first column or None if output file has no dataset
+    """
+    with h5py.File(output_file_name, "r") as output_file:
+        if dataset not in output_file:
+            return None
+        return output_file[dataset][()]
+
+
+def read_velocity(output_file_name, dataset):
+    """
+
+    :param output_file_name: output file
+    :param dataset: dataset name
+    :return: velocity column of spectrum or None if output file has no dataset
+    """
+    with h5py.File(output_file_name, "r") as output_file:
+        if dataset not in output_file:
+            return None
+        return output_file[dataset][:, 0]
+
+
+def regrid(spectrum, velocity_grid):
+    """
+
+    :param spectrum: spectrum with velocity in first column
+    :param velocity_grid: common velocity grid
+    :return: left, right and average polarization on velocity grid, nan outside of spectrum
+    """
+    order = np.argsort(spectrum[:, 0])
+    velocity = spectrum[order, 0]
+    return np.array([np.interp(velocity_grid, velocity, spectrum[order, column], left=np.nan, right=np.nan)
+                     for column in POLARIZATIONS.values()])
+
+
+class MonitoringCube:
+    """
+    All spectra of source from one output file dataset on common velocity grid in one
+    chunked HDF5 file with shape epochs x channels for each polarization.
+    Only new and modified output files are read on update.
+    """
+
+    def __init__(self, cube_file_name, dataset="amplitude_corrected_not_smooht", vmin=None, vmax=None):
+        self.cube_file_name = cube_file_name
+        self.dataset = dataset
+        self.vmin = vmin
+        self.vmax = vmax
+
+    def _create_grid(self, velocities):
+        """
+
+        :param velocities: velocity columns of spectra
+        :return: velocity grid, from vmin to vmax or covering all spectra
+        """
+        step = np.min([np.median(np.abs(np.diff(velocity))) for velocity in velocities])
+        if self.vmin is not None and self.vmax is not None:
+            start, stop = self.vmin, self.vmax
+        else:
+            start = np.min([np.min(velocity) for velocity in velocities])
+            stop = np.max([np.max(velocity) for velocity in velocities])
+        return start + step * np.arange(int(np.floor((stop - start) / step + 1e-9)) + 1)
+
+    def _grid_is_valid(self, group, velocities):
+        """
+
+        :param group: cube group
+        :param velocities: velocity columns of new spectra
+        :return: True if velocity grid of cube can be used for new spectra
+        """
+        if group.attrs["vmin"] != str(self.vmin) or group.attrs["vmax"] != str(self.vmax):
+            return False
+        if self.vmin is not None and self.vmax is not None:
+            return True
+        velocity_grid = group["velocity"][()]
+        step = velocity_grid[1] - velocity_grid[0] if len(velocity_grid) > 1 else 0
+        return all(np.min(velocity) >= velocity_grid[0] - step and
+                   np.max(velocity) <= velocity_grid[-1] + step for velocity in velocities)
+
+    def _create_group(self, cube_file, velocity_grid):
+        """
+
+        :param cube_file: cube file
+        :param velocity_grid: common velocity grid
+        :return: cube group
+        """
+        if self.dataset in cube_file:
+            del cube_file[self.dataset]
+        group = cube_file.create_group(self.dataset)
+        group.attrs["vmin"] = str(self.vmin)
+        group.attrs["vmax"] = str(self.vmax)
+        group.create_dataset("velocity", data=velocity_grid)
+        group.create_dataset("mjd", (0,), maxshape=(None,), dtype=np.float64, chunks=(1024,))
+        group.create_dataset("mtime", (0,), maxshape=(None,), dtype=np.int64, chunks=(1024,))
+        group.create_dataset("file", (0,), maxshape=(None,), dtype=h5py.string_dtype(), chunks=(1024,))
+        for polarization in POLARIZATIONS:
+            group.create_dataset(polarization, (0, len(velocity_grid)), maxshape=(None, len(velocity_grid)),
+                                 dtype=np.float64, chunks=(EPOCHS_PER_CHUNK, len(velocity_grid)),
+                                 fillvalue=np.nan)
+        return group
+
+    @staticmethod
+    def _write(group, rows, file_names, mtimes, spectra):
+        """
+
+        :param group: cube group
+        :param rows: cube rows of spectra
+        :param file_names: output file names
+        :param mtimes: output file modification times
+        :param spectra: left, right and average polarization on velocity grid of each spectrum
+        :return: None
+        """
+        size = max(max(rows) + 1, group["mjd"].shape[0])
+        for name in ["mjd", "mtime", "file"] + list(POLARIZATIONS):
+            group[name].resize(size, axis=0)
+
+        rows = np.array(rows)
+        order = np.argsort(rows)
+        rows = rows[order]
+        spectra = np.array(spectra)[order]
+        group["mjd"][rows] = [float(file_names[i].split("_")[1]) for i in order]
+        group["mtime"][rows] = np.array(mtimes)[order]
+        group["file"][rows] = [file_names[i] for i in order]
+        for index, polarization in enumerate(POLARIZATIONS):
+            group[polarization][rows, :] = spectra[:, index, :]
+
+    def update(self, output_dir, source):
+        """
+        Add new and modified output files of source to cube, cube is rebuilt if output
+        files are removed or velocity grid does not cover new spectra
+
+        :param output_dir: output directory of source and line
+        :param source: source name
+        :return: number of added or updated epochs
+        """
+        output_files = get_output_files(output_dir, source)
+        with h5py.File(self.cube_file_name, "a") as cube_file:
+            known_files = dict()
+            if self.dataset in cube_file:
+                group = cube_file[self.dataset]
+                known_files = {file_name: (row, mtime) for row, (file_name, mtime) in
+                               enumerate(zip(group["file"].asstr()[()], group["mtime"][()]))}
+            removed_files = set(known_files) - set(output_files)
+            changed_files = [file_name for file_name in sorted(output_files)
+                             if file_name not in known_files or known_files[file_name][1] != output_files[file_name]]
+            if not changed_files and not removed_files:
+                return 0
+
+            velocities = {file_name: read_velocity(os.path.join(output_dir, file_name), self.dataset)
+                          for file_name in changed_files}
+            velocities = {file_name: velocity for file_name, velocity in velocities.items() if velocity is not None}
+            if removed_files or self.dataset not in cube_file or \
+                    not self._grid_is_valid(cube_file[self.dataset], list(velocities.values())):
+                for file_name in sorted(set(output_files) - set(changed_files)):
+                    velocity = read_velocity(os.path.join(output_dir, file_name), self.dataset)
+                    if velocity is not None:
+                        velocities[file_name] = velocity
+                if not velocities:
+                    return 0
+                self._create_group(cube_file, self._create_grid(list(velocities.values())))
+                known_files = dict()
+            elif not velocities:
+                return 0
+
+            group = cube_file[self.dataset]
+            velocity_grid = group["velocity"][()]
+            next_row = group["mjd"].shape[0]
+            file_names = sorted(velocities)
+            rows = list()
+            for file_name in file_names:
+                if file_name in known_files:
+                    rows.append(known_files[file_name][0])
+                else:
+                    rows.append(next_row)
+                    next_row += 1
+
+            for start in range(0, len(file_names), EPOCHS_PER_CHUNK):
+                block = file_names[start:start + EPOCHS_PER_CHUNK]
+                self._write(group, rows[start:start + EPOCHS_PER_CHUNK], block,
+                            [output_files[file_name] for file_name in block],
+                            [regrid(read_spectrum(os.path.join(output_dir, file_name), self.dataset), velocity_grid)
+                             for file_name in block])
+            return len(file_names)
+
+    def has_epochs(self):
+        """
+
+        :return: True if cube has spectra of dataset
+        """
+        if not os.path.isfile(self.cube_file_name):
+            return False
+        with h5py.File(self.cube_file_name, "r") as cube_file:
+            return self.dataset in cube_file and cube_file[self.dataset]["mjd"].shape[0] > 0
+
+    def read(self, polarization="avg"):
+        """
+
+        :param polarization: left, right or avg
+        :return: velocity grid, modified julian days sorted in time and amplitudes with shape epochs x channels
+        """
+        with h5py.File(self.cube_file_name, "r") as cube_file:
+            group = cube_file[self.dataset]
+            mjd = group["mjd"][()]
+            order = np.argsort(mjd, kind="stable")
+            return group["velocity"][()], mjd[order], group[polarization][()][order]
+
+    def read_epochs(self):
+        """
+
+        :return: velocity grid, output file names and modified julian days sorted in time and
+        dict of polarization and amplitudes with shape epochs x channels
+        """
+        with h5py.File(self.cube_file_name, "r") as cube_file:
+            group = cube_file[self.dataset]
+            mjd = group["mjd"][()]
+            order = np.argsort(mjd, kind="stable")
+            return group["velocity"][()], group["file"].asstr()[()][order], mjd[order], \
+                {polarization: group[polarization][()][order] for polarization in POLARIZATIONS}
@@ -7,7 +7,6 @@ Correct observation by given factor
 import sys
 import os
 import argparse
-import json
 import h5py
 import numpy as np
 from help import Experiment, get_iteration_from_output_file
@@ -16,7 +15,8 @@ PACKAGE_PARENT = '..'
 SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
 sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
 
-from parsers.configparser_ import ConfigParser
+from parsers.runtime_context import get_runtime_context
+from utils.result_store import ResultStore
 
 
 def parse_arguments():
@@ -43,7 +43,7 @@ def get_args(key):
     :param key: argument key
     :return: to script passed argument value
     """
-    return str(parse_arguments().__dict__[key])
+    return get_runtime_context(parse_arguments).get_arg(key)
 
 
 def get_configs(section, key):
@@ -53,9 +53,7 @@ def get_configs(section, key):
     :param key: configuration file sections key
     :return: configuration file section key value
     """
-    config_file_path = get_args("config")
-    config = ConfigParser(config_file_path)
-    return config.get_config(section, key)
+    return get_runtime_context(parse_arguments).get_config(section, key)
 
 
 def get_mjd_from_output_file(file):
@@ -74,11 +72,9 @@ def correct_output_file(output_dir, file, factor):
     output_data.close()
 
 
-def correct_result_file(result_file_name, iteration_to_fix, factor, station, type_of_back_end):
+def correct_result_file(result_store, iteration_to_fix, factor, station, type_of_back_end):
     iteration_to_fix = [str(i) for i in iteration_to_fix]
-
-    with open(result_file_name, "r") as result_file:
-        result_data = json.load(result_file)
+    result_data = result_store.find(station=station, type_of_observation=type_of_back_end)
 
     for experiment in result_data:
         if str(experiment.split("_")[-1]) in iteration_to_fix and \
@@ -91,10 +87,7 @@ def correct_result_file(result_file_name, iteration_to_fix, factor, station, typ
                                                                   factor
                 result_data[experiment]["polarizationAVG"][v][1] = result_data[experiment]["polarizationAVG"][v][1] * \
                                                                    factor
-
-    result_file = open(result_file_name, "w")
-    result_file.write(json.dumps(result_data, indent=2))
-    result_file.close()
+            result_store.put(experiment, result_data[experiment])
 
 
 def main():
@@ -109,25 +102,24 @@ def main():
     line = get_args("line")
     station = get_args("station").upper()
     factor = float(get_args("factor"))
-    result_file_name = result_file_path + source + "_" + line + ".json"
-    with open(result_file_name, "r") as result_file:
-        result_data = json.load(result_file)
+    with ResultStore(result_file_path, source, line) as result_store:
+        result_data = result_store.find(station=station, type_of_observation=type_of_back_end)
 
-    output_dir = get_configs("paths", "outputFilePath") + "/" + get_args("line") + "/" + get_args("source") + "/"
-    experiments = [Experiment(**result_data[experiment]) for experiment in result_data]
+        output_dir = get_configs("paths", "outputFilePath") + "/" + get_args("line") + "/" + get_args("source") + "/"
+        experiments = [Experiment(**result_data[experiment]) for experiment in result_data]
 
-    mdj_for_experiments_to_fix = [str(experiment.modifiedJulianDays) for experiment in experiments
-                                  if experiment.Iteration_number in iteration_to_fix and
-                                  experiment.location == station and
-                                  experiment.type == type_of_back_end
-                                  ]
+        mdj_for_experiments_to_fix = [str(experiment.modifiedJulianDays) for experiment in experiments
+                                      if experiment.Iteration_number in iteration_to_fix and
+                                      experiment.location == station and
+                                      experiment.type == type_of_back_end
+                                      ]
 
-    for file in os.listdir(output_dir):
-        if get_iteration_from_output_file(file) in iteration_to_fix and \
-                get_mjd_from_output_file(file) in mdj_for_experiments_to_fix:
-            correct_output_file(output_dir, file,factor)
+        for file in os.listdir(output_dir):
+            if get_iteration_from_output_file(file) in iteration_to_fix and \
+                    get_mjd_from_output_file(file) in mdj_for_experiments_to_fix:
+                correct_output_file(output_dir, file,factor)
 
-    correct_result_file(result_file_name, iteration_to_fix, factor, station, type_of_back_end)
+        correct_result_file(result_store, iteration_to_fix, factor, station, type_of_back_end)
     sys.exit()
 
 
@@ -0,0 +1,80 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+Pack SDR iteration data directories into raw cubes
+"""
+import sys
+import os
+import argparse
+
+PACKAGE_PARENT = '..'
+SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+
+from parsers.runtime_context import get_runtime_context
+from utils.raw_cube import pack_iteration, raw_cube_is_valid
+
+
+def parse_arguments():
+    """
+
+    :return: dict with passed args to script
+    """
+    parser = argparse.ArgumentParser(description='''Pack SDR iteration data directories of source
+    into one HDF5 raw cube per iteration, sdr_fs reads packed iterations from raw cube. ''')
+    parser.add_argument("source", help="source name", type=str)
+    parser.add_argument("line", help="Observed frequency", type=int)
+    parser.add_argument("-i", "--iterations", help="Iteration numbers to pack, default is all iterations",
+                        type=str, nargs="+", default=None)
+    parser.add_argument("-f", "--force", help="Pack iterations which already have valid raw cube",
+                        action="store_true")
+    parser.add_argument("-c", "--config", help="Configuration cfg file",
+                        type=str, default="config/config.cfg")
+    parser.add_argument("-v", "--version", action="version", version='%(prog)s - Version 1.0')
+    args = parser.parse_args()
+    return args
+
+
+def get_args(key):
+    """
+
+    :param key: argument key
+    :return: to script passed argument value
+    """
+    return get_runtime_context(parse_arguments).get_arg(key)
+
+
+def get_configs(section, key):
+    """
+
+    :param section: configuration file section
+    :param key: configuration file sections key
+    :return: configuration file section key value
+    """
+    return get_runtime_context(parse_arguments).get_config(section, key)
+
+
+def main():
+    """
+    :return: None
+    """
+    args = get_runtime_context(parse_arguments).args
+    data_file_path = get_configs("paths", "dataFilePath")
+    prefix = get_args("source") + "_f" + get_args("line") + "_"
+    data_dirs = sorted(entry.path for entry in os.scandir(data_file_path)
+                       if entry.name.startswith(prefix) and entry.is_dir() and
+                       (args.iterations is None or entry.name.split("_")[-1] in args.iterations))
+
+    for data_dir in data_dirs:
+        if not args.force and raw_cube_is_valid(data_dir):
+            continue
+        try:
+            print("Packed " + pack_iteration(data_dir))
+        except ValueError as error:
+            print("Error: " + str(error))
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+running average of calibrated scan pairs on common velocity grid
+"""
+import numpy as np
+from utils.snr import get_masks, signal_to_noise_ratio
+
+
+def get_target_grid(velocity, shifts):
+    """
+
+    :param velocity: velocity of calibrated spectrum without receiver velocity
+    :param shifts: receiver velocity of each scan pair
+    :return: velocity shifted by mean receiver velocity inside velocity range covered by all scan pairs
+    """
+    low = np.min(velocity) + np.max(shifts)
+    high = np.max(velocity) + np.min(shifts)
+    target_grid = velocity + np.mean(shifts)
+    return target_grid[(target_grid >= low) & (target_grid <= high)]
+
+
+def regrid_pairs(velocity, shifts, spectra, target_grid):
+    """
+    Linear interpolation of stack of spectra with shifted velocity axes onto one velocity grid
+
+    :param velocity: velocity of calibrated spectrum without receiver velocity, ascending
+    :param shifts: receiver velocity of each pair
+    :param spectra: calibrated spectra of shape (pairs, polarizations, channels)
+    :param target_grid: common velocity grid
+    :return: spectra on velocity grid of shape (pairs, polarizations, target channels)
+    """
+    channels = np.arange(len(velocity), dtype=np.float64)
+    positions = np.interp((target_grid[None, :] - np.asarray(shifts)[:, None]).ravel(), velocity, channels)
+    positions = positions.reshape(len(shifts), 1, len(target_grid))
+    index = np.clip(np.floor(positions).astype(np.int64), 0, len(velocity) - 2)
+    weight = positions - index
+    lower = np.take_along_axis(spectra, index, axis=-1)
+    upper = np.take_along_axis(spectra, index + 1, axis=-1)
+    return lower * (1 - weight) + upper * weight
+
+
+class PairAccumulator:
+    """
+    Calibrated pairs are interpolated onto one velocity grid of iteration and folded into
+    running sum and sum of squares as soon as they are calibrated, so memory does not grow
+    with count of pairs. Velocity axis of each pair is velocity of calibrated spectrum
+    shifted by receiver velocity of pair.
+    """
+
+    def __init__(self, velocity, shifts, cuts):
+        """
+
+        :param velocity: velocity of calibrated spectrum without receiver velocity
+        :param shifts: dict of scan pair and its receiver velocity
+        :param cuts: signal region
+        """
+        velocity = np.asarray(velocity, dtype=np.float64)
+        self.descending = velocity[0] > velocity[-1]
+        self.velocity = velocity[::-1] if self.descending else velocity
+        self.shifts = shifts
+        self.target_grid = get_target_grid(self.velocity, list(shifts.values()))
+        # masks in order of calibrated spectrum, so last channel of output is not noise
+        self.signal_mask, self.noise_mask = [self._in_order(mask) for mask in get_masks(self.get_velocity(), cuts)]
+
+        self.left_sum = np.zeros(len(self.target_grid))
+        self.right_sum = np.zeros(len(self.target_grid))
+        self.left_square_sum = np.zeros(len(self.target_grid))
+        self.right_square_sum = np.zeros(len(self.target_grid))
+        self.pairs_count = 0
+        self.ston_list_left = []
+        self.ston_list_right = []
+        self.ston_list_avg = []
+
+    def get_velocity(self):
+        """
+
+        :return: common velocity grid in order of calibrated spectrum
+        """
+        return self._in_order(self.target_grid)
+
+    def add_many(self, pairs, spectra):
+        """
+
+        :param pairs: scan pairs
+        :param spectra: calibrated spectra of pairs of shape (pairs, 2, channels), left and right polarization
+        :return: None
+        """
+        if len(pairs) == 0:
+            return
+        spectra = np.asarray(spectra, dtype=np.float64)
+        if self.descending:
+            spectra = spectra[..., ::-1]
+        regridded = regrid_pairs(self.velocity, [self.shifts[pair] for pair in pairs], spectra, self.target_grid)
+        left = regridded[:, 0]
+        right = regridded[:, 1]
+
+        self.left_sum += np.sum(left, axis=0)
+        self.right_sum += np.sum(right, axis=0)
+        self.left_square_sum += np.sum(left ** 2, axis=0)
+        self.right_square_sum += np.sum(right ** 2, axis=0)
+        self.pairs_count += len(pairs)
+
+        for ston_list, stack in [(self.ston_list_left, left), (self.ston_list_right, right),
+                                 (self.ston_list_avg, (left + right) / 2)]:
+            ston_list.extend(ston for ston in signal_to_noise_ratio(stack, self.signal_mask, self.noise_mask)
+                             if str(ston) != 'nan')
+
+    def add(self, pair, sf_left, sf_right):
+        """
+
+        :param pair: scan pair
+        :param sf_left: calibrated left polarization spectrum
+        :param sf_right: calibrated right polarization spectrum
+        :return: None
+        """
+        self.add_many([pair], [[sf_left, sf_right]])
+
+    def _in_order(self, values):
+        """
+
+        :param values: values on ascending velocity grid or in order of calibrated spectrum
+        :return: values in order of calibrated spectrum or on ascending velocity grid
+        """
+        return values[::-1] if self.descending else values
+
+    def get_average(self):
+        """
+
+        :return: common velocity grid, averaged left and right polarization
+        """
+        return self.get_velocity(), self._in_order(self.left_sum / self.pairs_count), \
+               self._in_order(self.right_sum / self.pairs_count)
+
+    def get_variance(self):
+        """
+
+        :return: variance of pairs in each channel for left and right polarization
+        """
+        left_avg = self.left_sum / self.pairs_count
+        right_avg = self.right_sum / self.pairs_count
+        left_variance = self.left_square_sum / self.pairs_count - left_avg ** 2
+        right_variance = self.right_square_sum / self.pairs_count - right_avg ** 2
+        return self._in_order(np.clip(left_variance, 0, None)), self._in_order(np.clip(right_variance, 0, None))
@@ -0,0 +1,227 @@
+"""
+peaks of all output spectra of source in indexed store
+"""
+import os
+import sqlite3
+import numpy as np
+from scipy.ndimage import maximum_filter1d
+from utils.monitoring_cube import MonitoringCube, get_cube_file_name
+from utils.snr import get_masks
+
+PEAK_CATALOG_SUFFIX = "_peaks.db"
+PEAK_DATASET = "amplitude_corrected"
+THRESHOLD_FACTOR = 2.5
+MIN_DISTANCE = 3
+MAX_HALF_WIDTH = 100
+
+
+def get_peak_catalog_file_name(result_file_path, source, line):
+    """
+
+    :param result_file_path: result file path
+    :param source: source name
+    :param line: line
+    :return: peak catalog file name
+    """
+    return os.path.join(result_file_path, source + "_" + str(line) + PEAK_CATALOG_SUFFIX)
+
+
+def get_thresholds(velocity, spectra, cuts, threshold_factor=THRESHOLD_FACTOR):
+    """
+
+    :param velocity: velocity grid
+    :param spectra: spectra with shape spectra x channels, nan outside of spectrum
+    :param cuts: signal regions
+    :param threshold_factor: peak threshold in units of three sigma noise
+    :return: peak threshold of each spectrum
+    """
+    _, noise_mask = get_masks(velocity, cuts)
+    return threshold_factor * 3 * np.nanstd(spectra[:, noise_mask], axis=1)
+
+
+def get_half_widths(spectra, rows, channels, amplitudes, max_half_width=MAX_HALF_WIDTH):
+    """
+    Distance in channels from peak to half maximum on one side of peak, interpolated between channels
+
+    :param spectra: spectra with shape spectra x channels, -inf outside of spectrum
+    :param rows: spectrum of each peak
+    :param channels: channel of each peak
+    :param amplitudes: amplitude of each peak
+    :param max_half_width: largest half width in channels
+    :return: half width of each peak in channels
+    """
+    offsets = np.arange(max_half_width + 1)
+    index = np.clip(channels[:, None] + offsets[None, :], 0, spectra.shape[1] - 1)
+    values = spectra[rows[:, None], index]
+    half_maximum = amplitudes[:, None] / 2
+    below = values < half_maximum
+    below[:, -1] = True
+    first = np.argmax(below, axis=1)
+    previous = np.take_along_axis(values, (first - 1)[:, None], axis=1)[:, 0]
+    current = np.take_along_axis(values, first[:, None], axis=1)[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.where(np.isfinite(current) & (previous != current),
+                            (previous - half_maximum[:, 0]) / (previous - current), 1.0)
+    return first - 1 + np.clip(fraction, 0, 1)
+
+
+def detect_peaks(velocity, spectra, thresholds, min_distance=MIN_DISTANCE, max_half_width=MAX_HALF_WIDTH):
+    """
+    Local maximums of all spectra at once, peak is largest channel within min_distance channels
+    and is above threshold of its spectrum
+
+    :param velocity: velocity grid
+    :param spectra: spectra with shape spectra x channels, nan outside of spectrum
+    :param thresholds: peak threshold of each spectrum
+    :param min_distance: smallest distance between peaks in channels
+    :param max_half_width: largest half width in channels
+    :return: spectrum, velocity, amplitude and full width at half maximum of each peak
+    """
+    spectra = np.where(np.isnan(spectra), -np.inf, spectra)
+    window_maximum = maximum_filter1d(spectra, size=2 * min_distance + 1, axis=1, mode="constant", cval=-np.inf)
+    peaks = (spectra == window_maximum) & (spectra > np.asarray(thresholds)[:, None])
+    peaks[:, 1:] &= spectra[:, 1:] > spectra[:, :-1]
+    peaks[:, [0, -1]] = False
+
+    rows, channels = np.nonzero(peaks)
+    amplitudes = spectra[rows, channels]
+    right = get_half_widths(spectra, rows, channels, amplitudes, max_half_width)
+    left = get_half_widths(spectra[:, ::-1], rows, spectra.shape[1] - 1 - channels, amplitudes, max_half_width)
+    step = np.abs(velocity[1] - velocity[0]) if len(velocity) > 1 else 0
+    return rows, velocity[channels], amplitudes, (left + right) * step
+
+
+class PeakCatalog:
+    """
+    Peaks of one source and line kept in SQLite database, each peak is one row
+    indexed by polarization, velocity and modified julian days, so appearance of
+    maser components can be queried without reading spectra
+    """
+
+    def __init__(self, catalog_file_name):
+        self.catalog_file_name = catalog_file_name
+        self.connection = sqlite3.connect(catalog_file_name)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS peaks ("
+                                    "experiment TEXT NOT NULL, mjd REAL, station TEXT, iteration INTEGER, "
+                                    "polarization TEXT NOT NULL, velocity REAL, amplitude REAL, width REAL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS peaks_index "
+                                    "ON peaks (polarization, velocity, mjd)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS peaks_experiment_index ON peaks (experiment)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM peaks").fetchone()[0]
+
+    def close(self):
+        """
+
+        :return: None
+        """
+        self.connection.close()
+
+    def replace(self, peaks):
+        """
+        All peaks of catalog are replaced in one transaction
+
+        :param peaks: rows of experiment, mjd, station, iteration, polarization, velocity, amplitude, width
+        :return: None
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM peaks")
+            self.connection.executemany("INSERT INTO peaks VALUES (?, ?, ?, ?, ?, ?, ?, ?)", peaks)
+
+    def find(self, polarization=None, velocity_min=None, velocity_max=None, mjd_start=None, mjd_stop=None,
+             experiment=None):
+        """
+
+        :param polarization: left, right or avg
+        :param velocity_min: smallest velocity
+        :param velocity_max: largest velocity
+        :param mjd_start: first modified julian day
+        :param mjd_stop: last modified julian day
+        :param experiment: experiment name
+        :return: list of experiment, mjd, station, iteration, polarization, velocity, amplitude, width
+        sorted in time and velocity
+        """
+        conditions = list()
+        parameters = list()
+        for column, operator, value in [("polarization", "=", polarization),
+                                        ("velocity", ">=", velocity_min),
+                                        ("velocity", "<=", velocity_max),
+                                        ("mjd", ">=", mjd_start),
+                                        ("mjd", "<=", mjd_stop),
+                                        ("experiment", "=", experiment)]:
+            if value is not None:
+                conditions.append(column + " " + operator + " ?")
+                parameters.append(value)
+
+        query = "SELECT * FROM peaks"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY mjd, velocity"
+        return self.connection.execute(query, parameters).fetchall()
+
+    def get_component_epochs(self, velocity, tolerance, polarization="avg"):
+        """
+
+        :param velocity: velocity of maser component
+        :param tolerance: largest velocity difference of peak from component
+        :param polarization: left, right or avg
+        :return: modified julian days and amplitudes of epochs where component has peak
+        """
+        rows = self.connection.execute("SELECT mjd, MAX(amplitude) FROM peaks WHERE polarization = ? "
+                                       "AND velocity >= ? AND velocity <= ? GROUP BY experiment ORDER BY mjd",
+                                       (polarization, velocity - tolerance, velocity + tolerance)).fetchall()
+        return np.array([row[0] for row in rows]), np.array([row[1] for row in rows])
+
+
+def build_peak_catalog(output_dir, monitoring_file_path, result_file_path, source, line, cuts,
+                       vmin=None, vmax=None, threshold_factor=THRESHOLD_FACTOR, min_distance=MIN_DISTANCE):
+    """
+    Smoothed spectra of all epochs are read from monitoring cube, which is updated first, and
+    peaks of left, right and average polarization are detected in one pass
+    ValueError is raised if no output file of source has amplitude_corrected table
+
+    :param output_dir: output directory of source and line
+    :param monitoring_file_path: monitoring file path
+    :param result_file_path: result file path
+    :param source: source name
+    :param line: line
+    :param cuts: signal regions
+    :param vmin: smallest velocity of monitoring cube
+    :param vmax: largest velocity of monitoring cube
+    :param threshold_factor: peak threshold in units of three sigma noise
+    :param min_distance: smallest distance between peaks in channels
+    :return: peak catalog file name and number of peaks
+    """
+    monitoring_cube = MonitoringCube(get_cube_file_name(monitoring_file_path, source, line),
+                                     dataset=PEAK_DATASET, vmin=vmin, vmax=vmax)
+    monitoring_cube.update(output_dir, source)
+    if not monitoring_cube.has_epochs():
+        raise ValueError("Source " + source + " line " + str(line) + " has no output files with " +
+                         PEAK_DATASET + " table")
+    velocity, file_names, mjd, amplitudes = monitoring_cube.read_epochs()
+
+    polarizations = list(amplitudes)
+    spectra = np.concatenate([amplitudes[polarization] for polarization in polarizations])
+    rows, velocities, peak_amplitudes, widths = detect_peaks(
+        velocity, spectra, get_thresholds(velocity, spectra, cuts, threshold_factor), min_distance)
+
+    epochs = rows % len(file_names)
+    peaks = list()
+    for row, epoch, peak_velocity, amplitude, width in zip(rows, epochs, velocities, peak_amplitudes, widths):
+        experiment = os.path.splitext(file_names[epoch])[0]
+        experiment_info = experiment.split("_")
+        peaks.append((experiment, float(mjd[epoch]), experiment_info[-2], int(experiment_info[-1]),
+                      polarizations[row // len(file_names)], float(peak_velocity), float(amplitude), float(width)))
+
+    catalog_file_name = get_peak_catalog_file_name(result_file_path, source, line)
+    with PeakCatalog(catalog_file_name) as peak_catalog:
+        peak_catalog.replace(peaks)
+    return catalog_file_name, len(peaks)
@@ -0,0 +1,248 @@
+"""
+persistent processing state of source iterations
+"""
+import os
+import sqlite3
+import h5py
+from utils.raw_cube import RAW_CUBE_FILE_EXTENSION
+
+MANIFEST_FILE_SUFFIX = "_manifest.db"
+STATIONS = {"ir": "IRBENE", "ib": "IRBENE16"}
+
+
+def get_station_label(station):
+    """
+
+    :param station: station name from output file or result
+    :return: station label used in data directory names
+    """
+    for label, name in STATIONS.items():
+        if name == station:
+            return label
+    return station
+
+
+def has_amplitude(output_file_name):
+    """
+
+    :param output_file_name: sdr_fs output file
+    :return: True if output file contains calibrated amplitude
+    """
+    try:
+        with h5py.File(output_file_name, "r") as output_file:
+            return "amplitude" in output_file
+    except OSError:
+        return False
+
+
+class ProcessingManifest:
+    """
+    Processing state of each iteration of one source and line: raw data directory or raw cube present,
+    calibrated, analyzed and flagged, with modification times of raw data directory
+    and output file. Directories are listed again only if their modification time
+    changed, analyzed iterations are not checked again.
+    """
+
+    def __init__(self, result_file_path, source, line):
+        self.source = source
+        self.line = str(line)
+        self.manifest_file_name = os.path.join(result_file_path, source + "_" + self.line + MANIFEST_FILE_SUFFIX)
+        self.connection = sqlite3.connect(self.manifest_file_name)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS iterations ("
+                                    "station TEXT, iteration TEXT, raw_present INTEGER DEFAULT 0, "
+                                    "raw_dir TEXT, raw_mtime INTEGER, output_file TEXT, output_mtime INTEGER, "
+                                    "calibrated INTEGER DEFAULT 0, calibrated_raw_mtime INTEGER, "
+                                    "analyzed INTEGER DEFAULT 0, flagged INTEGER DEFAULT 0, "
+                                    "PRIMARY KEY (station, iteration))")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS directories ("
+                                    "path TEXT PRIMARY KEY, mtime INTEGER)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+
+        :return: None
+        """
+        self.connection.close()
+
+    def _directory_changed(self, path):
+        """
+
+        :param path: directory
+        :return: True if directory modification time changed since last run
+        """
+        mtime = os.stat(path).st_mtime_ns
+        row = self.connection.execute("SELECT mtime FROM directories WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[0] == mtime:
+            return False
+        self.connection.execute("INSERT OR REPLACE INTO directories VALUES (?, ?)", (path, mtime))
+        return True
+
+    def _ensure_iteration(self, station, iteration):
+        """
+
+        :param station: station label
+        :param iteration: iteration number
+        :return: None
+        """
+        self.connection.execute("INSERT OR IGNORE INTO iterations (station, iteration) VALUES (?, ?)",
+                                (station, iteration))
+
+    def update_raw_data(self, data_file_path):
+        """
+        Add new raw data directories, remove missing ones and update modification time
+        of iterations which are not analyzed
+
+        :param data_file_path: directory of raw data directories
+        :return: None
+        """
+        with self.connection:
+            if os.path.isdir(data_file_path) and self._directory_changed(data_file_path):
+                iterations = dict()
+                for entry in os.scandir(data_file_path):
+                    name = entry.name
+                    if entry.is_file() and name.endswith(RAW_CUBE_FILE_EXTENSION):
+                        name = name[:-len(RAW_CUBE_FILE_EXTENSION)]
+                    elif not entry.is_dir():
+                        continue
+                    if self.source in name and self.line in name:
+                        station, iteration = name.split("_")[-2:]
+                        if (station, iteration) not in iterations or entry.is_dir():
+                            iterations[(station, iteration)] = entry.path
+                        self._ensure_iteration(station, iteration)
+                known_iterations = self.connection.execute(
+                    "SELECT station, iteration FROM iterations WHERE raw_present = 1").fetchall()
+                for station, iteration in set(known_iterations) - set(iterations):
+                    self.connection.execute("UPDATE iterations SET raw_present = 0, raw_dir = NULL, "
+                                            "raw_mtime = NULL WHERE station = ? AND iteration = ?",
+                                            (station, iteration))
+                for (station, iteration), raw_dir in iterations.items():
+                    self.connection.execute("UPDATE iterations SET raw_present = 1, raw_dir = ? "
+                                            "WHERE station = ? AND iteration = ?", (raw_dir, station, iteration))
+
+            for station, iteration, raw_dir in self.connection.execute(
+                    "SELECT station, iteration, raw_dir FROM iterations "
+                    "WHERE raw_present = 1 AND (analyzed = 0 OR flagged = 1)").fetchall():
+                self._update_raw_mtime(station, iteration, raw_dir)
+
+    def _update_raw_mtime(self, station, iteration, raw_dir):
+        """
+
+        :param station: station label
+        :param iteration: iteration number
+        :param raw_dir: raw data directory
+        :return: raw data directory modification time
+        """
+        raw_mtime = os.stat(raw_dir).st_mtime_ns if os.path.exists(raw_dir) else None
+        self.connection.execute("UPDATE iterations SET raw_mtime = ? WHERE station = ? AND iteration = ?",
+                                (raw_mtime, station, iteration))
+        return raw_mtime
+
+    def update_output_files(self, output_dir):
+        """
+        Check only new or modified output files for calibrated amplitude
+
+        :param output_dir: sdr_fs output directory of source and line
+        :return: None
+        """
+        if not os.path.isdir(output_dir):
+            return
+        with self.connection:
+            if not self._directory_changed(output_dir):
+                return
+            output_files = dict()
+            for station, iteration, output_file, output_mtime in self.connection.execute(
+                    "SELECT station, iteration, output_file, output_mtime FROM iterations "
+                    "WHERE output_file IS NOT NULL").fetchall():
+                output_files[output_file] = (station, iteration, output_mtime)
+
+            present_output_files = set()
+            for entry in os.scandir(output_dir):
+                if not entry.name.startswith(self.source) or not entry.name.endswith(".h5"):
+                    continue
+                present_output_files.add(entry.name)
+                mtime = entry.stat().st_mtime_ns
+                if entry.name in output_files and output_files[entry.name][2] == mtime:
+                    continue
+                station = get_station_label(entry.name.split("_")[-2].split(".")[0])
+                iteration = entry.name.split("_")[-1].split(".")[0]
+                self._ensure_iteration(station, iteration)
+                raw_mtime = self.connection.execute(
+                    "SELECT raw_mtime FROM iterations WHERE station = ? AND iteration = ?",
+                    (station, iteration)).fetchone()[0]
+                self.connection.execute("UPDATE iterations SET output_file = ?, output_mtime = ?, "
+                                        "calibrated = ?, calibrated_raw_mtime = ? "
+                                        "WHERE station = ? AND iteration = ?",
+                                        (entry.name, mtime, int(has_amplitude(entry.path)), raw_mtime,
+                                         station, iteration))
+
+            for output_file in set(output_files) - present_output_files:
+                station, iteration, _ = output_files[output_file]
+                self.connection.execute("UPDATE iterations SET output_file = NULL, output_mtime = NULL, "
+                                        "calibrated = 0, calibrated_raw_mtime = NULL "
+                                        "WHERE station = ? AND iteration = ?", (station, iteration))
+
+    def update_results(self, result_states):
+        """
+
+        :param result_states: dict of (station, iteration) and flag of analyzed iterations
+        :return: None
+        """
+        result_states = {(get_station_label(station), str(iteration)): int(flag)
+                         for (station, iteration), flag in result_states.items()}
+        with self.connection:
+            for station, iteration, analyzed, flagged in self.connection.execute(
+                    "SELECT station, iteration, analyzed, flagged FROM iterations").fetchall():
+                state = (1, result_states.pop((station, iteration))) \
+                    if (station, iteration) in result_states else (0, 0)
+                if state != (analyzed, flagged):
+                    self.connection.execute("UPDATE iterations SET analyzed = ?, flagged = ? "
+                                            "WHERE station = ? AND iteration = ?", state + (station, iteration))
+            for (station, iteration), flag in result_states.items():
+                self._ensure_iteration(station, iteration)
+                self.connection.execute("UPDATE iterations SET analyzed = 1, flagged = ? "
+                                        "WHERE station = ? AND iteration = ?", (flag, station, iteration))
+
+    def get_pending_reductions(self):
+        """
+
+        :return: list of station and iteration pairs which should be calibrated
+        """
+        return self.connection.execute(
+            "SELECT station, iteration FROM iterations WHERE raw_present = 1 "
+            "AND (analyzed = 0 OR flagged = 1) "
+            "AND NOT (calibrated = 1 AND calibrated_raw_mtime IS raw_mtime) "
+            "ORDER BY station, CAST(iteration AS INTEGER)").fetchall()
+
+    def get_pending_analysis(self):
+        """
+
+        :return: output files which are calibrated but not analyzed
+        """
+        return [row[0] for row in self.connection.execute(
+            "SELECT output_file FROM iterations WHERE calibrated = 1 AND analyzed = 0 "
+            "ORDER BY station, CAST(iteration AS INTEGER)")]
+
+    def set_calibrated(self, station, iteration, output_file_name):
+        """
+
+        :param station: station label
+        :param iteration: iteration number
+        :param output_file_name: sdr_fs output file
+        :return: None
+        """
+        with self.connection:
+            self._ensure_iteration(station, iteration)
+            raw_dir = self.connection.execute("SELECT raw_dir FROM iterations WHERE station = ? AND iteration = ?",
+                                              (station, iteration)).fetchone()[0]
+            raw_mtime = self._update_raw_mtime(station, iteration, raw_dir) if raw_dir is not None else None
+            self.connection.execute("UPDATE iterations SET output_file = ?, output_mtime = ?, calibrated = 1, "
+                                    "calibrated_raw_mtime = ? WHERE station = ? AND iteration = ?",
+                                    (os.path.basename(output_file_name), os.stat(output_file_name).st_mtime_ns,
+                                     raw_mtime, station, iteration))
@@ -0,0 +1,142 @@
+"""
+packed raw spectra of SDR iteration
+"""
+import os
+import numpy as np
+import h5py
+from utils.scan_catalog import ScanCatalog
+from utils.scan_reader import read_scan_file
+
+RAW_CUBE_FILE_EXTENSION = ".h5"
+PHASES = ("s0", "r0", "s1", "r1")
+POLARIZATIONS = ("left", "right")
+
+
+def get_raw_cube_file_name(data_dir):
+    """
+
+    :param data_dir: iteration data directory
+    :return: raw cube file name next to iteration data directory
+    """
+    return os.path.normpath(data_dir) + RAW_CUBE_FILE_EXTENSION
+
+
+def raw_cube_is_valid(data_dir, raw_cube_file_name=None):
+    """
+
+    :param data_dir: iteration data directory
+    :param raw_cube_file_name: raw cube file name
+    :return: True if raw cube exists and data directory is removed or not modified after packing
+    """
+    if raw_cube_file_name is None:
+        raw_cube_file_name = get_raw_cube_file_name(data_dir)
+    if not os.path.isfile(raw_cube_file_name):
+        return False
+    if not os.path.isdir(data_dir):
+        return True
+    with h5py.File(raw_cube_file_name, "r") as raw_cube:
+        return raw_cube.attrs["data_dir_mtime"] == os.stat(data_dir).st_mtime_ns
+
+
+def parse_pair_scan(pair):
+    """
+
+    :param pair: scan pair
+    :return: scan number of pair
+    """
+    return int(pair[0][0][:-2])
+
+
+def pack_iteration(data_dir, raw_cube_file_name=None):
+    """
+    Pack complete scans of iteration into one chunked and compressed HDF5 file with
+    spectra of shape scans x phase (s0, r0, s1, r1) x polarization x channels
+
+    :param data_dir: iteration data directory
+    :param raw_cube_file_name: raw cube file name
+    :return: raw cube file name
+    """
+    if raw_cube_file_name is None:
+        raw_cube_file_name = get_raw_cube_file_name(data_dir)
+    if not data_dir.endswith("/"):
+        data_dir += "/"
+    scan_catalog = ScanCatalog(data_dir)
+    for scan in scan_catalog.find_incomplete_scans():
+        print("Scan " + str(scan) + " do not have all data file and is not packed")
+        for data_file in scan_catalog.get_scan_files(scan):
+            scan_catalog.remove(data_file)
+    scan_pairs = scan_catalog.create_scan_pairs()
+    if len(scan_pairs) == 0:
+        raise ValueError("Data directory " + data_dir + " has no complete scans")
+
+    tmp_raw_cube_file_name = raw_cube_file_name + ".tmp"
+    frequency = None
+    with h5py.File(tmp_raw_cube_file_name, "w") as raw_cube:
+        for index, pair in enumerate(scan_pairs):
+            pair_files = scan_catalog.get_pair_files(pair)
+            pair_data = [read_scan_file(pair_file) for pair_file in pair_files]
+            if frequency is None:
+                frequency = np.array(pair_data[0][:, 0])
+                raw_cube.create_dataset("frequency", data=frequency)
+                pair_shape = (len(PHASES), len(POLARIZATIONS), len(frequency))
+                raw_cube.create_dataset("spectra", (len(scan_pairs),) + pair_shape, dtype=np.float64,
+                                        chunks=(1,) + pair_shape, compression="gzip", shuffle=True)
+            for pair_file, data in zip(pair_files, pair_data):
+                if not np.array_equal(data[:, 0], frequency):
+                    raise ValueError("Data file " + pair_file + " has different frequency axis")
+            raw_cube["spectra"][index] = np.array([data[:, 1:3].T for data in pair_data])
+
+        raw_cube.create_dataset("scan", data=np.array([parse_pair_scan(pair) for pair in scan_pairs]))
+        raw_cube.create_dataset("file", data=[[os.path.basename(pair_file)
+                                               for pair_file in scan_catalog.get_pair_files(pair)]
+                                              for pair in scan_pairs], dtype=h5py.string_dtype())
+        raw_cube.attrs["phases"] = ",".join(PHASES)
+        raw_cube.attrs["polarizations"] = ",".join(POLARIZATIONS)
+        raw_cube.attrs["data_dir_mtime"] = os.stat(data_dir).st_mtime_ns
+    os.replace(tmp_raw_cube_file_name, raw_cube_file_name)
+    return raw_cube_file_name
+
+
+class RawCube(ScanCatalog):
+    """
+    Scan catalog of packed iteration, spectra of pairs are read from raw cube
+    """
+
+    def __init__(self, data_dir, raw_cube_file_name=None):
+        if raw_cube_file_name is None:
+            raw_cube_file_name = get_raw_cube_file_name(data_dir)
+        self.raw_cube_file_name = raw_cube_file_name
+        with h5py.File(raw_cube_file_name, "r") as raw_cube:
+            self.frequency = raw_cube["frequency"][()]
+            scans = raw_cube["scan"][()]
+            data_files = raw_cube["file"].asstr()[()]
+        self.rows = {int(scan): row for row, scan in enumerate(scans)}
+        super().__init__(data_dir, [data_file for scan_files in data_files for data_file in scan_files])
+
+    def read_pairs(self, pairs):
+        """
+
+        :param pairs: scan pairs
+        :return: frequency and spectra of shape (pairs, 4, 2, channels) ordered s0, r0, s1, r1
+        """
+        rows = [self.rows[parse_pair_scan(pair)] for pair in pairs]
+        with h5py.File(self.raw_cube_file_name, "r") as raw_cube:
+            dataset = raw_cube["spectra"]
+            spectra = np.empty((len(rows),) + dataset.shape[1:], dtype=dataset.dtype)
+            if rows == list(range(rows[0], rows[0] + len(rows))):
+                dataset.read_direct(spectra, np.s_[rows[0]:rows[0] + len(rows)])
+            else:
+                for index, row in enumerate(rows):
+                    dataset.read_direct(spectra, np.s_[row], np.s_[index])
+        return np.array(self.frequency), spectra
+
+
+def get_scan_catalog(data_dir):
+    """
+
+    :param data_dir: iteration data directory
+    :return: raw cube of iteration if it is valid else scan catalog of data directory
+    """
+    if raw_cube_is_valid(data_dir):
+        return RawCube(data_dir)
+    return ScanCatalog(data_dir)
@@ -0,0 +1,100 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+Smooth amplitude_corrected tables of output files again with new kernel
+"""
+import sys
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+PACKAGE_PARENT = '..'
+SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+
+from parsers.runtime_context import get_runtime_context
+from utils.smoothing import KERNEL_STDDEV, KERNEL_SIZE, resmooth_output_file
+
+
+def parse_arguments():
+    """
+
+    :return: dict with passed args to script
+    """
+    parser = argparse.ArgumentParser(description='''Derive amplitude_corrected table again from
+    amplitude_corrected_not_smooht table for all output files of line or source and line. ''')
+    parser.add_argument("line", help="Observed frequency", type=int)
+    parser.add_argument("-s", "--source", help="source name, default is all sources of line", type=str, default=None)
+    parser.add_argument("--stddev", help="Standard deviation of gaussian kernel in channels",
+                        type=float, default=KERNEL_STDDEV)
+    parser.add_argument("--size", help="Size of gaussian kernel in channels", type=int, default=KERNEL_SIZE)
+    parser.add_argument("-w", "--workers", help="Number of output files processed in parallel",
+                        type=int, default=os.cpu_count())
+    parser.add_argument("-c", "--config", help="Configuration cfg file",
+                        type=str, default="config/config.cfg")
+    parser.add_argument("-v", "--version", action="version", version='%(prog)s - Version 1.0')
+    args = parser.parse_args()
+    return args
+
+
+def get_args(key):
+    """
+
+    :param key: argument key
+    :return: to script passed argument value
+    """
+    return get_runtime_context(parse_arguments).get_arg(key)
+
+
+def get_configs(section, key):
+    """
+
+    :param section: configuration file section
+    :param key: configuration file sections key
+    :return: configuration file section key value
+    """
+    return get_runtime_context(parse_arguments).get_config(section, key)
+
+
+def get_output_files(output_path, source=None):
+    """
+
+    :param output_path: output directory of line
+    :param source: source name, default is all sources of line
+    :return: output files
+    """
+    if source is None:
+        source_dirs = sorted(entry.path for entry in os.scandir(output_path) if entry.is_dir())
+    else:
+        source_dirs = [os.path.join(output_path, source)]
+    return [entry.path for source_dir in source_dirs if os.path.isdir(source_dir)
+            for entry in sorted(os.scandir(source_dir), key=lambda entry: entry.name)
+            if entry.name.endswith(".h5")]
+
+
+def main():
+    """
+    :return: None
+    """
+    args = get_runtime_context(parse_arguments).args
+    output_files = get_output_files(get_configs("paths", "outputFilePath") + "/" + get_args("line"), args.source)
+    workers = max(1, args.workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(resmooth_output_file, output_file, args.stddev, args.size)
+                   for output_file in output_files]
+        for output_file, future in zip(output_files, futures):
+            try:
+                smoothed = future.result()
+            except (OSError, KeyError, ValueError) as error:
+                print("Error: %s : %s" % (output_file, error))
+                continue
+            if smoothed:
+                print("Smoothed " + output_file)
+            else:
+                print("Output " + output_file + " file has no amplitude_corrected_not_smooht table")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
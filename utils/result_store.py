@@ -0,0 +1,203 @@
+"""
+indexed store of experiment results
+"""
+import os
+import json
+import sqlite3
+
+RESULT_STORE_EXTENSION = ".db"
+RESULT_FILE_EXTENSION = ".json"
+
+
+class ResultStore:
+    """
+    Results of one source and line kept in SQLite database. Each experiment is one row
+    indexed by station, iteration, type and modified julian days, so adding, updating
+    and deleting experiment does not rewrite the whole result file.
+    Existing JSON result file is imported when store is created.
+    """
+
+    def __init__(self, result_file_path, source, line):
+        result_file_name = os.path.join(result_file_path, source + "_" + str(line))
+        self.store_file_name = result_file_name + RESULT_STORE_EXTENSION
+        self.json_file_name = result_file_name + RESULT_FILE_EXTENSION
+        new_store = not os.path.isfile(self.store_file_name)
+        self.connection = sqlite3.connect(self.store_file_name)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS results ("
+                                    "experiment TEXT PRIMARY KEY, station TEXT, iteration INTEGER, "
+                                    "type TEXT, mjd REAL, flag INTEGER, result TEXT NOT NULL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS results_index "
+                                    "ON results (station, iteration, type, mjd)")
+        if new_store and os.path.isfile(self.json_file_name):
+            self.import_json(self.json_file_name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __contains__(self, experiment):
+        return self.connection.execute("SELECT 1 FROM results WHERE experiment = ?",
+                                       (experiment,)).fetchone() is not None
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        """
+
+        :return: None
+        """
+        self.connection.close()
+
+    @staticmethod
+    def _get_row(experiment, result):
+        """
+
+        :param experiment: experiment name source_mjd_station_iteration
+        :param result: experiment result
+        :return: row of results table
+        """
+        experiment_info = experiment.split("_")
+        return (experiment,
+                result.get("location", experiment_info[-2]),
+                int(result.get("Iteration_number", experiment_info[-1])),
+                result.get("type"),
+                float(result.get("modifiedJulianDays", experiment_info[1])),
+                int(bool(result.get("flag", False))),
+                json.dumps(result))
+
+    def put_many(self, results):
+        """
+        Add new experiments or replace existing experiments in one transaction
+
+        :param results: dict of experiment results
+        :return: None
+        """
+        with self.connection:
+            self.connection.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?) "
+                                        "ON CONFLICT(experiment) DO UPDATE SET "
+                                        "station = excluded.station, iteration = excluded.iteration, "
+                                        "type = excluded.type, mjd = excluded.mjd, "
+                                        "flag = excluded.flag, result = excluded.result",
+                                        [self._get_row(experiment, results[experiment])
+                                         for experiment in results])
+
+    def put(self, experiment, result):
+        """
+
+        :param experiment: experiment name
+        :param result: experiment result
+        :return: None
+        """
+        self.put_many({experiment: result})
+
+    def get(self, experiment):
+        """
+
+        :param experiment: experiment name
+        :return: experiment result or None if experiment is not in store
+        """
+        row = self.connection.execute("SELECT result FROM results WHERE experiment = ?",
+                                      (experiment,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def update(self, experiment, **values):
+        """
+
+        :param experiment: experiment name
+        :param values: result keys and new values
+        :return: None
+        """
+        result = self.get(experiment)
+        if result is None:
+            raise KeyError(experiment)
+        result.update(values)
+        self.put(experiment, result)
+
+    def delete(self, experiment):
+        """
+
+        :param experiment: experiment name
+        :return: None
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM results WHERE experiment = ?", (experiment,))
+
+    def find(self, station=None, iteration=None, type_of_observation=None,
+             mjd_start=None, mjd_stop=None, flag=None):
+        """
+
+        :param station: station name
+        :param iteration: iteration number
+        :param type_of_observation: SDR or DBBC
+        :param mjd_start: first modified julian day
+        :param mjd_stop: last modified julian day
+        :param flag: flagged or not flagged experiments
+        :return: dict of experiment results in order they were added
+        """
+        conditions = list()
+        parameters = list()
+        for column, operator, value in [("station", "=", station),
+                                        ("iteration", "=", iteration),
+                                        ("type", "=", type_of_observation),
+                                        ("mjd", ">=", mjd_start),
+                                        ("mjd", "<=", mjd_stop),
+                                        ("flag", "=", flag)]:
+            if value is not None:
+                conditions.append(column + " " + operator + " ?")
+                parameters.append(int(value) if column in ("iteration", "flag") else value)
+
+        query = "SELECT experiment, result FROM results"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY rowid"
+        return {experiment: json.loads(result)
+                for experiment, result in self.connection.execute(query, parameters)}
+
+    def get_states(self, type_of_observation=None):
+        """
+
+        :param type_of_observation: SDR or DBBC
+        :return: dict of (station, iteration) and True if any experiment of iteration is flagged
+        """
+        query = "SELECT station, iteration, MAX(flag) FROM results"
+        parameters = list()
+        if type_of_observation is not None:
+            query += " WHERE type = ?"
+            parameters.append(type_of_observation)
+        query += " GROUP BY station, iteration"
+        return {(station, iteration): bool(flag)
+                for station, iteration, flag in self.connection.execute(query, parameters)}
+
+    def load(self):
+        """
+
+        :return: dict of all experiment results
+        """
+        return self.find()
+
+    def import_json(self, json_file_name):
+        """
+
+        :param json_file_name: JSON result file
+        :return: None
+        """
+        with open(json_file_name, "r") as result_file:
+            self.put_many(json.load(result_file))
+
+    def export_json(self, json_file_name=None):
+        """
+
+        :param json_file_name: JSON result file, default is result file next to store
+        :return: JSON result file name
+        """
+        if json_file_name is None:
+            json_file_name = self.json_file_name
+        with open(json_file_name, "w") as result_file:
+            result_file.write(json.dumps(self.load(), indent=2))
+        return json_file_name
@@ -0,0 +1,134 @@
+"""
+catalog of SDR scan files of iteration
+"""
+import os
+import re
+import numpy as np
+from utils.scan_reader import is_scan_file, read_scan_file
+
+SCAN_NAME_PATTERN = re.compile("^([0-9]+)([rs])([01])$")
+SCAN_FILES_COUNT = 4
+
+
+def parse_scan_name(scan_name):
+    """
+
+    :param scan_name: scan name like 12r0
+    :return: scan number, r or s and cal phase or None if scan name can not be parsed
+    """
+    match = SCAN_NAME_PATTERN.match(scan_name)
+    if match is None:
+        return None
+    return int(match.group(1)), match.group(2), int(match.group(3))
+
+
+def parse_data_file_name(data_file_name):
+    """
+
+    :param data_file_name: data file name like source_fline_station_iteration_no0012r0.dat
+    :return: scan number, r or s and cal phase or None if data file name can not be parsed
+    """
+    return parse_scan_name(data_file_name.split(".")[0].split("_")[-1][2:])
+
+
+class ScanCatalog:
+    """
+    Data files of iteration parsed once and indexed by scan number, r or s and cal phase
+    """
+
+    def __init__(self, data_dir, data_files=None):
+        self.data_dir = data_dir
+        if data_files is None:
+            data_files = [file for file in os.listdir(data_dir) if is_scan_file(file)]
+        self.files = dict()
+        self.scans = dict()
+        for data_file in data_files:
+            key = parse_data_file_name(data_file)
+            if key is None:
+                continue
+            self.files[key] = data_file
+            self.scans.setdefault(key[0], []).append(data_file)
+
+    def __len__(self):
+        return len(self.files)
+
+    @property
+    def data_files(self):
+        """
+
+        :return: data file names of catalog
+        """
+        return list(self.files.values())
+
+    def find_incomplete_scans(self):
+        """
+
+        :return: scan numbers that do not have all four data files
+        """
+        return sorted(scan for scan, data_files in self.scans.items() if len(data_files) != SCAN_FILES_COUNT)
+
+    def get_scan_files(self, scan):
+        """
+
+        :param scan: scan number
+        :return: data file names of scan
+        """
+        return list(self.scans.get(scan, []))
+
+    def remove(self, data_file):
+        """
+
+        :param data_file: data file name
+        :return: None
+        """
+        key = parse_data_file_name(data_file)
+        if self.files.get(key) != data_file:
+            return
+        del self.files[key]
+        self.scans[key[0]].remove(data_file)
+        if not self.scans[key[0]]:
+            del self.scans[key[0]]
+
+    def create_scan_pairs(self):
+        """
+
+        :return: scan pairs ((r0, s0), (r1, s1)) sorted by scan number
+        """
+        return [((str(scan) + "r0", str(scan) + "s0"), (str(scan) + "r1", str(scan) + "s1"))
+                for scan in sorted(self.scans)]
+
+    def get_data_file(self, scan_name):
+        """
+
+        :param scan_name: scan name like 12r0
+        :return: file name for scan or empty string if scan has no data file
+        """
+        return self.files.get(parse_scan_name(scan_name), "")
+
+    def get_pair_files(self, pair):
+        """
+
+        :param pair: scan pair
+        :return: full paths of data files of pair ordered s0, r0, s1, r1
+        """
+        return [self.data_dir + self.get_data_file(pair[0][1]),  # s0
+                self.data_dir + self.get_data_file(pair[0][0]),  # r0
+                self.data_dir + self.get_data_file(pair[1][1]),  # s1
+                self.data_dir + self.get_data_file(pair[1][0])]  # r1
+
+    def read_pairs(self, pairs):
+        """
+
+        :param pairs: scan pairs
+        :return: frequency and spectra of shape (pairs, 4, 2, channels) ordered s0, r0, s1, r1
+        """
+        frequency = None
+        spectra = None
+        for index, pair in enumerate(pairs):
+            for phase, pair_file in enumerate(self.get_pair_files(pair)):
+                data = read_scan_file(pair_file)
+                if spectra is None:
+                    frequency = np.array(data[:, 0])
+                    spectra = np.empty((len(pairs), 4, 2, data.shape[0]))
+                spectra[index, phase] = data[:, 1:3].T
+        return frequency, spectra
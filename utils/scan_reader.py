@@ -0,0 +1,78 @@
+"""
+read SDR scan files
+"""
+import os
+import numpy as np
+
+CACHE_FILE_EXTENSION = ".npy"
+
+
+def get_cache_file_name(data_file_name):
+    """
+
+    :param data_file_name: SDR scan file name
+    :return: binary cache file name for scan file
+    """
+    return os.path.splitext(data_file_name)[0] + CACHE_FILE_EXTENSION
+
+
+def is_scan_file(file_name):
+    """
+
+    :param file_name: file name
+    :return: True if file is SDR scan file
+    """
+    return file_name.endswith(".dat")
+
+
+def cache_is_valid(data_file_name, cache_file_name):
+    """
+
+    :param data_file_name: SDR scan file name
+    :param cache_file_name: binary cache file name
+    :return: True if cache was written for current version of scan file
+    """
+    if not os.path.isfile(cache_file_name):
+        return False
+    return os.stat(cache_file_name).st_mtime_ns == os.stat(data_file_name).st_mtime_ns
+
+
+def write_cache(data_file_name, cache_file_name, data):
+    """
+
+    :param data_file_name: SDR scan file name
+    :param cache_file_name: binary cache file name
+    :param data: parsed scan data
+    :return: None
+    """
+    tmp_cache_file_name = cache_file_name + ".tmp"
+    try:
+        with open(tmp_cache_file_name, "wb") as cache_file:
+            np.save(cache_file, data)
+        data_file_stat = os.stat(data_file_name)
+        os.utime(tmp_cache_file_name, ns=(data_file_stat.st_atime_ns, data_file_stat.st_mtime_ns))
+        os.replace(tmp_cache_file_name, cache_file_name)
+    except OSError as error:
+        print("Error: %s : %s" % (cache_file_name, error.strerror))
+        if os.path.isfile(tmp_cache_file_name):
+            os.remove(tmp_cache_file_name)
+
+
+def read_scan_file(data_file_name, use_cache=True):
+    """
+    Parse SDR scan file once into (N, 3) array with columns frequency,
+    polarization left and polarization right. Parsed data is stored in binary
+    cache next to scan file and reused while scan file modification time is unchanged.
+
+    :param data_file_name: SDR scan file name
+    :param use_cache: read and write binary cache
+    :return: (N, 3) float array
+    """
+    cache_file_name = get_cache_file_name(data_file_name)
+    if use_cache and cache_is_valid(data_file_name, cache_file_name):
+        return np.load(cache_file_name, mmap_mode="r")
+
+    data = np.ascontiguousarray(np.loadtxt(data_file_name, usecols=(0, 1, 2), ndmin=2), dtype=np.float64)
+    if use_cache:
+        write_cache(data_file_name, cache_file_name, data)
+    return data
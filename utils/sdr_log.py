@@ -0,0 +1,125 @@
+"""
+parsed SDR logs cache
+"""
+import os
+import json
+import numpy as np
+from ExperimentsLogReader.experimentsLogReader import LogReaderFactory, LogTypes
+
+LOG_CACHE_FILE_EXTENSION = "log.npz"
+PARSED_LOGS = dict()
+
+
+class SdrLog:
+    """
+    SDR log with header values and per scan records converted to numbers once
+    """
+
+    def __init__(self, header, scans, dates, az_el):
+        """
+
+        :param header: log header as parsed by ExperimentsLogReader
+        :param scans: scan names like 12r0
+        :param dates: isot date of each scan
+        :param az_el: azimuth and elevation of each scan
+        """
+        self.header = header
+        self.scans = list(scans)
+        self.scan_index = {scan: index for index, scan in enumerate(self.scans)}
+        self.dates = np.asarray(dates, dtype=str)
+        self.az_el = np.asarray(az_el, dtype=np.float64).reshape(-1, 2)
+
+        self.station, self.station_id = header["station,id"]
+        self.f_shift = float(header["Fs,Ns,RBW"][0]) / float(header["df_div,df"][0])
+        self.tcal = np.array([float(tcal) for tcal in header["Tcal"][:2]])
+        self.dpfu = np.array([float(dpfu) for dpfu in header["DPFU"][:2]])
+        g_el = [float(gel) for gel in header["Elev_poly"]]
+        self.g_el = [g_el[2], g_el[1], g_el[0]]
+        self.local_oscillator = float(header["f_obs,LO,IF"][1])
+
+    @classmethod
+    def from_logs(cls, logs):
+        """
+
+        :param logs: logs dict from ExperimentsLogReader
+        :return: SDR log
+        """
+        scans = [scan for scan in logs if scan != "header"]
+        return cls(logs["header"], scans, [logs[scan]["date"] for scan in scans],
+                   [logs[scan]["AzEl"][:2] for scan in scans])
+
+    @classmethod
+    def load(cls, cache_file_name):
+        """
+
+        :param cache_file_name: log cache file
+        :return: SDR log, log file name and modification time it was parsed from
+        """
+        with np.load(cache_file_name, allow_pickle=False) as cache:
+            return cls(json.loads(str(cache["header"])), cache["scans"], cache["dates"], cache["az_el"]), \
+                   str(cache["log_file"]), int(cache["log_mtime"])
+
+    def save(self, cache_file_name, log_file_name, log_mtime):
+        """
+
+        :param cache_file_name: log cache file
+        :param log_file_name: SDR log file
+        :param log_mtime: modification time of SDR log file
+        :return: None
+        """
+        tmp_cache_file_name = cache_file_name + ".tmp.npz"
+        np.savez(tmp_cache_file_name, header=json.dumps(self.header), scans=np.array(self.scans, dtype=str),
+                 dates=self.dates, az_el=self.az_el, log_file=os.path.abspath(log_file_name), log_mtime=log_mtime)
+        os.replace(tmp_cache_file_name, cache_file_name)
+
+    def get_date(self, scan):
+        """
+
+        :param scan: scan name
+        :return: isot date of scan
+        """
+        return str(self.dates[self.scan_index[scan]])
+
+    def get_elevations(self, scans):
+        """
+
+        :param scans: scan names
+        :return: elevation of each scan
+        """
+        return self.az_el[[self.scan_index[scan] for scan in scans], 1]
+
+
+def read_sdr_log(log_file_name, pretty_log_path):
+    """
+    SDR log is parsed with ExperimentsLogReader only if log file was modified since
+    its cache next to pretty log was written
+
+    :param log_file_name: SDR log file
+    :param pretty_log_path: pretty log path prefix for ExperimentsLogReader output
+    :return: SDR log
+    """
+    log_mtime = os.stat(log_file_name).st_mtime_ns
+    key = os.path.abspath(log_file_name)
+    if key in PARSED_LOGS and PARSED_LOGS[key][0] == log_mtime:
+        return PARSED_LOGS[key][1]
+
+    cache_file_name = pretty_log_path + LOG_CACHE_FILE_EXTENSION
+    sdr_log = None
+    if os.path.isfile(cache_file_name):
+        try:
+            cached_log, cached_log_file, cached_log_mtime = SdrLog.load(cache_file_name)
+            if cached_log_file == key and cached_log_mtime == log_mtime:
+                sdr_log = cached_log
+        except (OSError, ValueError, KeyError):
+            sdr_log = None
+
+    if sdr_log is None:
+        sdr_log = SdrLog.from_logs(LogReaderFactory.getLogReader(LogTypes.SDR, log_file_name,
+                                                                 pretty_log_path).getLogs())
+        try:
+            sdr_log.save(cache_file_name, log_file_name, log_mtime)
+        except OSError as error:
+            print("Error: %s : %s" % (cache_file_name, error.strerror))
+
+    PARSED_LOGS[key] = (log_mtime, sdr_log)
+    return sdr_log
@@ -0,0 +1,74 @@
+"""
+gaussian smoothing of output spectra and re-smoothing of amplitude_corrected tables
+"""
+import numpy as np
+import h5py
+from scipy.ndimage import convolve1d
+
+KERNEL_STDDEV = 3
+KERNEL_SIZE = 19
+
+
+def gaussian_kernel(stddev=KERNEL_STDDEV, size=KERNEL_SIZE):
+    """
+    Normalized gaussian kernel sampled at channel centers as astropy Gaussian1DKernel with mode center
+
+    :param stddev: standard deviation in channels
+    :param size: kernel size in channels
+    :return: kernel
+    """
+    x = np.arange(size) - (size - 1) / 2
+    kernel = np.exp(-0.5 * (x / stddev) ** 2)
+    return kernel / np.sum(kernel)
+
+
+def smooth_spectra(spectra, kernel):
+    """
+    Columns are convolved with kernel at once, spectra are extended with edge values as
+    astropy convolve with boundary extend
+
+    :param spectra: spectrum or spectra of shape (channels, columns)
+    :param kernel: symmetric kernel
+    :return: smoothed spectra
+    """
+    return convolve1d(np.asarray(spectra, dtype=np.float64), kernel, axis=0, mode="nearest")
+
+
+def resmooth_output_file(output_file_name, stddev=KERNEL_STDDEV, size=KERNEL_SIZE):
+    """
+    Table amplitude_corrected is derived again from table amplitude_corrected_not_smooht in place,
+    kernel is stored in its attributes
+
+    :param output_file_name: output file
+    :param stddev: standard deviation of gaussian kernel in channels
+    :param size: gaussian kernel size in channels
+    :return: True if output file was smoothed, False if it has no amplitude_corrected_not_smooht table
+    """
+    kernel = gaussian_kernel(stddev, size)
+    with h5py.File(output_file_name, "a") as output_file:
+        if "amplitude_corrected_not_smooht" not in output_file:
+            return False
+        amplitude = output_file["amplitude_corrected_not_smooht"][()]
+        smoothed = np.column_stack([amplitude[:, 0], smooth_spectra(amplitude[:, 1:], kernel)])
+        if "amplitude_corrected" in output_file and output_file["amplitude_corrected"].shape == smoothed.shape:
+            output_file["amplitude_corrected"][...] = smoothed
+        else:
+            if "amplitude_corrected" in output_file:
+                del output_file["amplitude_corrected"]
+            output_file.create_dataset("amplitude_corrected", data=smoothed)
+        set_kernel_attributes(output_file["amplitude_corrected"], kernel, stddev)
+    return True
+
+
+def set_kernel_attributes(dataset, kernel, stddev):
+    """
+
+    :param dataset: smoothed dataset
+    :param kernel: kernel
+    :param stddev: standard deviation of gaussian kernel in channels
+    :return: None
+    """
+    dataset.attrs["kernel"] = "gaussian"
+    dataset.attrs["kernel_stddev"] = stddev
+    dataset.attrs["kernel_size"] = len(kernel)
+    dataset.attrs["kernel_weights"] = kernel
@@ -0,0 +1,64 @@
+"""
+signal to noise ratio for stacks of spectra
+"""
+import numpy as np
+
+
+def get_cuts_index(frequency, cuts):
+    """
+
+    :param frequency: velocity grid
+    :param cuts: signal region
+    :return: sorted channel indexes of signal region borders
+    """
+    cuts = np.array(cuts, dtype=np.float64).reshape(-1)
+    frequency = np.asarray(frequency)
+    return np.sort(np.abs(frequency[:, None] - cuts[None, :]).argmin(axis=0))
+
+
+def get_masks(frequency, cuts, channels_count=None):
+    """
+    Channels between cuts borders are signal, channels outside of them are noise.
+    Last channel of spectrum is not part of noise region.
+
+    :param frequency: velocity grid
+    :param cuts: signal region
+    :param channels_count: channels count of spectra, default is size of velocity grid
+    :return: signal mask, noise mask
+    """
+    if channels_count is None:
+        channels_count = len(frequency)
+    cuts_index = get_cuts_index(frequency, cuts)
+
+    signal_mask = np.zeros(channels_count, dtype=bool)
+    for start, stop in zip(cuts_index[0::2], cuts_index[1::2]):
+        signal_mask[start:stop] = True
+
+    noise_borders = [0] + list(cuts_index) + [-1]
+    noise_mask = np.zeros(channels_count, dtype=bool)
+    for start, stop in zip(noise_borders[0::2], noise_borders[1::2]):
+        noise_mask[start:stop] = True
+
+    return signal_mask, noise_mask
+
+
+def noise_level(spectra, noise_mask):
+    """
+
+    :param spectra: spectrum or 2D stack of spectra (spectra x channels)
+    :param noise_mask: noise mask
+    :return: three sigma noise level of each spectrum
+    """
+    return np.std(np.asarray(spectra)[..., noise_mask], axis=-1) * 3
+
+
+def signal_to_noise_ratio(spectra, signal_mask, noise_mask):
+    """
+
+    :param spectra: spectrum or 2D stack of spectra (spectra x channels)
+    :param signal_mask: signal mask
+    :param noise_mask: noise mask
+    :return: signal to noise ratio of each spectrum
+    """
+    spectra = np.asarray(spectra)
+    return np.max(spectra[..., signal_mask], axis=-1) / noise_level(spectra, noise_mask)
@@ -0,0 +1,213 @@
+"""
+opt-in stage timing in Chrome trace event format
+"""
+import os
+import glob
+import json
+import time
+import atexit
+import functools
+import threading
+from contextlib import contextmanager
+
+TRACE_PART_SUFFIX = ".part"
+TRACER = None
+
+
+def get_bytes_read():
+    """
+
+    :return: bytes read by process so far or None if it is not known on this platform
+    """
+    try:
+        with open("/proc/self/io", "r") as io_file:
+            for line in io_file:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+def get_part_file_name(trace_file_name, label):
+    """
+
+    :param trace_file_name: trace file of main process
+    :param label: label of child process or task
+    :return: trace part file name that is merged into trace file
+    """
+    return trace_file_name + "." + label + TRACE_PART_SUFFIX
+
+
+class Tracer:
+    """
+    Spans of process are kept in memory as complete events and written once,
+    timestamps are wall clock microseconds so spans of several processes can be merged
+    """
+
+    def __init__(self, trace_file_name, process_name):
+        """
+
+        :param trace_file_name: output trace file
+        :param process_name: process name shown in trace viewer
+        """
+        self.trace_file_name = trace_file_name
+        self.pid = os.getpid()
+        self.epoch = time.time()
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+        self.events = [{"name": "process_name", "ph": "M", "pid": self.pid, "tid": 0,
+                        "args": {"name": process_name}}]
+
+    def timestamp(self):
+        """
+
+        :return: wall clock time in microseconds
+        """
+        return (self.epoch + time.perf_counter() - self.start) * 1e6
+
+    def add_span(self, name, category, start, end, cpu_time, bytes_read, args):
+        """
+
+        :param name: span name
+        :param category: span category
+        :param start: start timestamp in microseconds
+        :param end: end timestamp in microseconds
+        :param cpu_time: CPU time of thread in seconds
+        :param bytes_read: bytes read by process during span or None
+        :param args: extra span arguments
+        :return: None
+        """
+        args = dict(args)
+        args["cpu_ms"] = round(cpu_time * 1000, 3)
+        if bytes_read is not None:
+            args["bytes_read"] = bytes_read
+        with self.lock:
+            self.events.append({"name": name, "cat": category, "ph": "X", "ts": round(start, 1),
+                                "dur": round(end - start, 1), "pid": self.pid,
+                                "tid": threading.get_ident(), "args": args})
+
+    def write(self):
+        """
+
+        :return: None
+        """
+        tmp_trace_file_name = self.trace_file_name + ".tmp"
+        with self.lock:
+            with open(tmp_trace_file_name, "w") as trace_file:
+                json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, trace_file)
+        os.replace(tmp_trace_file_name, self.trace_file_name)
+
+
+def start_trace(trace_file_name, process_name):
+    """
+    Spans are recorded only after trace is started, trace is written at exit if it is not stopped before
+
+    :param trace_file_name: output trace file
+    :param process_name: process name shown in trace viewer
+    :return: tracer
+    """
+    global TRACER
+    if TRACER is None:
+        atexit.register(stop_trace)
+    TRACER = Tracer(trace_file_name, process_name)
+    return TRACER
+
+
+def stop_trace():
+    """
+
+    :return: written trace file name or None if trace was not started
+    """
+    global TRACER
+    if TRACER is None:
+        return None
+    tracer = TRACER
+    TRACER = None
+    try:
+        tracer.write()
+    except OSError as error:
+        print("Error: %s : %s" % (tracer.trace_file_name, error.strerror))
+        return None
+    return tracer.trace_file_name
+
+
+@contextmanager
+def trace_span(name, category="stage", **args):
+    """
+
+    :param name: span name
+    :param category: span category
+    :param args: extra span arguments
+    :return: None
+    """
+    tracer = TRACER
+    if tracer is None:
+        yield
+        return
+
+    bytes_read = get_bytes_read()
+    cpu_start = time.thread_time()
+    start = tracer.timestamp()
+    try:
+        yield
+    finally:
+        end = tracer.timestamp()
+        cpu_time = time.thread_time() - cpu_start
+        if bytes_read is not None:
+            bytes_read = get_bytes_read() - bytes_read
+        tracer.add_span(name, category, start, end, cpu_time, bytes_read, args)
+
+
+def traced(name=None, category="stage"):
+    """
+    Decorator for functions which are traced as one span, it is not meant for Qt slots
+
+    :param name: span name, default is function name
+    :param category: span category
+    :return: decorator
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if TRACER is None:
+                return function(*args, **kwargs)
+            with trace_span(name or function.__name__, category):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def remove_trace_parts(trace_file_name):
+    """
+
+    :param trace_file_name: trace file of main process
+    :return: None
+    """
+    for part_file_name in glob.glob(glob.escape(trace_file_name) + ".*" + TRACE_PART_SUFFIX):
+        os.remove(part_file_name)
+
+
+def merge_trace_parts(trace_file_name):
+    """
+    Trace parts written by child processes are merged into trace file and removed
+
+    :param trace_file_name: trace file of main process
+    :return: None
+    """
+    with open(trace_file_name, "r") as trace_file:
+        trace = json.load(trace_file)
+    part_file_names = sorted(glob.glob(glob.escape(trace_file_name) + ".*" + TRACE_PART_SUFFIX))
+    for part_file_name in part_file_names:
+        try:
+            with open(part_file_name, "r") as part_file:
+                trace["traceEvents"].extend(json.load(part_file)["traceEvents"])
+        except (OSError, ValueError, KeyError) as error:
+            print("Error: %s : %s" % (part_file_name, error))
+
+    tmp_trace_file_name = trace_file_name + ".tmp"
+    with open(tmp_trace_file_name, "w") as trace_file:
+        json.dump(trace, trace_file)
+    os.replace(tmp_trace_file_name, trace_file_name)
+    for part_file_name in part_file_names:
+        os.remove(part_file_name)
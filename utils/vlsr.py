@@ -7,6 +7,23 @@ from astropy.coordinates import SkyCoord, FK5, EarthLocation
 from astropy.time import Time
 from jplephem.spk import SPK
 
+KERNEL_FILE_NAME = 'de435.bsp'
+APEX = "18h03m50.29s +30d00m16.8s"
+CANON_VELOCITY = 19.954 * 1000 * u.meter / u.second
+SPK_KERNELS = dict()
+LSR_ENGINES = dict()
+
+
+def get_kernel(kernel_file_name=KERNEL_FILE_NAME):
+    """
+
+    :param kernel_file_name: JPL ephemeris file
+    :return: opened ephemeris kernel, each file is opened only once
+    """
+    if kernel_file_name not in SPK_KERNELS:
+        SPK_KERNELS[kernel_file_name] = SPK.open(kernel_file_name)
+    return SPK_KERNELS[kernel_file_name]
+
 
 @u.quantity_input(canon_velocity=(u.meter / u.second))
 def v_sun(source, apex="18h03m50.29s +30d00m16.8s",
@@ -36,7 +53,7 @@ def v_earth(source):
     :param source: observed source
     :return: Earth velocity
     """
-    kernel = SPK.open('de435.bsp')
+    kernel = get_kernel()
     time = source.obstime.jd
     _, velocity = kernel[0, 3].compute_and_differentiate(time)
     _, velocity2 = kernel[3, 399].compute_and_differentiate(time)
@@ -105,3 +122,93 @@ def lsr(ra, dec, date, string_time, x, y, z):
     source.transform_to(source)
     V_lsr = v_lsr(ra, dec, source, string_time, x, y, z)
     return V_lsr
+
+
+class LsrEngine:
+    """
+    Local Standard of Rest velocity for one source and station,
+    ephemeris kernel, source coordinates and apex vectors are computed once
+    """
+
+    def __init__(self, ra, dec, x, y, z, kernel_file_name=KERNEL_FILE_NAME):
+        self.kernel = get_kernel(kernel_file_name)
+        self.source_xyz = SkyCoord(ra=ra, dec=dec, frame=FK5, equinox='J2000.0').cartesian.xyz.value
+        source = SkyCoord(ra=ra, dec=dec)
+        self.angle_ra = source.ra.radian
+        self.cdec = np.cos(source.dec.radian)
+        self.location = EarthLocation(x=x * u.m, y=y * u.m, z=z * u.m)
+        ro = np.sqrt(x ** 2 + y ** 2) / 1000.0
+        self.vhor = 2 * np.pi * ro / (24 * 3600) * 1.002737909350795
+        self.apex_j2000 = SkyCoord(APEX, equinox="J2000", frame=FK5)
+        self.apex_vectors = dict()
+
+    def apex(self, times):
+        """
+
+        :param times: observation times
+        :return: apex unit vectors for equinox of each time with shape (3, times)
+        """
+        missing_times = [time for time in set(times.jd) if time not in self.apex_vectors]
+        if missing_times:
+            equinox = Time(missing_times, format='jd', scale=times.scale)
+            apex = self.apex_j2000.transform_to(FK5(equinox=equinox, representation_type='cartesian'))
+            for time, vector in zip(missing_times, apex.cartesian.xyz.value.T):
+                self.apex_vectors[time] = vector
+        return np.array([self.apex_vectors[time] for time in times.jd]).T
+
+    def v_sun(self, times):
+        """
+
+        :param times: observation times
+        :return: sun velocity in km/s
+        """
+        return (CANON_VELOCITY * np.dot(self.source_xyz, self.apex(times))).value / 1000
+
+    def v_earth(self, times):
+        """
+
+        :param times: observation times
+        :return: Earth velocity in km/s
+        """
+        _, velocity = self.kernel[0, 3].compute_and_differentiate(times.jd)
+        _, velocity2 = self.kernel[3, 399].compute_and_differentiate(times.jd)
+        velocity = (((velocity - velocity2) * 1000 * u.meter / u.day).to(u.meter / u.second)).value
+        return np.dot(velocity.T, self.source_xyz) / 1000
+
+    def vobs(self, times):
+        """
+
+        :param times: observation times
+        :return: observatory velocity in km/s
+        """
+        sd_time = Time(times.iso, scale='utc', location=self.location)
+        a_lmst = np.deg2rad(sd_time.sidereal_time('apparent')).value
+        ravhor = a_lmst + np.pi / 2
+        return self.vhor * self.cdec * np.cos(self.angle_ra - ravhor)
+
+    def lsr(self, times):
+        """
+
+        :param times: observation times, astropy Time or list of isot strings
+        :return: Local Standard of Rest velocity for each time
+        """
+        if isinstance(times, Time):
+            times = times.isot
+        times = Time(np.atleast_1d(times), format='isot', scale='utc')
+        return self.v_sun(times) + self.vobs(times) + self.v_earth(times)
+
+
+def get_lsr_engine(ra, dec, x, y, z):
+    """
+
+    :param ra: Right ascension
+    :param dec: Declination
+    :param x: x coordinate
+    :param y: y coordinate
+    :param z: z coordinate
+    :return: cached Local Standard of Rest engine for source and station
+    """
+    key = (ra, dec, float(x), float(y), float(z))
+    if key not in LSR_ENGINES:
+        LSR_ENGINES[key] = LsrEngine(ra, dec, x, y, z)
+    return LSR_ENGINES[key]